@@ -0,0 +1,99 @@
+"""
+Пропускная способность очереди команд плеера при одновременных запросах.
+
+Запуск из корня репозитория:
+    python -m benchmarks.command_throughput --tracks 1000 --threads 1 2 4 8 16
+    python -m benchmarks.command_throughput --tracks 1000000 --files 1000 --threads 1 4
+
+Несколько потоков одновременно вызывают обработчики Player напрямую (без сети):
+изменяющие команды (MoveSong, Pause/Play) выполняются потоком команд по одной,
+читающие запросы (IsPaused, GetSongIndex, GetPlayListRange) берут последний снимок
+состояния. Выводится количество операций в секунду и среднее количество команд,
+выполненных между публикациями снимка. В конце проверяется, что плейлист остался
+перестановкой исходных треков. С --files создаётся меньше файлов, и пути в плейлисте
+повторяются (для плейлистов из сотен тысяч треков).
+Без звуковой карты используйте SDL_AUDIODRIVER=dummy.
+"""
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+from threading import Thread
+
+import player_server.player_pb2 as pb2
+from player_server.player import Player
+from benchmarks.track_gap import make_tracks
+
+
+def worker(player: Player, tracks: int, write_ratio: float, operations: int, seed: int) -> None:
+    """
+    поток нагрузки: случайная смесь изменяющих и читающих запросов
+    :param player:
+    :param tracks: количество треков в плейлисте
+    :param write_ratio: доля изменяющих запросов
+    :param operations: количество запросов
+    :param seed:
+    :return:
+    """
+    rnd = random.Random(seed)
+    for _ in range(operations):
+        if rnd.random() < write_ratio:
+            if rnd.random() < 0.8:
+                player.MoveSong(pb2.RequestMoveSong(index=rnd.randrange(tracks), to_index=rnd.randrange(tracks)), None)
+            elif player.IsPaused(None, None).result == 1:
+                player.Play(None, None)
+            else:
+                player.Pause(None, None)
+        else:
+            kind = rnd.randrange(3)
+            if kind == 0:
+                player.IsPaused(None, None)
+            elif kind == 1:
+                player.GetSongIndex(None, None)
+            else:
+                player.GetPlayListRange(pb2.RequestPlaylistRange(offset=rnd.randrange(tracks), limit=50), None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tracks', type=int, default=1000, help='количество треков')
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4, 8, 16], help='количество потоков')
+    parser.add_argument('--operations', type=int, default=2000, help='запросов на поток')
+    parser.add_argument('--files', type=int, default=0, help='количество разных файлов (0 - по файлу на трек)')
+    parser.add_argument('--write-ratio', type=float, default=0.2, help='доля изменяющих запросов')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        files = min(args.files or args.tracks, args.tracks)
+        paths = make_tracks(Path(directory), files, frames=40)
+        paths = [paths[i % files] for i in range(args.tracks)]
+        player = Player(metadata_cache_path=None)
+        player.AddSong(pb2.RequestSongPath(path=paths), None)
+        player.Play(pb2.RequestControl(index=0), None)
+
+        print(f'треков: {args.tracks}, запросов на поток: {args.operations}, '
+              f'доля изменяющих: {args.write_ratio:.0%}')
+        for threads in args.threads:
+            executed, batches = player.commands.executed, player.commands.batches
+            workers = [Thread(target=worker, args=(player, args.tracks, args.write_ratio, args.operations, seed))
+                       for seed in range(threads)]
+            started = time.perf_counter()
+            for thread in workers:
+                thread.start()
+            for thread in workers:
+                thread.join()
+            elapsed = time.perf_counter() - started
+            commands = player.commands.executed - executed
+            per_batch = commands / max(player.commands.batches - batches, 1)
+            print(f'потоков: {threads:3d}  операций/с: {threads * args.operations / elapsed:10.0f}  '
+                  f'команд/с: {commands / elapsed:9.0f}  команд на снимок: {per_batch:5.2f}')
+        player.Stop(None, None)
+
+        titles = player.GetPlayList(None, None).song_title
+        assert sorted(titles) == sorted(Path(path).stem for path in paths), 'плейлист повреждён'
+        print('плейлист согласован')
+
+
+if __name__ == '__main__':
+    main()
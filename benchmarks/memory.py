@@ -0,0 +1,101 @@
+"""
+Память сервера на один трек плейлиста.
+
+Запуск из корня репозитория:
+    python -m benchmarks.memory --tracks 1000000
+
+Плейлист заполняется синтетическими путями (по 20 треков в каталоге альбома, файлы не
+создаются) тремя способами: добавление треков (как AddSong/ImportDirectory), восстановление
+из снимка (до первого изменения объекты треков не создаются) и восстановление с последующим
+изменением и обходом (создаются объекты и узлы дерева всех треков). Память считается через tracemalloc - все
+выделения Python после заполнения минус до, включая историю изменений плейлиста.
+"""
+import argparse
+import gc
+import math
+import os
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from player_server.player import Player, ADD_SONGS_BATCH
+from player_server.snapshot import PlaylistSnapshot, write_snapshot
+
+
+def track_paths(count: int) -> list:
+    """
+    синтетические пути: исполнитель / альбом / трек
+    :param count:
+    :return:
+    """
+    return [f'/music/Artist {i // 2000:04d}/Album {i // 20:05d}/{i % 20 + 1:02d} - Track {i}.mp3'
+            for i in range(count)]
+
+
+def measure(fill) -> tuple:
+    """
+    память, занятая объектами, созданными fill
+    :param fill: функция заполнения, возвращает плейлист
+    :return: (плейлист, байт, секунд)
+    """
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    playlist = fill()
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return playlist, used, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tracks', type=int, default=200000, help='количество треков')
+    args = parser.parse_args()
+
+    paths = track_paths(args.tracks)
+
+    def added():
+        playlist = Player.Playlist(probe_workers=1)
+        for start in range(0, len(paths), ADD_SONGS_BATCH):
+            playlist.append_items([playlist.SongItem(path, duration=180.0)
+                                   for path in paths[start:start + ADD_SONGS_BATCH]])
+        return playlist
+
+    playlist, used, elapsed = measure(added)
+    print(f'треков: {args.tracks}')
+    print(f'добавление:                  {used / args.tracks:7.1f} байт/трек, {elapsed:6.2f} с')
+    records = [(os.fsencode(path), 180.0 if i % 2 else math.nan) for i, path in enumerate(paths)]
+    del playlist
+
+    with tempfile.TemporaryDirectory() as directory:
+        snapshot_path = Path(directory) / 'playlist.snapshot'
+        write_snapshot(snapshot_path, records)
+        del records
+
+        def restored():
+            playlist = Player.Playlist(probe_workers=1)
+            playlist.restore(Player.Playlist.StoredSongs(PlaylistSnapshot(snapshot_path)), 0)
+            return playlist
+
+        playlist, used, elapsed = measure(restored)
+        print(f'восстановление из снимка:    {used / args.tracks:7.1f} байт/трек, {elapsed:6.2f} с '
+              f'(снимок: {snapshot_path.stat().st_size / args.tracks:.1f} байт/трек)')
+
+        def changed():
+            # первое изменение и обход всего опубликованного плейлиста, как в GetPlayList
+            playlist.move_song(0, len(playlist) - 1)
+            titles = [str(item) for item in playlist.songs()]
+            assert len(titles) == args.tracks
+            return playlist
+
+        playlist, used, elapsed = measure(changed)
+        print(f'после изменения (+к снимку): {used / args.tracks:7.1f} байт/трек, {elapsed:6.2f} с')
+        del playlist
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""
+Много сеансов плеера (комнат) в одном процессе сервера.
+
+Запуск из корня репозитория:
+    python -m benchmarks.sessions --sessions 300 --threads 8
+
+Сервер gRPC запускается в этом же процессе с сервисом SessionPlayer. Для каждого сеанса
+(идентификатор в метаданных запроса) добавляются треки и запускается проигрывание без
+звукового устройства, затем несколько потоков отправляют запросы в случайные сеансы:
+изменяющие (MoveSong, Pause/Play) и читающие (GetSnapshot, GetPlayListRange).
+Выводятся время создания сеанса, запросы в секунду, медиана и p99 времени ответа и
+количество потоков процесса. В конце проверяется, что плейлист каждого сеанса содержит
+только его треки.
+"""
+import argparse
+import random
+import statistics
+import tempfile
+import threading
+import time
+from concurrent import futures
+from pathlib import Path
+
+import grpc
+import player_server.player_pb2_grpc as pb2_grpc
+import player_server.player_pb2 as pb2
+from player_server.player import Player
+from player_server.audio import HeadlessBackend
+from player_server.sessions import PlayerSessions, SessionPlayer, SESSION_METADATA_KEY
+from benchmarks.track_gap import make_tracks
+
+
+def session_metadata(session: int) -> tuple:
+    return (SESSION_METADATA_KEY, f'room-{session}'),
+
+
+def worker(stub, sessions: int, tracks: int, operations: int, seed: int, timings: list) -> None:
+    """
+    поток нагрузки: случайные запросы в случайные сеансы
+    :param stub:
+    :param sessions: количество сеансов
+    :param tracks: треков в плейлисте сеанса
+    :param operations: количество запросов
+    :param seed:
+    :param timings: список для времени ответа, с
+    :return:
+    """
+    rnd = random.Random(seed)
+    for _ in range(operations):
+        metadata = session_metadata(rnd.randrange(sessions))
+        kind = rnd.randrange(4)
+        started = time.perf_counter()
+        if kind == 0:
+            stub.MoveSong(pb2.RequestMoveSong(index=rnd.randrange(tracks), to_index=rnd.randrange(tracks)),
+                          metadata=metadata)
+        elif kind == 1:
+            if stub.GetSnapshot(pb2.RequestSnapshot(), metadata=metadata).paused:
+                stub.Play(pb2.RequestControl(), metadata=metadata)
+            else:
+                stub.Pause(pb2.RequestControl(), metadata=metadata)
+        elif kind == 2:
+            stub.GetSnapshot(pb2.RequestSnapshot(), metadata=metadata)
+        else:
+            stub.GetPlayListRange(pb2.RequestPlaylistRange(offset=0, limit=50), metadata=metadata)
+        timings.append(time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sessions', type=int, default=300, help='количество сеансов')
+    parser.add_argument('--tracks', type=int, default=20, help='треков в плейлисте сеанса')
+    parser.add_argument('--threads', type=int, default=8, help='потоков нагрузки')
+    parser.add_argument('--operations', type=int, default=500, help='запросов на поток')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = make_tracks(Path(directory), args.tracks, frames=4000)
+        sessions = PlayerSessions(Player(metadata_cache_path=None, audio=HeadlessBackend()))
+        server = grpc.server(futures.ThreadPoolExecutor(max_workers=args.threads + 2))
+        pb2_grpc.add_PlayerServicer_to_server(SessionPlayer(sessions), server)
+        port = server.add_insecure_port('127.0.0.1:0')
+        server.start()
+        try:
+            with grpc.insecure_channel(f'127.0.0.1:{port}') as channel:
+                stub = pb2_grpc.PlayerStub(channel)
+                started = time.perf_counter()
+                for session in range(args.sessions):
+                    metadata = session_metadata(session)
+                    # у каждого сеанса свой порядок треков - для проверки, что сеансы не смешиваются
+                    order = paths[session % args.tracks:] + paths[:session % args.tracks]
+                    stub.AddSong(pb2.RequestSongPath(path=order), metadata=metadata)
+                    stub.Play(pb2.RequestControl(index=0), metadata=metadata)
+                elapsed = time.perf_counter() - started
+                print(f'сеансов: {args.sessions}, треков в сеансе: {args.tracks}, '
+                      f'создание и заполнение сеанса: {elapsed / args.sessions * 1000:.1f} мс, '
+                      f'потоков процесса: {threading.active_count()}')
+
+                timings = []
+                workers = [threading.Thread(target=worker, args=(stub, args.sessions, args.tracks,
+                                                                 args.operations, seed, timings))
+                           for seed in range(args.threads)]
+                started = time.perf_counter()
+                for thread in workers:
+                    thread.start()
+                for thread in workers:
+                    thread.join()
+                elapsed = time.perf_counter() - started
+                timings.sort()
+                print(f'потоков нагрузки: {args.threads}  запросов/с: {len(timings) / elapsed:8.0f}  '
+                      f'медиана: {statistics.median(timings) * 1000:6.2f} мс  '
+                      f'p99: {timings[int(len(timings) * 0.99)] * 1000:6.2f} мс')
+
+                expected = sorted(Path(path).stem for path in paths)
+                for session in range(args.sessions):
+                    titles = stub.GetPlayList(pb2.Empty(), metadata=session_metadata(session)).song_title
+                    assert sorted(titles) == expected, f'плейлист сеанса {session} повреждён'
+                assert not stub.GetPlayList(pb2.Empty()).song_title, 'треки попали в сеанс по умолчанию'
+                print('плейлисты сеансов согласованы')
+        finally:
+            server.stop(0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Нагрузочный прогон длительного проигрывания на HeadlessBackend (без звукового устройства).
+
+Запуск из корня репозитория:
+    python -m benchmarks.simulated_playback --tracks 10000 --hours 5000
+
+Часы SimulatedClock переводятся сразу на окончание текущего трека, поэтому часы
+проигрывания занимают миллисекунды. Плеер обрабатывает каждое окончание так же,
+как при реальном проигрывании: событие -> очередь команд -> Next -> запуск следующего трека.
+Проверяется, что каждый переход сдвигает активный трек ровно на один; по окончании
+плейлиста проигрывание начинается с первого трека. Выводятся количество переходов
+в секунду и время реакции на окончание трека.
+"""
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import player_server.player_pb2 as pb2
+from player_server.player import Player
+from player_server.audio import HeadlessBackend, SimulatedClock
+from benchmarks.track_gap import make_tracks
+
+# предельное время ожидания перехода к следующему треку, с
+TRANSITION_TIMEOUT = 5.0
+
+
+def wait_new_song(player: Player, after: int) -> None:
+    """
+    ожидание события NEW_SONG с номером больше after
+    :param player:
+    :param after: номер события журнала
+    :return:
+    """
+    deadline = time.monotonic() + TRANSITION_TIMEOUT
+    while time.monotonic() < deadline:
+        events, after, lost = player.events.wait(after, TRANSITION_TIMEOUT)
+        if pb2.NEW_SONG in events or lost:
+            return
+    raise TimeoutError('плеер не перешёл к следующему треку')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tracks', type=int, default=10000, help='количество треков в плейлисте')
+    parser.add_argument('--hours', type=float, default=1000, help='часов проигрывания')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    clock = SimulatedClock()
+    # длительность треков 2-6 минут; файлы не читаются
+    audio = HeadlessBackend(clock, duration_of=lambda path: rnd.uniform(120, 360))
+    with tempfile.TemporaryDirectory() as directory:
+        track = make_tracks(Path(directory), 1, frames=1)[0]
+        player = Player(metadata_cache_path=None, audio=audio)
+        player.AddSong(pb2.RequestSongPath(path=[track] * args.tracks), None)
+
+        player.Play(pb2.RequestControl(index=0), None)
+        target = args.hours * 3600
+        transitions = laps = skipped = 0
+        started = time.perf_counter()
+        while clock.now() < target:
+            index = player.state.index
+            sequence = player.events.last_sequence
+            clock.advance(audio.remaining())
+            if index == args.tracks - 1:
+                # конец плейлиста - начать сначала
+                player.Play(pb2.RequestControl(index=0), None)
+                laps += 1
+                continue
+            wait_new_song(player, sequence)
+            transitions += 1
+            if player.state.index != index + 1:
+                skipped += 1
+        elapsed = time.perf_counter() - started
+        player.Stop(None, None)
+        audio.close()
+
+    gaps = [gap * 1000 for gap in player.transition_gaps]
+    print(f'треков: {args.tracks}, проиграно часов: {clock.now() / 3600:.0f}, '
+          f'переходов: {transitions}, повторов плейлиста: {laps}')
+    print(f'время прогона: {elapsed:.2f} с, часов проигрывания в секунду: {clock.now() / 3600 / elapsed:.0f}, '
+          f'переходов в секунду: {transitions / elapsed:.0f}')
+    if gaps:
+        print(f'реакция на окончание трека (последние {len(gaps)}), мс: среднее {statistics.mean(gaps):.3f}, '
+              f'максимум {max(gaps):.3f}')
+    print(f'переходов не на следующий трек: {skipped}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,252 @@
+"""
+Набор микро-бенчмарков плейлиста и обработчиков Player с записью результатов в JSON.
+
+Запуск из корня репозитория:
+    python -m benchmarks.suite --sizes 1000 10000 100000 1000000 --output results.json
+    python -m benchmarks.suite --sizes 1000 10000 --compare results.json
+
+Для каждого размера плейлиста измеряются:
+    append_songs   - добавление всех треков одним вызовом
+    append_batch   - добавление 1000 треков в конец заполненного плейлиста
+    getitem        - доступ по случайному индексу
+    index          - индекс объекта в плейлисте (так вычисляется индекс активного трека)
+    delete_song    - удаление по случайному индексу
+    iterate        - полный проход по плейлисту
+    GetPlayList    - обработчик Player.GetPlayList (весь плейлист)
+    GetPlayListRange - обработчик Player.GetPlayListRange (страница 200 названий)
+    SearchPlaylist_build - от первого поиска Player.SearchPlaylist до готовности индекса поиска
+    SearchPlaylist - поиск названия, которого нет в плейлисте (просматривается весь индекс)
+и время ответа unary RPC сервера, запущенного в этом же процессе (rpc_*), при размере
+плейлиста из --rpc-size. Для каждого замера сохраняется медиана из --repeat повторов.
+С ключом --compare выводится отношение к результатам из указанного файла (>1 - медленнее).
+Без звуковой карты используйте SDL_AUDIODRIVER=dummy.
+"""
+import argparse
+import json
+import platform
+import random
+import statistics
+import subprocess
+import tempfile
+import time
+from concurrent import futures
+from pathlib import Path
+
+import grpc
+import player_server.player_pb2_grpc as pb2_grpc
+import player_server.player_pb2 as pb2
+from player_server.player import Player
+from benchmarks.track_gap import make_tracks
+
+# количество операций в замерах точечных операций (getitem, index, delete_song)
+POINT_OPERATIONS = 1000
+# количество вызовов в замере времени ответа RPC
+RPC_CALLS = 500
+
+
+def measure(function, repeat: int, setup=None) -> float:
+    """
+    медиана времени выполнения function
+    :param function: функция от результата setup
+    :param repeat: количество повторов
+    :param setup: подготовка данных перед каждым повтором (не входит в замер)
+    :return: время, с
+    """
+    timings = []
+    for _ in range(repeat):
+        data = setup() if setup else None
+        started = time.perf_counter()
+        function(data)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def filled_playlist(paths: list):
+    playlist = Player.Playlist(metadata_cache=None)
+    playlist.append_songs(*paths)
+    return playlist
+
+
+def bench_playlist(size: int, track: str, repeat: int) -> list:
+    """
+    замеры операций Player.Playlist для плейлиста из size треков
+    :param size:
+    :param track: путь к файлу трека (одинаковые пути допустимы - проверяется только наличие файла)
+    :param repeat:
+    :return: список результатов
+    """
+    paths = [track] * size
+    batch = [track] * 1000
+    rnd = random.Random(size)
+    results = []
+
+    def record(name, seconds, operations):
+        results.append(dict(name=name, tracks=size, operations=operations, seconds=seconds,
+                            per_operation_us=seconds / operations * 1e6))
+
+    record('append_songs', measure(lambda _: Player.Playlist(metadata_cache=None).append_songs(*paths), repeat),
+           size)
+    playlist = filled_playlist(paths)
+    record('append_batch', measure(lambda _: playlist.append_songs(*batch), repeat), len(batch))
+
+    playlist = filled_playlist(paths)
+    indices = [rnd.randrange(size) for _ in range(POINT_OPERATIONS)]
+    record('getitem', measure(lambda _: [playlist[index] for index in indices], repeat), len(indices))
+    items = [playlist[index] for index in indices]
+    record('index', measure(lambda _: [playlist.index(item) for item in items], repeat), len(items))
+    record('iterate', measure(lambda _: sum(1 for _ in playlist), repeat), size)
+
+    def delete(_):
+        for _ in range(POINT_OPERATIONS):
+            playlist.delete_song(rnd.randrange(len(playlist)))
+    # удалённые объекты возвращаются перед следующим повтором
+    record('delete_song', measure(delete, repeat, setup=lambda: playlist.append_songs(*paths[:POINT_OPERATIONS])),
+           POINT_OPERATIONS)
+    return results
+
+
+def wait_search_index(player: Player) -> None:
+    # первый поиск запускает построение индекса в фоне; ожидание первого ответа с результатами
+    while player.SearchPlaylist(pb2.RequestSearchPlaylist(query=''), None).indexing:
+        time.sleep(0.001)
+
+
+def bench_handlers(player: Player, size: int, repeat: int) -> list:
+    """
+    замеры обработчиков Player, читающих плейлист
+    :param player: плеер с плейлистом из size треков
+    :param size:
+    :param repeat:
+    :return: список результатов
+    """
+    results = []
+    seconds = measure(lambda _: player.GetPlayList(None, None), repeat)
+    results.append(dict(name='GetPlayList', tracks=size, operations=1, seconds=seconds,
+                        per_operation_us=seconds * 1e6))
+    request = pb2.RequestPlaylistRange(offset=size // 2, limit=200)
+    seconds = measure(lambda _: [player.GetPlayListRange(request, None) for _ in range(100)], repeat)
+    results.append(dict(name='GetPlayListRange', tracks=size, operations=100, seconds=seconds,
+                        per_operation_us=seconds / 100 * 1e6))
+    started = time.perf_counter()
+    wait_search_index(player)
+    seconds = time.perf_counter() - started
+    results.append(dict(name='SearchPlaylist_build', tracks=size, operations=1, seconds=seconds,
+                        per_operation_us=seconds * 1e6))
+    request = pb2.RequestSearchPlaylist(query='no such title')
+    seconds = measure(lambda _: player.SearchPlaylist(request, None), repeat)
+    results.append(dict(name='SearchPlaylist', tracks=size, operations=1, seconds=seconds,
+                        per_operation_us=seconds * 1e6))
+    return results
+
+
+def bench_rpc(player: Player, size: int) -> list:
+    """
+    время ответа unary RPC сервера в этом же процессе
+    :param player: плеер с плейлистом из size треков
+    :param size:
+    :return: список результатов с процентилями
+    """
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+    pb2_grpc.add_PlayerServicer_to_server(player, server)
+    port = server.add_insecure_port('127.0.0.1:0')
+    server.start()
+    wait_search_index(player)
+    calls = {
+        'IsPaused': lambda stub: stub.IsPaused(pb2.Empty()),
+        'GetSongIndex': lambda stub: stub.GetSongIndex(pb2.Empty()),
+        'GetSnapshot': lambda stub: stub.GetSnapshot(pb2.RequestSnapshot()),
+        'GetPlayListRange': lambda stub: stub.GetPlayListRange(pb2.RequestPlaylistRange(offset=0, limit=200)),
+        'GetPlaylistDelta': lambda stub: stub.GetPlaylistDelta(pb2.RequestPlaylistDelta(version=-1)),
+        'SearchPlaylist': lambda stub: stub.SearchPlaylist(pb2.RequestSearchPlaylist(query='track', limit=50)),
+        'MoveSong': lambda stub: stub.MoveSong(pb2.RequestMoveSong(index=0, to_index=size - 1)),
+    }
+    results = []
+    try:
+        with grpc.insecure_channel(f'127.0.0.1:{port}') as channel:
+            stub = pb2_grpc.PlayerStub(channel)
+            for name, call in calls.items():
+                # прогрев соединения
+                for _ in range(20):
+                    call(stub)
+                timings = []
+                for _ in range(RPC_CALLS):
+                    started = time.perf_counter()
+                    call(stub)
+                    timings.append(time.perf_counter() - started)
+                timings.sort()
+                results.append(dict(name=f'rpc_{name}', tracks=size, operations=RPC_CALLS,
+                                    seconds=sum(timings), per_operation_us=statistics.median(timings) * 1e6,
+                                    p95_us=timings[int(len(timings) * 0.95)] * 1e6,
+                                    p99_us=timings[int(len(timings) * 0.99)] * 1e6))
+    finally:
+        server.stop(0)
+    return results
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def compare(results: list, baseline_path: str) -> None:
+    """
+    вывод отношения времени к сохранённым результатам
+    :param results:
+    :param baseline_path: файл JSON предыдущего запуска
+    :return:
+    """
+    baseline = json.loads(Path(baseline_path).read_text())
+    previous = {(result['name'], result['tracks']): result for result in baseline['results']}
+    print(f'\nсравнение с {baseline_path} (коммит {baseline.get("commit") or "?"}):')
+    for result in results:
+        old = previous.get((result['name'], result['tracks']))
+        if old:
+            ratio = result['per_operation_us'] / old['per_operation_us']
+            mark = '  <-- медленнее' if ratio > 1.2 else ''
+            print(f'{result["name"]:>22} {result["tracks"]:>8}  x{ratio:6.2f}{mark}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000, 1000000],
+                        help='размеры плейлиста')
+    parser.add_argument('--repeat', type=int, default=3, help='количество повторов каждого замера')
+    parser.add_argument('--rpc-size', type=int, default=10000, help='размер плейлиста для замеров RPC (0 - без RPC)')
+    parser.add_argument('--output', default='benchmark_results.json', help='файл результатов JSON')
+    parser.add_argument('--compare', help='файл JSON предыдущего запуска для сравнения')
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        track = make_tracks(Path(directory), 1, frames=40)[0]
+        for size in args.sizes:
+            first = len(results)
+            results.extend(bench_playlist(size, track, args.repeat))
+            player = Player(metadata_cache_path=None)
+            player.AddSong(pb2.RequestSongPath(path=[track] * size), None)
+            results.extend(bench_handlers(player, size, args.repeat))
+            for result in results[first:]:
+                print(f'{result["name"]:>22} {size:>8}  {result["per_operation_us"]:12.2f} мкс/операция')
+        if args.rpc_size:
+            player = Player(metadata_cache_path=None)
+            player.AddSong(pb2.RequestSongPath(path=[track] * args.rpc_size), None)
+            player.Play(pb2.RequestControl(index=0), None)
+            for result in bench_rpc(player, args.rpc_size):
+                results.append(result)
+                print(f'{result["name"]:>22} {args.rpc_size:>8}  медиана {result["per_operation_us"]:8.1f} мкс, '
+                      f'p95 {result["p95_us"]:8.1f} мкс, p99 {result["p99_us"]:8.1f} мкс')
+            player.Stop(None, None)
+
+    report = dict(commit=git_commit(), python=platform.python_version(), platform=platform.platform(),
+                  timestamp=time.strftime('%Y-%m-%dT%H:%M:%S'), repeat=args.repeat, results=results)
+    Path(args.output).write_text(json.dumps(report, ensure_ascii=False, indent=2))
+    print(f'результаты записаны в {args.output}')
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
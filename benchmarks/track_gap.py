@@ -0,0 +1,70 @@
+"""
+Измерение паузы между треками при автоматическом переходе.
+
+Запуск из корня репозитория:
+    python -m benchmarks.track_gap --tracks 10
+
+Генерирует короткие беззвучные MP3, проигрывает их через Player и выводит
+время реакции на событие окончания трека (Player.transition_gaps) и среднюю
+паузу между треками по часам: (начало последнего - начало первого - длительность
+всех треков, кроме последнего) / количество переходов.
+Без звуковой карты используйте SDL_AUDIODRIVER=dummy.
+"""
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import player_server.player_pb2 as pb2
+from player_server.player import Player
+
+# заголовок кадра MPEG-1 Layer III, 128 кбит/с, 44.1 кГц; длина кадра 417 байт
+MP3_FRAME = bytes([0xFF, 0xFB, 0x90, 0x64]) + bytes(413)
+
+
+def make_tracks(directory: Path, count: int, frames: int) -> list:
+    """
+    создание беззвучных MP3 файлов
+    :param directory:
+    :param count:
+    :param frames: количество кадров в файле (один кадр ~26 мс)
+    :return: список путей
+    """
+    paths = []
+    for i in range(count):
+        path = directory / f'track_{i:03d}.mp3'
+        path.write_bytes(MP3_FRAME * frames)
+        paths.append(str(path))
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tracks', type=int, default=10, help='количество треков')
+    parser.add_argument('--frames', type=int, default=40, help='длина трека в кадрах MP3 (~26 мс)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = make_tracks(Path(directory), args.tracks, args.frames)
+        player = Player(metadata_cache_path=None)
+        player.AddSong(pb2.RequestSongPath(path=paths), None)
+        durations = [item.duration for item in player.playlist]
+
+        started = time.monotonic()
+        player.Play(None, None)
+        while len(player.transition_gaps) < args.tracks - 1:
+            time.sleep(0.001)
+        last_started = time.monotonic()
+
+    gaps = [gap * 1000 for gap in player.transition_gaps]
+    dead_air = (last_started - started - sum(durations[:-1])) / (args.tracks - 1) * 1000
+    print(f'треков: {args.tracks}, длительность трека: {durations[0]:.3f} с')
+    print(f'реакция на окончание трека, мс: среднее {statistics.mean(gaps):.2f}, '
+          f'медиана {statistics.median(gaps):.2f}, максимум {max(gaps):.2f}')
+    # отрицательное значение - декодер выдаёт чуть меньше звука, чем длительность по заголовку
+    print(f'пауза между треками по часам (относительно длительности по заголовку), мс: {dead_air:.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -7,15 +7,236 @@ from pathlib import Path
 import asyncio
 from asyncio import AbstractEventLoop
 import grpc
+from google.protobuf.field_mask_pb2 import FieldMask
 from player_server import player_pb2_grpc as pb2_grpc
 from player_server import player_pb2 as pb2
 import logging
+from collections import OrderedDict
+
+# период обновления позиции трека в потоке состояния плеера, с
+STATUS_HEARTBEAT = 1.0
+# пауза перед повторной подпиской на состояние плеера после обрыва, с
+RECONNECT_DELAY = 0.5
+# предельное время ожидания ответа на unary запрос к серверу, с
+CALL_TIMEOUT = 2.0
+# если в потоке состояния нет сообщений дольше этого времени, соединение считается потерянным, с
+STATUS_TIMEOUT = 3 * STATUS_HEARTBEAT
+
+# количество путей в одном сообщении потока AddSongs
+ADD_SONGS_CHUNK = 500
+
+# количество названий в одной странице плейлиста, запрашиваемой у сервера
+PLAYLIST_PAGE_SIZE = 200
+# сколько страниц названий хранить в кэше виджета плейлиста
+PLAYLIST_CACHED_PAGES = 20
+
+# поля снимка состояния плеера, нужные для обновления информации о треке
+SONG_INFO_MASK = FieldMask(paths=['title', 'duration', 'index', 'paused'])
 
 window = tkinter.Tk()
 window.title('Player')
 window.geometry('400x500')
 
 
+class VirtualPlaylist:
+    """
+    виртуализированный виджет плейлиста: Listbox содержит только видимые строки,
+    названия запрашиваются у сервера страницами при прокрутке и хранятся в небольшом кэше
+    """
+    # цвета строки активного трека
+    PLAYING_COLORS = dict(background='yellow', foreground='black', selectbackground='red', selectforeground='white')
+    DEFAULT_COLORS = dict(background='', foreground='', selectbackground='', selectforeground='')
+
+    def __init__(self, master, fetch_page, rows: int = 20, **options):
+        """
+        :param master: родительский элемент интерфейса
+        :param fetch_page: функция (offset, limit) -> список названий или None при ошибке
+        :param rows: количество видимых строк
+        :param options: параметры Listbox
+        """
+        self.fetch_page = fetch_page
+        self.rows = rows
+        self.total = 0 # количество треков в плейлисте
+        self.top = 0 # индекс трека в первой видимой строке
+        self.playing = -1 # индекс активного трека
+        self.selected = -1 # индекс выбранного трека
+        self.__pages = OrderedDict() # кэш страниц названий: номер страницы -> список названий
+        self.listbox = tkinter.Listbox(master, height=rows, exportselection=False, **options)
+        self.scrollbar = ttk.Scrollbar(master, orient='vertical', command=self.__on_scroll)
+        self.listbox.bind('<<ListboxSelect>>', self.__on_select)
+        self.listbox.bind('<MouseWheel>', lambda event: self.scroll(-1 if event.delta > 0 else 1))
+        self.listbox.bind('<Button-4>', lambda event: self.scroll(-1))
+        self.listbox.bind('<Button-5>', lambda event: self.scroll(1))
+
+    def reset(self, total: int, first_page: list = ()) -> None:
+        """
+        новый плейлист: сброс кэша и отрисовка видимого окна
+        :param total: количество треков
+        :param first_page: уже полученная первая страница названий
+        :return:
+        """
+        self.total = total
+        self.__pages.clear()
+        if first_page:
+            self.__pages[0] = list(first_page)
+        self.render()
+
+    def apply_edits(self, edits) -> None:
+        """
+        учёт изменений плейлиста: меняется количество треков, индексы выбранного и активного трека
+        и первой видимой строки сдвигаются вместе с треками, из кэша удаляются только страницы,
+        которые затронуты изменениями; перерисовывается только видимое окно
+        :param edits: список pb2.PlaylistEdit
+        :return:
+        """
+        for edit in edits:
+            if edit.kind == pb2.INSERTED:
+                self.total += edit.count
+                first, last = edit.index, None
+            elif edit.kind == pb2.DELETED:
+                self.total -= 1
+                first, last = edit.index, None
+            else:
+                first, last = sorted((edit.index, edit.to_index))
+            self.selected = self.shift(self.selected, edit)
+            self.playing = self.shift(self.playing, edit)
+            if edit.kind != pb2.MOVED and edit.index < self.top:
+                # вставка или удаление выше окна - окно остаётся на тех же треках
+                self.top = self.shift(self.top, edit)
+            # страницы с first по last (до конца плейлиста, если last - None) содержат другие треки
+            for page_number in list(self.__pages):
+                if (page_number + 1) * PLAYLIST_PAGE_SIZE > first and \
+                        (last is None or page_number * PLAYLIST_PAGE_SIZE <= last):
+                    del self.__pages[page_number]
+        self.render()
+
+    @staticmethod
+    def shift(index: int, edit) -> int:
+        """
+        новый индекс трека после изменения плейлиста
+        :param index: индекс трека до изменения (-1 - нет трека)
+        :param edit: pb2.PlaylistEdit
+        :return: -1, если трек удалён
+        """
+        if index < 0:
+            return index
+        if edit.kind == pb2.INSERTED:
+            return index + edit.count if index >= edit.index else index
+        if edit.kind == pb2.DELETED:
+            if index == edit.index:
+                return -1
+            return index - 1 if index > edit.index else index
+        # перемещение: удаление с позиции index и вставка на позицию to_index
+        if index == edit.index:
+            return edit.to_index
+        index -= index > edit.index
+        return index + (index >= edit.to_index)
+
+    def render(self) -> None:
+        """
+        отрисовка видимого окна строк
+        :return:
+        """
+        self.top = max(0, min(self.top, self.total - self.rows))
+        end = min(self.top + self.rows, self.total)
+        failed = set() # страницы, которые не удалось получить при этой отрисовке
+        self.listbox.delete(0, END)
+        self.listbox.insert(END, *[self.__title(index, failed) for index in range(self.top, end)])
+        if self.top <= self.playing < end:
+            self.listbox.itemconfig(self.playing - self.top, **self.PLAYING_COLORS)
+        if self.top <= self.selected < end:
+            self.listbox.select_set(self.selected - self.top)
+        if self.total:
+            self.scrollbar.set(self.top / self.total, end / self.total)
+        else:
+            self.scrollbar.set(0, 1)
+
+    def highlight(self, index: int) -> None:
+        """
+        отметка цветом активного трека - меняются не более двух видимых строк
+        :param index:
+        :return:
+        """
+        if self.top <= self.playing < self.top + self.listbox.size():
+            self.listbox.itemconfig(self.playing - self.top, **self.DEFAULT_COLORS)
+        self.playing = index
+        if self.top <= index < self.top + self.listbox.size():
+            self.listbox.itemconfig(index - self.top, **self.PLAYING_COLORS)
+
+    def select(self, index: int) -> None:
+        """
+        выбор трека по индексу
+        :param index:
+        :return:
+        """
+        self.selected = index
+        self.listbox.selection_clear(0, END)
+        if self.top <= index < self.top + self.listbox.size():
+            self.listbox.select_set(index - self.top)
+
+    def show(self, index: int) -> None:
+        """
+        прокрутка к треку (если он не виден - в середину окна) и его выбор
+        :param index:
+        :return:
+        """
+        if not self.top <= index < self.top + self.rows:
+            self.top = index - self.rows // 2
+            self.render()
+        self.select(index)
+
+    def selected_index(self) -> int:
+        # индекс выбранного трека в плейлисте (-1 - ничего не выбрано)
+        return self.selected
+
+    def scroll(self, rows: int) -> None:
+        """
+        прокрутка на заданное количество строк
+        :param rows:
+        :return:
+        """
+        self.top += rows
+        self.render()
+
+    def __on_scroll(self, command, value, units=None) -> None:
+        # обработка команд полосы прокрутки: 'moveto' доля / 'scroll' количество units|pages
+        if command == 'moveto':
+            self.top = int(float(value) * self.total)
+        elif command == 'scroll':
+            self.top += int(value) * (self.rows if units == 'pages' else 1)
+        self.render()
+
+    def __on_select(self, event=None) -> None:
+        selection = self.listbox.curselection()
+        if selection:
+            self.selected = self.top + selection[0]
+
+    def __title(self, index: int, failed: set) -> str:
+        """
+        название трека из кэша страниц; отсутствующая страница запрашивается у сервера.
+        Страница, которую не удалось получить, не кэшируется и запрашивается при следующей отрисовке
+        :param index:
+        :param failed: номера страниц, которые не удалось получить при текущей отрисовке
+        :return:
+        """
+        page_number = index // PLAYLIST_PAGE_SIZE
+        page = self.__pages.get(page_number)
+        if page is None:
+            if page_number in failed:
+                return ''
+            page = self.fetch_page(page_number * PLAYLIST_PAGE_SIZE, PLAYLIST_PAGE_SIZE)
+            if page is None:
+                failed.add(page_number)
+                return ''
+            self.__pages[page_number] = page
+            if len(self.__pages) > PLAYLIST_CACHED_PAGES:
+                self.__pages.popitem(last=False)
+        else:
+            self.__pages.move_to_end(page_number)
+        offset = index - page_number * PLAYLIST_PAGE_SIZE
+        return page[offset] if offset < len(page) else ''
+
+
 class PlayerGUI:
     """
     класс пользовательского интерфейса
@@ -25,18 +246,30 @@ class PlayerGUI:
         self.__last_path = '/'
         # элементы интерфейса
         self.playlist_widget = None
+        self.playlist_view = None
         self.prev_button = None
         self.play_button = None
         self.next_button = None
         self.info_playing = None
         self.progressbar = None
         self.status_label = None
+        self.search_entry = None
         # статус объекта
         self.running = False
         # цикл событий asyncio
         self.__async_loop = loop
         # циклическая задача
         self.get_event_task = None
+        # номер последнего полученного события плеера и эпоха (запуск) сервера, в которой он получен -
+        # для продолжения подписки после обрыва
+        self.status_sequence = 0
+        self.status_epoch = 0
+        # версия плейлиста, отображаемого в виджете (-1 - плейлист ещё не загружен), и её эпоха
+        self.playlist_version = -1
+        self.playlist_epoch = 0
+        # состояние плеера по последнему сообщению сервера
+        self.player_playing = False
+        self.player_paused = False
         # данные сервера
         self.host = '127.0.0.1'
         self.server_port = 50051
@@ -68,12 +301,17 @@ class PlayerGUI:
             """
             PLAYLIST
             """
+            search_frame = ttk.Frame(window)
+            self.search_entry = ttk.Entry(search_frame, width=30)
+            self.search_entry.bind('<Return>', self.find_in_playlist)
+            search_button = ttk.Button(search_frame, text='Find', command=self.find_in_playlist, width=5)
+
             playlist_frame = tkinter.Frame(window, relief='flat', border=2)
-            self.playlist_widget = tkinter.Listbox(playlist_frame, height=20, width=400, relief='flat')
-            playlist_scroll = ttk.Scrollbar(playlist_frame, orient='vertical')
-            playlist_scroll.configure(command=self.playlist_widget.yview)
-            self.playlist_widget.configure(background="skyblue4", foreground="white", font=('Aerial 13'),\
-                                           yscrollcommand=playlist_scroll.set)
+            self.playlist_view = VirtualPlaylist(playlist_frame, self.__fetch_playlist_page, rows=20,
+                                                 width=400, relief='flat', background="skyblue4",
+                                                 foreground="white", font=('Aerial 13'))
+            self.playlist_widget = self.playlist_view.listbox
+            playlist_scroll = self.playlist_view.scrollbar
             self.playlist_widget.bind('<Double-1>', self.play)
             self.progressbar.bind('<Button-1>', self.set_song_position)
             playlist_buttons_frame = ttk.Frame(playlist_frame, padding=10)
@@ -90,11 +328,14 @@ class PlayerGUI:
             info_frame.pack(side='bottom')
             progress_bar_frame.pack()
             status_frame.pack(side='top')
+            search_frame.pack(side='top')
             playlist_frame.pack(side='top', fill='y')
             playlist_buttons_frame.pack(side='bottom')
 
             add_button.pack(side='left')
             del_button.pack(side='left')
+            self.search_entry.pack(side='left')
+            search_button.pack(side='left')
             self.playlist_widget.pack(side='left', fill='both')
             playlist_scroll.pack(side='left', fill='both')
 
@@ -119,18 +360,18 @@ class PlayerGUI:
         Подключение к серверу
         :return:
         """
+        # канал переподключается сам - заглушка нужна и при недоступном сервере
+        self.channel = grpc.insecure_channel(
+            '{}:{}'.format(self.host, self.server_port))
+        self.stub = pb2_grpc.PlayerStub(self.channel)
         try:
-            self.channel = grpc.insecure_channel(
-                '{}:{}'.format(self.host, self.server_port))
             grpc.channel_ready_future(self.channel).result(timeout=1)
-            self.stub = pb2_grpc.PlayerStub(self.channel)
         except Exception as rpc_error:
             logging.warning(f"Отсутствует связь с сервером. {rpc_error}")
             self.status_label['text'] = 'Отсутствует связь с сервером'
             return False
         else:
             self.status_label['text'] = 'Онлайн'
-            self.running = True
             return True
 
     def set_song_position(self, event) -> None:
@@ -139,7 +380,7 @@ class PlayerGUI:
         :param event:
         :return:
         """
-        self.stub.SetPosition(pb2.RequestSongPosition(position=event.x))
+        self.stub.SetPosition(pb2.RequestSongPosition(position=event.x), timeout=CALL_TIMEOUT)
 
     def add_files_to_playlist(self):
         """
@@ -158,10 +399,19 @@ class PlayerGUI:
 
             if len(filenames):
                 # если файлы выбраны - добавить их на сервер
-                result = self.stub.AddSong(pb2.RequestSongPath(path=filenames))
+                # пути передаются потоком: сервер добавляет их по мере получения, время зависит от
+                # количества файлов, поэтому короткий CALL_TIMEOUT здесь не задаётся
+                result = self.stub.AddSongs(
+                    pb2.RequestSongPath(path=filenames[start:start + ADD_SONGS_CHUNK])
+                    for start in range(0, len(filenames), ADD_SONGS_CHUNK))
                 if not result.error:
                     self.__update_playlist_widget()
                     self.last_path = Path(filenames[-1]).parent
+                    if result.failed:
+                        # часть файлов не удалось прочитать - остальные добавлены
+                        self.status_label['text'] = f'Не добавлено файлов: {len(result.failed)}'
+                        for failed in result.failed:
+                            logging.warning(f"Ошибка добавления файла {failed.path}. {failed.error}")
                 else:
                     self.status_label['text'] = 'Ошибка добавления файла'
                     logging.warning(f"Ошибка добавления файла. {result.error}")
@@ -174,8 +424,8 @@ class PlayerGUI:
         :param event:
         :return:
         """
-        is_paused = self.stub.IsPaused(pb2.Empty()).result
-        if is_paused == 0:
+        # состояние известно из потока статуса - отдельный запрос IsPaused не нужен
+        if self.player_playing and not self.player_paused:
             self.pause()
         else:
             self.play()
@@ -185,8 +435,9 @@ class PlayerGUI:
         Приостановка воспроизведения
         :return:
         """
-        result = self.stub.Pause(pb2.Empty())
+        result = self.stub.Pause(pb2.RequestControl(), timeout=CALL_TIMEOUT)
         if not result.error:
+            self.player_paused = True
             # остановка прогрессбара
             self.progressbar.stop()
             self.play_button.configure(text=('>'))
@@ -200,13 +451,14 @@ class PlayerGUI:
         :param event:
         :return:
         """
-        # если в списке выбран трек - играть его
-        selected_item = self.playlist_widget.curselection()[0]
-        result = self.stub.Play(pb2.RequestSongIndex(index=selected_item))
+        # если в списке выбран трек - играть его, иначе первый
+        selected_item = max(self.playlist_view.selected_index(), 0)
+        result = self.stub.Play(pb2.RequestControl(index=selected_item, with_snapshot=True,
+                                                   snapshot_mask=SONG_INFO_MASK), timeout=CALL_TIMEOUT)
         if not result.error:
-            # обновить информацию о треке
+            # обновить информацию о треке из снимка состояния в ответе
             self.play_button.configure(text=('||'))
-            self.__update_song_info()
+            self.__update_song_info(result.snapshot)
         else:
             self.status_label['text'] = result.error
             logging.warning(result.error)
@@ -218,8 +470,9 @@ class PlayerGUI:
           :return:
           """
         # остановка воспроизведения на сервере
-        pb2.self.stub.Stop(pb2.Empty())
+        self.stub.Stop(pb2.RequestControl(), timeout=CALL_TIMEOUT)
         # оставновка цикличной задачи опроса сервера
+        self.running = False
         self.get_event_task.cancel()
 
     def play_next(self, event=None):
@@ -228,9 +481,9 @@ class PlayerGUI:
         :param event:
         :return:
         """
-        result = self.stub.Next(pb2.Empty())
+        result = self.stub.Next(pb2.RequestControl(with_snapshot=True, snapshot_mask=SONG_INFO_MASK), timeout=CALL_TIMEOUT)
         if not result.error:
-            self.__update_song_info()
+            self.__update_song_info(result.snapshot)
         else:
             self.status_label['text'] = result.error
             logging.warning(result.error)
@@ -241,9 +494,9 @@ class PlayerGUI:
          :param event:
          :return:
          """
-        result = self.stub.Prev(pb2.Empty())
+        result = self.stub.Prev(pb2.RequestControl(with_snapshot=True, snapshot_mask=SONG_INFO_MASK), timeout=CALL_TIMEOUT)
         if not result.error:
-            self.__update_song_info()
+            self.__update_song_info(result.snapshot)
         else:
             self.status_label['text'] = result.error
             logging.warning(result.error)
@@ -254,68 +507,156 @@ class PlayerGUI:
         :return:
         """
         # получение индекса выбранного трека
-        current_index = self.playlist_widget.curselection()[0]
+        current_index = self.playlist_view.selected_index()
+        if current_index < 0:
+            return
         # удаление
-        result = self.stub.DeleteSong(pb2.RequestSongIndex(index=current_index))
+        result = self.stub.DeleteSong(pb2.RequestSongIndex(index=current_index), timeout=CALL_TIMEOUT)
         if not result.error:
             self.__update_playlist_widget()
         else:
             self.status_label['text'] = result.error
             logging.warning(result.error)
 
-    def __update_song_info(self):
+    def find_in_playlist(self, event=None):
+        """
+        выбор следующего после выбранного трека, в названии которого есть введённый текст
+        (поиск выполняет сервер); после последнего совпадения поиск продолжается с начала
+        :param event:
+        :return:
+        """
+        query = self.search_entry.get().strip()
+        if not query:
+            return
+        start = self.playlist_view.selected_index() + 1
+        try:
+            result = self.stub.SearchPlaylist(pb2.RequestSearchPlaylist(query=query, offset=start, limit=1),
+                                              timeout=CALL_TIMEOUT)
+            if not result.error and not result.indexing and not result.index and start:
+                result = self.stub.SearchPlaylist(pb2.RequestSearchPlaylist(query=query, limit=1),
+                                                  timeout=CALL_TIMEOUT)
+        except grpc.RpcError as rpc_error:
+            logging.warning(f"Сбой запроса к серверу. {rpc_error!r}")
+            self.status_label['text'] = 'Отсутствует связь с сервером'
+            return
+        if result.indexing:
+            self.status_label['text'] = 'Индекс поиска строится, повторите поиск позже'
+        elif result.error:
+            self.status_label['text'] = result.error
+            logging.warning(result.error)
+        elif result.index:
+            self.playlist_view.show(result.index[0])
+        else:
+            self.status_label['text'] = f'"{query}" не найдено'
+
+    def __update_song_info(self, snapshot=None):
         """
         обновление элементов интерфейса с информацией о текущем треке
+        :param snapshot: снимок состояния плеера из ответа управляющего запроса;
+                         если не передан - запрашивается одним вызовом GetSnapshot
         :return:
         """
-        # получение информации с сервера
-        song_info = self.stub.PlayingSongInfo(pb2.Empty())
-        if not song_info.error:
+        if snapshot is None:
+            # получение информации с сервера
+            snapshot = self.stub.GetSnapshot(pb2.RequestSnapshot(mask=SONG_INFO_MASK), timeout=CALL_TIMEOUT)
+        if not snapshot.error:
             # обновление нформации на элементах интерфейса
-            self.info_playing['text'] = song_info.title
+            self.info_playing['text'] = snapshot.title
+            self.player_playing = snapshot.index >= 0
+            self.player_paused = snapshot.paused
 
-            duration = song_info.duration
+            duration = snapshot.duration
             self.duration['text'] = f'{int(duration//60)}:{int(duration%60):02d}'
 
             self.progressbar['maximum'] = int(duration)
 
-            song_index = self.stub.GetSongIndex(pb2.Empty())
-            if not song_index.error and song_index.index >= 0:
-                self.__select_item(song_index.index)
+            if snapshot.index >= 0:
+                self.__select_item(snapshot.index)
 
-                if song_index.index+1 == self.playlist_widget.size():
+                if snapshot.index+1 == self.playlist_view.total:
                     self.next_button["state"] = "disabled"
-                elif song_index.index == 0:
+                elif snapshot.index == 0:
                     self.prev_button["state"] = "disabled"
                 else:
                     self.next_button["state"] = "enable"
                     self.prev_button["state"] = "enable"
-            else:
-                self.status_label['text'] = song_info.error
-                logging.warning(song_info.error)
         else:
-            self.status_label['text'] = song_info.error
-            logging.warning(song_info.error)
+            self.status_label['text'] = snapshot.error
+            logging.warning(snapshot.error)
 
     def __update_playlist_widget(self):
         """
-        обновить информацию в виджете плейлиста
+        обновить информацию в виджете плейлиста: загружаются только изменения после
+        известной клиенту версии; весь плейлист - только если сервер не может их выдать
+        :return:
+        """
+        delta = self.stub.GetPlaylistDelta(pb2.RequestPlaylistDelta(version=self.playlist_version,
+                                                                    epoch=self.playlist_epoch, counts_only=True),
+                                           timeout=CALL_TIMEOUT)
+        self.__apply_playlist_delta(delta, self.playlist_version)
+
+    def __apply_playlist_delta(self, delta, version):
+        """
+        применение изменений плейлиста к виджету
+        :param delta: ответ GetPlaylistDelta
+        :param version: версия плейлиста, для которой запрошены изменения
+        :return:
+        """
+        if version != self.playlist_version:
+            # пока ответ был в пути, виджет уже обновлён другим запросом - изменения запрашиваются заново
+            self.__update_playlist_widget()
+        elif delta.error:
+            self.status_label['text'] = delta.error
+            logging.warning(delta.error)
+        elif delta.reset:
+            self.__reload_playlist_widget()
+        else:
+            # изменения меняют только количество строк и видимое окно виджета
+            self.playlist_view.apply_edits(delta.edits)
+            self.playlist_version = delta.version
+            self.playlist_epoch = delta.epoch
+            if delta.edits and delta.playing >= 0:
+                self.__select_item(delta.playing)
+
+    def __reload_playlist_widget(self):
+        """
+        загрузить плейлист в виджет заново: с сервера запрашиваются размер плейлиста
+        и первая страница названий, остальные страницы - при прокрутке
         :return:
         """
-        # очитска виджета
-        self.playlist_widget.delete(0,END)
-        # получение плейлиста с сервера
-        songs_list = self.stub.GetPlayList(pb2.Empty())
-        if not songs_list.error:
-            # добавление треков на виджет и отметка активного трека
-            self.playlist_widget.insert('end', *songs_list.song_title)
-            if(len(songs_list.song_title) and songs_list.playing >= 0):
-                self.__select_item(songs_list.playing)
+        page = self.stub.GetPlayListRange(pb2.RequestPlaylistRange(offset=0, limit=PLAYLIST_PAGE_SIZE), timeout=CALL_TIMEOUT)
+        if not page.error:
+            self.playlist_version = page.version
+            self.playlist_epoch = page.epoch
+            self.playlist_view.reset(page.total, page.song_title)
+            # отметка активного трека
+            if page.total and page.playing >= 0:
+                self.__select_item(page.playing)
             else:
-                self.playlist_widget.select_set(0)
+                self.playlist_view.select(0)
         else:
-            self.status_label['text'] = songs_list.error
-            logging.warning(songs_list.error)
+            self.status_label['text'] = page.error
+            logging.warning(page.error)
+
+    def __fetch_playlist_page(self, offset, limit) -> list:
+        """
+        получение страницы названий треков с сервера для виджета плейлиста
+        :param offset:
+        :param limit:
+        :return: список названий или None при ошибке
+        """
+        try:
+            page = self.stub.GetPlayListRange(pb2.RequestPlaylistRange(offset=offset, limit=limit),
+                                              timeout=CALL_TIMEOUT)
+        except grpc.RpcError as rpc_error:
+            logging.warning(f"Сбой запроса к серверу. {rpc_error!r}")
+            self.status_label['text'] = 'Отсутствует связь с сервером'
+            return None
+        if page.error:
+            self.status_label['text'] = page.error
+            logging.warning(page.error)
+            return None
+        return list(page.song_title)
 
     def __select_item(self, index):
         """
@@ -323,50 +664,109 @@ class PlayerGUI:
         :param index:
         :return:
         """
-        for i in range(self.playlist_widget.size()):
-            self.playlist_widget.itemconfig(i,
-                                        background='',
-                                        foreground='',
-                                        selectbackground='',
-                                        selectforeground='')
-        self.playlist_widget.itemconfig(index,
-                                        background='yellow',
-                                        foreground='black',
-                                        selectbackground='red',
-                                        selectforeground='white')
+        self.playlist_view.highlight(index)
 
     async def __get_event(self):
         """
-        цикличный запрос состояния объекта плеера
+        подписка на состояние объекта плеера: сервер присылает сообщение при изменении состояния
+        и раз в STATUS_HEARTBEAT секунд для обновления позиции трека.
+        Выполняется в потоке цикла asyncio через асинхронный канал grpc.aio и не блокирует его:
+        элементы интерфейса обновляются в потоке tkinter через window.after
         :return:
         """
-        while not self.running:
-            # подключение к серверу
-            self.__connect_to_server()
-
-        while self.running:
-            # проверка статуса плеера-сервера и обновление элементов интерфейса
-            for response in player_gui.stub.GetPlayerStatus(pb2.Empty()):
-                if not response.error:
-                    if pb2.NEW_SONG in response.status:
-                        self.__update_song_info()
-                    if pb2.PLAYING in response.status:
-                        self.play_button.configure(text=('||', '>')[pb2.PAUSED in response.status])
-                    elif pb2.WAITING in response.status:
-                        self.playlist_widget.select_set(0)
-                    if response.position >= 0:
-                        self.progressbar['value'] = response.position
-                        self.playing_time['text'] = f'{int(response.position//60)}:{int(response.position%60):02d}'
-                else:
-                    self.status_label['text'] = response.error
-                    logging.warning(response.error)
-            # повторять каждые полсекунды
-            await asyncio.sleep(0.5)
+        async with grpc.aio.insecure_channel(f'{self.host}:{self.server_port}') as channel:
+            stub = pb2_grpc.PlayerStub(channel)
+            while self.running:
+                request = pb2.RequestPlayerStatus(heartbeat=STATUS_HEARTBEAT, from_sequence=self.status_sequence,
+                                                  epoch=self.status_epoch)
+                call = stub.GetPlayerStatus(request, wait_for_ready=True)
+                try:
+                    while True:
+                        # сообщения приходят не реже раза в STATUS_HEARTBEAT - иначе связь потеряна
+                        response = await asyncio.wait_for(call.read(), STATUS_TIMEOUT)
+                        if response is grpc.aio.EOF:
+                            break
+                        await self.__handle_status(stub, response)
+                except (grpc.RpcError, asyncio.TimeoutError) as rpc_error:
+                    logging.warning(f"Поток состояния плеера прерван. {rpc_error!r}")
+                    window.after(0, self.__set_status_text, 'Отсутствует связь с сервером')
+                finally:
+                    call.cancel()
+                # переподключение к потоку состояния после обрыва
+                await asyncio.sleep(RECONNECT_DELAY)
+
+    async def __handle_status(self, stub, response):
+        """
+        обработка сообщения о состоянии плеера: данные, нужные для обновления интерфейса,
+        запрашиваются асинхронно, сам интерфейс обновляется в потоке tkinter
+        :param stub: асинхронная заглушка сервера
+        :param response: ResponsePlayerStatus
+        :return:
+        """
+        self.status_sequence = response.sequence
+        self.status_epoch = response.epoch
+        version, epoch = self.playlist_version, self.playlist_epoch
+        delta = snapshot = None
+        if not response.error:
+            # плейлист ещё не загружен (сервер был недоступен при запуске) - загрузить
+            if pb2.PLAYLIST_CHANGED in response.status or version < 0:
+                delta = await self.__call(stub.GetPlaylistDelta,
+                                          pb2.RequestPlaylistDelta(version=version, epoch=epoch,
+                                                                   counts_only=True))
+            if pb2.NEW_SONG in response.status:
+                snapshot = await self.__call(stub.GetSnapshot, pb2.RequestSnapshot(mask=SONG_INFO_MASK))
+        window.after(0, self.__apply_status, response, delta, version, snapshot)
+
+    @staticmethod
+    async def __call(method, request):
+        """
+        асинхронный unary запрос с ограничением времени ожидания
+        :param method: метод асинхронной заглушки
+        :param request:
+        :return: ответ сервера или None при ошибке
+        """
+        try:
+            return await method(request, timeout=CALL_TIMEOUT)
+        except grpc.RpcError as rpc_error:
+            logging.warning(f"Сбой запроса к серверу. {rpc_error!r}")
+            return None
+
+    def __apply_status(self, response, delta, version, snapshot):
+        """
+        обновление элементов интерфейса по сообщению о состоянии плеера (в потоке tkinter)
+        :param response: ResponsePlayerStatus
+        :param delta: изменения плейлиста или None
+        :param version: версия плейлиста, для которой запрошены изменения
+        :param snapshot: снимок состояния плеера или None
+        :return:
+        """
+        if response.error:
+            self.__set_status_text(response.error)
+            logging.warning(response.error)
+            return
+        self.__set_status_text('Онлайн')
+        self.player_playing = pb2.PLAYING in response.status
+        self.player_paused = pb2.PAUSED in response.status
+        if delta is not None:
+            self.__apply_playlist_delta(delta, version)
+        if snapshot is not None:
+            self.__update_song_info(snapshot)
+        if pb2.PLAYING in response.status:
+            self.play_button.configure(text=('||', '>')[pb2.PAUSED in response.status])
+        elif pb2.WAITING in response.status:
+            self.playlist_view.select(0)
+        if response.position >= 0:
+            self.progressbar['value'] = response.position
+            self.playing_time['text'] = f'{int(response.position//60)}:{int(response.position%60):02d}'
+
+    def __set_status_text(self, text):
+        if self.status_label is not None:
+            self.status_label['text'] = text
 
     def get_player_events(self):
-        # запустить задачу в цикле событий asyncio
-        self.get_event_task = self.__async_loop.create_task(self.__get_event())
-        result = asyncio.gather(self.get_event_task)
+        # запустить задачу в цикле событий asyncio (из другого потока - потокобезопасно)
+        self.running = True
+        self.get_event_task = asyncio.run_coroutine_threadsafe(self.__get_event(), self.__async_loop)
 
 
 class ThreadedEventLoop(Thread):
@@ -0,0 +1,314 @@
+import asyncio
+from concurrent import futures
+from typing import Optional
+
+import grpc
+import player_server.player_pb2_grpc as pb2_grpc
+import player_server.player_pb2 as pb2
+from player_server.player import Player, status_heartbeat, PLAYLIST_PAGE_LIMIT, ADD_SONGS_BATCH
+from player_server.audio import AudioBackend
+from player_server.metrics import CountingExecutor, start_metrics_server
+from player_server.snapshot import DEFAULT_SNAPSHOT_PATH
+from player_server.interceptors import AsyncMetricsInterceptor, error_response
+from player_server.sessions import PlayerSessions, session_id, SERVER_METHODS
+
+# количество потоков для блокирующих вызовов (pygame.mixer, mutagen, SQLite)
+BLOCKING_WORKERS = 10
+
+
+def run_in_executor(name: str):
+    """
+    обработчик unary RPC, который выполняет синхронный метод Player в пуле потоков,
+    не блокируя цикл событий asyncio. Во время сеанса профилирования метод выполняется через Profiler
+    :param name: имя метода Player
+    :return:
+    """
+    async def handler(self, request, context):
+        loop = asyncio.get_running_loop()
+        method = getattr(self.player, name)
+        profiler = self.player.profiler
+        if profiler.active:
+            return await loop.run_in_executor(self.executor, profiler.call, name, method, request, context)
+        return await loop.run_in_executor(self.executor, method, request, context)
+    handler.__name__ = name
+    return handler
+
+
+class AsyncPlayer(pb2_grpc.PlayerServicer):
+    """
+    асинхронная обёртка над Player для сервера grpc.aio. Unary вызовы выполняются в пуле потоков,
+    потоки состояния ждут события в цикле asyncio - подписка не занимает поток
+    """
+
+    def __init__(self, player: Player, executor: futures.Executor,
+                 loop: Optional[asyncio.AbstractEventLoop] = None):
+        """
+        :param player:
+        :param executor: пул потоков для блокирующих вызовов
+        :param loop: цикл событий сервера (по умолчанию - текущий)
+        """
+        self.player = player
+        self.executor = executor
+        self.__loop = loop or asyncio.get_running_loop()
+        # future, который завершается при записи следующего события в журнал плеера
+        self.__published: asyncio.Future = self.__loop.create_future()
+        player.events.add_listener(self.__on_published)
+
+    def __on_published(self, sequence: int) -> None:
+        # вызывается в потоке, записавшем событие
+        try:
+            self.__loop.call_soon_threadsafe(self.__wake)
+        except RuntimeError:
+            # цикл событий уже закрыт (остановка сервера)
+            pass
+
+    def __wake(self) -> None:
+        # пробуждение всех подписчиков одним future - O(1) на событие со стороны журнала
+        published, self.__published = self.__published, self.__loop.create_future()
+        published.set_result(None)
+
+    AddSong = run_in_executor('AddSong')
+    DeleteSong = run_in_executor('DeleteSong')
+    MoveSong = run_in_executor('MoveSong')
+    Play = run_in_executor('Play')
+    Pause = run_in_executor('Pause')
+    Stop = run_in_executor('Stop')
+    Next = run_in_executor('Next')
+    Prev = run_in_executor('Prev')
+    SetPosition = run_in_executor('SetPosition')
+    IsPaused = run_in_executor('IsPaused')
+    PlayingSongInfo = run_in_executor('PlayingSongInfo')
+    GetSongIndex = run_in_executor('GetSongIndex')
+    GetSnapshot = run_in_executor('GetSnapshot')
+    GetPlayList = run_in_executor('GetPlayList')
+    GetPlayListRange = run_in_executor('GetPlayListRange')
+    GetPlaylistDelta = run_in_executor('GetPlaylistDelta')
+    GetMetrics = run_in_executor('GetMetrics')
+    StartProfiling = run_in_executor('StartProfiling')
+    SearchPlaylist = run_in_executor('SearchPlaylist')
+
+    async def GetPlayerStatus(self, request, context):
+        """
+        Подписка на состояние плеера (см. Player.GetPlayerStatus); ожидание событий без потоков
+        :param request:
+        :param context:
+        :return: поток ResponsePlayerStatus
+        """
+        events_log = self.player.events
+        heartbeat = status_heartbeat(request)
+        # курсор подписчика в журнале событий
+        sequence, resumed = self.player.status_cursor(request)
+        send = True
+        next_heartbeat = self.__loop.time()
+        while True:
+            published = self.__published
+            if not send and events_log.last_sequence == sequence:
+                timeout = max(next_heartbeat - self.__loop.time(), 0) if heartbeat > 0 else None
+                try:
+                    await asyncio.wait_for(asyncio.shield(published), timeout)
+                except asyncio.TimeoutError:
+                    pass
+            events, last_sequence, lost = events_log.read(sequence)
+            if send:
+                lost = lost or not resumed
+            now = self.__loop.time()
+            if not (send or events or lost or (heartbeat > 0 and now >= next_heartbeat)):
+                continue
+            yield self.player.status_message(events, last_sequence, lost)
+            sequence = last_sequence
+            send = False
+            next_heartbeat = now + heartbeat
+
+    async def AddSongs(self, request_iterator, context):
+        """
+        Добавление треков из потока запросов (см. Player.AddSongs); пакеты добавляются в пуле потоков
+        :param request_iterator:
+        :param context:
+        :return: ResponseAddSong
+        """
+        added, failed, batch = 0, [], []
+        try:
+            async for request in request_iterator:
+                batch.extend(request.path)
+                while len(batch) >= ADD_SONGS_BATCH:
+                    batch_added, batch_failed = await self.__loop.run_in_executor(
+                        self.executor, self.player.add_paths, batch[:ADD_SONGS_BATCH])
+                    del batch[:ADD_SONGS_BATCH]
+                    added += batch_added
+                    failed += batch_failed
+            if batch:
+                batch_added, batch_failed = await self.__loop.run_in_executor(
+                    self.executor, self.player.add_paths, batch)
+                added += batch_added
+                failed += batch_failed
+        except Exception as err:
+            return pb2.ResponseAddSong(error=f'Ошибка добавления файла. {err}', added=added,
+                                       failed=[pb2.SongError(path=path, error=error) for path, error in failed])
+        return pb2.ResponseAddSong(added=added,
+                                   failed=[pb2.SongError(path=path, error=error) for path, error in failed])
+
+    async def ImportDirectory(self, request, context):
+        """
+        Импорт дерева каталогов (см. Player.import_directory); каждый пакет обрабатывается в пуле потоков
+        :param request:
+        :param context:
+        :return: поток ImportProgress
+        """
+        cancelled = False
+        progress = self.player.import_directory(request, lambda: not cancelled)
+        try:
+            while (message := await self.__loop.run_in_executor(self.executor, next, progress, None)) is not None:
+                yield message
+        finally:
+            # импорт остановится после текущего пакета
+            cancelled = True
+
+    async def StreamPlayList(self, request, context):
+        """
+        Передача плейлиста частями (см. Player.StreamPlayList); каждая часть формируется в пуле потоков
+        :param request:
+        :param context:
+        :return: поток ResponsePlaylist
+        """
+        chunk_size = min(request.chunk_size or PLAYLIST_PAGE_LIMIT, PLAYLIST_PAGE_LIMIT)
+        offset = request.offset
+        end = offset + request.limit if request.limit else None
+        while True:
+            limit = chunk_size if end is None else min(chunk_size, end - offset)
+            try:
+                chunk = await self.__loop.run_in_executor(self.executor, self.player.playlist_page, offset, limit)
+            except Exception as err:
+                yield pb2.ResponsePlaylist(error=f'Ошибка получения плейлиста. {err}')
+                return
+            yield chunk
+            offset += len(chunk.song_title)
+            if not chunk.song_title or offset >= chunk.total or offset == end:
+                return
+
+
+def session_call(name: str):
+    """
+    обработчик RPC с одним ответом, который вызывает метод name AsyncPlayer сеанса из метаданных запроса
+    :param name: имя метода
+    :return:
+    """
+    async def handler(self, request, context):
+        session = '' if name in SERVER_METHODS else session_id(context)
+        try:
+            player = await self.acquire(session)
+        except Exception as err:
+            return error_response(name, f'Ошибка выбора сеанса плеера. {err}')
+        try:
+            return await getattr(player, name)(request, context)
+        finally:
+            self.sessions.release(session)
+    handler.__name__ = name
+    return handler
+
+
+def session_stream(name: str):
+    """
+    то же для методов с потоком ответов; сеанс занят, пока открыт поток
+    :param name: имя метода
+    :return:
+    """
+    async def handler(self, request, context):
+        session = '' if name in SERVER_METHODS else session_id(context)
+        try:
+            player = await self.acquire(session)
+        except Exception as err:
+            yield error_response(name, f'Ошибка выбора сеанса плеера. {err}')
+            return
+        responses = getattr(player, name)(request, context)
+        try:
+            async for response in responses:
+                yield response
+        finally:
+            await responses.aclose()
+            self.sessions.release(session)
+    handler.__name__ = name
+    return handler
+
+
+class AsyncSessionPlayer(pb2_grpc.PlayerServicer):
+    """
+    сервис Player сервера grpc.aio, направляющий каждый запрос AsyncPlayer его сеанса (PlayerSessions).
+    Новый сеанс создаётся в пуле потоков - восстановление снимка не задерживает цикл событий
+    """
+
+    def __init__(self, sessions: PlayerSessions, executor: futures.Executor):
+        self.sessions = sessions
+        self.executor = executor
+
+    async def acquire(self, session: str) -> AsyncPlayer:
+        # объект сеанса для вызова (см. PlayerSessions.acquire); после вызова - sessions.release
+        player = self.sessions.acquire(session, create=False)
+        if player is not None:
+            return player
+        acquired = asyncio.get_running_loop().run_in_executor(self.executor, self.sessions.acquire, session)
+        try:
+            return await asyncio.shield(acquired)
+        except asyncio.CancelledError:
+            # вызов отменён, пока сеанс создавался - сеанс освобождается после создания
+            acquired.add_done_callback(
+                lambda done: done.exception() is None and self.sessions.release(session))
+            raise
+
+    AddSong = session_call('AddSong')
+    AddSongs = session_call('AddSongs')
+    ImportDirectory = session_stream('ImportDirectory')
+    DeleteSong = session_call('DeleteSong')
+    MoveSong = session_call('MoveSong')
+    Play = session_call('Play')
+    Pause = session_call('Pause')
+    Stop = session_call('Stop')
+    Next = session_call('Next')
+    Prev = session_call('Prev')
+    SetPosition = session_call('SetPosition')
+    IsPaused = session_call('IsPaused')
+    PlayingSongInfo = session_call('PlayingSongInfo')
+    GetSongIndex = session_call('GetSongIndex')
+    GetSnapshot = session_call('GetSnapshot')
+    GetPlayerStatus = session_stream('GetPlayerStatus')
+    GetPlayList = session_call('GetPlayList')
+    GetPlayListRange = session_call('GetPlayListRange')
+    StreamPlayList = session_stream('StreamPlayList')
+    GetPlaylistDelta = session_call('GetPlaylistDelta')
+    SearchPlaylist = session_call('SearchPlaylist')
+    GetMetrics = session_call('GetMetrics')
+    StartProfiling = session_call('StartProfiling')
+
+
+async def serve_aio(address: str = '[::]:50051', blocking_workers: int = BLOCKING_WORKERS,
+                    audio: Optional[AudioBackend] = None, metrics_port: int = 0,
+                    snapshot_path=DEFAULT_SNAPSHOT_PATH):
+    """
+    запуск асинхронного сервера
+    :param address:
+    :param blocking_workers: количество потоков для блокирующих вызовов
+    :param audio: звуковой модуль (по умолчанию pygame.mixer)
+    :param metrics_port: порт HTTP сервера метрик Prometheus (0 - не запускать)
+    :param snapshot_path: файл снимка плейлиста (None - не сохранять)
+    :return:
+    """
+    executor = CountingExecutor(max_workers=blocking_workers, thread_name_prefix='blocking')
+    # Player создаётся до запуска сервера в основном потоке (инициализация pygame)
+    player = Player(audio=audio, snapshot_path=snapshot_path)
+    # запросы с идентификатором сеанса в метаданных выполняют отдельные плееры (см. PlayerSessions)
+    loop = asyncio.get_running_loop()
+    sessions = PlayerSessions(player, snapshot_path,
+                              wrap=lambda session_player: AsyncPlayer(session_player, executor, loop))
+    # блокирующие вызовы, ожидающие свободного потока
+    player.metrics.gauge('executor_queue_depth', lambda: executor.pending)
+    server = grpc.aio.server(interceptors=[AsyncMetricsInterceptor(player.metrics)])
+    pb2_grpc.add_PlayerServicer_to_server(AsyncSessionPlayer(sessions, executor), server)
+    server.add_insecure_port(address)
+    if metrics_port:
+        start_metrics_server(player.metrics, metrics_port)
+    await server.start()
+    try:
+        await server.wait_for_termination()
+    finally:
+        # при остановке сервера сохраняется и точная позиция трека
+        sessions.save_state()
+        await server.stop(None)
@@ -0,0 +1,259 @@
+import time
+from abc import ABC, abstractmethod
+from threading import Condition
+from typing import Optional
+
+import pygame
+from pygame import mixer
+from mutagen.mp3 import MP3
+
+# тип события pygame об окончании трека
+TRACK_END_EVENT = pygame.USEREVENT + 1
+
+
+class AudioBackend(ABC):
+    """
+    интерфейс звукового модуля плеера. Методы управления вызываются только из потока команд плеера,
+    wait_track_end - из отдельного потока ожидания окончания трека
+    """
+
+    @abstractmethod
+    def init(self) -> None:
+        """
+        инициализация модуля; исключение - звук недоступен
+        :return:
+        """
+
+    @abstractmethod
+    def load(self, path) -> None:
+        ...
+
+    @abstractmethod
+    def play(self, start: float = 0.0) -> None:
+        """
+        запуск загруженного трека
+        :param start: позиция начала, с
+        :return:
+        """
+
+    @abstractmethod
+    def pause(self) -> None:
+        ...
+
+    @abstractmethod
+    def unpause(self) -> None:
+        ...
+
+    @abstractmethod
+    def stop(self) -> None:
+        ...
+
+    @abstractmethod
+    def position(self) -> float:
+        """
+        время проигрывания с последнего запуска трека, с
+        :return:
+        """
+
+    @abstractmethod
+    def busy(self) -> bool:
+        """
+        проигрывается ли трек (на паузе - нет)
+        :return:
+        """
+
+    @abstractmethod
+    def wait_track_end(self) -> bool:
+        """
+        блокирующее ожидание события окончания трека. Событие может приходить и при остановке
+        трека (см. Player.__track_ended)
+        :return: True - событие получено, False - модуль завершён
+        """
+
+    @abstractmethod
+    def close(self) -> None:
+        """
+        завершение модуля (Player.close): ожидающий wait_track_end возвращает False
+        :return:
+        """
+
+
+class PygameBackend(AudioBackend):
+    """
+    проигрывание через pygame.mixer
+    """
+
+    def init(self) -> None:
+        pygame.init() # модуль для проигрывания файлов
+        mixer.music.set_endevent(TRACK_END_EVENT) # какое событие будет получено при окончании песни
+
+    def load(self, path) -> None:
+        mixer.music.load(path)
+
+    def play(self, start: float = 0.0) -> None:
+        mixer.music.play(start=start)
+
+    def pause(self) -> None:
+        mixer.music.pause()
+
+    def unpause(self) -> None:
+        mixer.music.unpause()
+
+    def stop(self) -> None:
+        mixer.music.stop()
+
+    def position(self) -> float:
+        return mixer.music.get_pos() / 1000
+
+    def busy(self) -> bool:
+        return mixer.music.get_busy()
+
+    def close(self) -> None:
+        pygame.quit()
+
+    def wait_track_end(self) -> bool:
+        try:
+            while pygame.event.wait().type != TRACK_END_EVENT:
+                pass
+        except pygame.error:
+            # модуль pygame завершён (остановка сервера)
+            return False
+        return True
+
+
+class SimulatedClock:
+    """
+    управляемые часы для HeadlessBackend. При speed=None время идёт только через advance(),
+    иначе - вместе с реальным временем, ускоренным в speed раз
+    """
+
+    def __init__(self, speed: Optional[float] = None):
+        self.speed = speed
+        self.changed = Condition() # уведомляет ожидающих при переводе часов
+        self.__offset = 0.0 # время, добавленное через advance()
+        self.__started = time.monotonic()
+
+    def now(self) -> float:
+        elapsed = (time.monotonic() - self.__started) * self.speed if self.speed else 0.0
+        return self.__offset + elapsed
+
+    def advance(self, seconds: float) -> None:
+        """
+        перевод часов вперёд
+        :param seconds:
+        :return:
+        """
+        with self.changed:
+            self.__offset += seconds
+            self.changed.notify_all()
+
+    def wait(self, seconds: Optional[float]) -> None:
+        """
+        ожидание (вызывается под self.changed) до перевода часов или, если часы идут сами,
+        до момента, когда пройдёт seconds по этим часам
+        :param seconds: None - без ограничения
+        :return:
+        """
+        timeout = seconds / self.speed if self.speed and seconds is not None else None
+        self.changed.wait(timeout)
+
+
+class HeadlessBackend(AudioBackend):
+    """
+    имитация проигрывания без звукового устройства: позиция и окончание трека вычисляются
+    по часам SimulatedClock. Длительность трека берётся из заголовка файла или из duration_of
+    """
+
+    def __init__(self, clock: Optional[SimulatedClock] = None, duration_of=None):
+        """
+        :param clock: часы (по умолчанию - идущие с реальной скоростью)
+        :param duration_of: функция путь -> длительность трека, с
+        """
+        self.clock = clock or SimulatedClock(speed=1.0)
+        self.duration_of = duration_of or (lambda path: MP3(path).info.length)
+        self.__changed = self.clock.changed
+        self.__duration = 0.0 # длительность загруженного трека
+        self.__started: Optional[float] = None # время часов, соответствующее началу трека (None - остановлен)
+        self.__played_from = 0.0 # время часов последнего запуска (для position)
+        self.__paused_at: Optional[float] = None # время часов постановки на паузу
+        self.__closed = False
+
+    def init(self) -> None:
+        pass
+
+    def load(self, path) -> None:
+        duration = self.duration_of(path)
+        with self.__changed:
+            self.__stop()
+            self.__duration = duration
+
+    def play(self, start: float = 0.0) -> None:
+        with self.__changed:
+            now = self.clock.now()
+            self.__started = now - start
+            self.__played_from = now
+            self.__paused_at = None
+            self.__changed.notify_all()
+
+    def pause(self) -> None:
+        with self.__changed:
+            if self.__started is not None and self.__paused_at is None:
+                self.__paused_at = self.clock.now()
+
+    def unpause(self) -> None:
+        with self.__changed:
+            if self.__paused_at is not None:
+                paused = self.clock.now() - self.__paused_at
+                self.__started += paused
+                self.__played_from += paused
+                self.__paused_at = None
+                self.__changed.notify_all()
+
+    def stop(self) -> None:
+        with self.__changed:
+            self.__stop()
+
+    def __stop(self) -> None:
+        self.__started = self.__paused_at = None
+        self.__changed.notify_all()
+
+    def position(self) -> float:
+        with self.__changed:
+            if self.__started is None:
+                return 0.0
+            now = self.__paused_at if self.__paused_at is not None else self.clock.now()
+            return min(now, self.__started + self.__duration) - self.__played_from
+
+    def busy(self) -> bool:
+        with self.__changed:
+            return (self.__started is not None and self.__paused_at is None
+                    and self.clock.now() < self.__started + self.__duration)
+
+    def remaining(self) -> Optional[float]:
+        """
+        сколько осталось до окончания проигрываемого трека (для перевода часов в нагрузочных тестах)
+        :return: секунды или None, если трек не проигрывается
+        """
+        with self.__changed:
+            if self.__started is None or self.__paused_at is not None:
+                return None
+            return max(self.__started + self.__duration - self.clock.now(), 0.0)
+
+    def close(self) -> None:
+        with self.__changed:
+            self.__closed = True
+            self.__changed.notify_all()
+
+    def wait_track_end(self) -> bool:
+        with self.__changed:
+            while not self.__closed:
+                if self.__started is not None and self.__paused_at is None:
+                    left = self.__started + self.__duration - self.clock.now()
+                    if left <= 0:
+                        # трек доигран - модуль остановлен, как pygame.mixer
+                        self.__started = None
+                        return True
+                    self.clock.wait(left)
+                else:
+                    self.clock.wait(None)
+        return False
@@ -0,0 +1,118 @@
+from concurrent.futures import Future
+from queue import SimpleQueue, Empty
+from threading import Lock, Thread, current_thread
+
+# сколько команд из очереди выполняется подряд до публикации нового снимка состояния
+COMMAND_BATCH_LIMIT = 64
+
+
+class CommandQueue:
+    """
+    очередь команд с единственным потоком-исполнителем. Все изменения состояния плеера
+    выполняются в этом потоке по очереди, поэтому не требуют блокировок. После пакета команд
+    вызывается publish - публикация неизменяемого снимка состояния для читающих потоков;
+    результаты команд пакета становятся доступны только после публикации
+    """
+
+    def __init__(self, publish, batch_limit: int = COMMAND_BATCH_LIMIT, delegate=None):
+        """
+        :param publish: функция без аргументов, публикующая снимок состояния (вызывается в потоке команд)
+        :param batch_limit: максимальное количество команд между публикациями
+        :param delegate: функция (run, command, *args), через которую call передаёт команду в поток
+                         команд: run(command, *args) ставит команду в очередь и ждёт результат
+                         (например, Profiler.delegate - профилирование команды в потоке команд)
+        """
+        self.publish = publish
+        self.batch_limit = batch_limit
+        self.delegate = delegate
+        self.executed = 0 # количество выполненных команд
+        self.batches = 0 # количество публикаций снимка состояния
+        self.__queue = SimpleQueue()
+        self.__closed = False
+        self.__lock = Lock() # постановка в очередь и закрытие
+        self.__thread = Thread(target=self.__run, name='commands', daemon=True)
+        self.__thread.start()
+
+    @property
+    def pending(self) -> int:
+        # количество команд, ожидающих выполнения
+        return self.__queue.qsize()
+
+    def submit(self, command, *args) -> Future:
+        """
+        постановка команды в очередь
+        :param command:
+        :param args:
+        :return: Future с результатом команды
+        """
+        future = Future()
+        with self.__lock:
+            if self.__closed:
+                raise RuntimeError('очередь команд закрыта')
+            self.__queue.put((future, command, args))
+        return future
+
+    def close(self) -> None:
+        """
+        остановка потока команд: команды, поставленные до закрытия, выполняются,
+        новые не принимаются (submit и call вызывают RuntimeError)
+        :return:
+        """
+        with self.__lock:
+            if self.__closed:
+                return
+            self.__closed = True
+            self.__queue.put(None)
+        if current_thread() is not self.__thread:
+            self.__thread.join()
+
+    def call(self, command, *args):
+        """
+        выполнение команды с ожиданием результата. Вызов из самой команды выполняется сразу,
+        иначе поток команд ждал бы сам себя
+        :param command:
+        :param args:
+        :return: результат команды
+        """
+        if current_thread() is self.__thread:
+            return command(*args)
+        if self.delegate is not None:
+            return self.delegate(self.__wait, command, *args)
+        return self.__wait(command, *args)
+
+    def __wait(self, command, *args):
+        return self.submit(command, *args).result()
+
+    def __run(self) -> None:
+        closed = False
+        while not closed:
+            batch = [self.__queue.get()]
+            # команды, накопившиеся за время выполнения предыдущего пакета, выполняются одним пакетом
+            while len(batch) < self.batch_limit:
+                try:
+                    batch.append(self.__queue.get_nowait())
+                except Empty:
+                    break
+            # None - закрытие очереди, после него команд нет
+            if batch[-1] is None:
+                batch.pop()
+                closed = True
+            results = []
+            for future, command, args in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    results.append((future, command(*args), None))
+                except BaseException as err:
+                    results.append((future, None, err))
+            self.executed += len(results)
+            self.batches += 1
+            try:
+                self.publish()
+            except Exception as err:
+                print(f'Ошибка публикации состояния плеера. {err}')
+            for future, result, err in results:
+                if err is None:
+                    future.set_result(result)
+                else:
+                    future.set_exception(err)
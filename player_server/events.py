@@ -0,0 +1,74 @@
+from threading import Condition
+from typing import Optional
+
+# сколько последних событий хранит журнал
+EVENT_LOG_CAPACITY = 1024
+
+
+class EventLog:
+    """
+    журнал событий плеера - кольцевой буфер фиксированного размера с порядковыми номерами.
+    Событие записывается один раз (O(1)) независимо от количества подписчиков; каждый подписчик
+    хранит свой курсор - номер последнего полученного события - и может продолжить чтение
+    с него после переподключения
+    """
+
+    def __init__(self, capacity: int = EVENT_LOG_CAPACITY):
+        self.capacity = capacity
+        self.__buffer: list = [None] * capacity # событие с номером n лежит в ячейке n % capacity
+        self.__last_sequence: int = 0 # номер последнего записанного события (нумерация с 1)
+        self.__changed = Condition()
+        self.__listeners: list = [] # функции, вызываемые после записи каждого события
+
+    @property
+    def last_sequence(self) -> int:
+        return self.__last_sequence
+
+    def publish(self, event) -> int:
+        """
+        запись события в журнал и пробуждение ожидающих подписчиков
+        :param event:
+        :return: порядковый номер события
+        """
+        with self.__changed:
+            self.__last_sequence += 1
+            sequence = self.__last_sequence
+            self.__buffer[sequence % self.capacity] = event
+            self.__changed.notify_all()
+        for listener in self.__listeners:
+            listener(sequence)
+        return sequence
+
+    def add_listener(self, listener) -> None:
+        """
+        подписка функции на запись событий (например, для пробуждения цикла событий asyncio)
+        :param listener: функция от номера события; вызывается в потоке, записавшем событие
+        :return:
+        """
+        self.__listeners.append(listener)
+
+    def read(self, after: int) -> tuple:
+        """
+        события с номерами больше after
+        :param after: курсор подписчика
+        :return: (список событий, номер последнего события, потеряны ли события - курсор
+                  вытеснен из буфера или больше номера последнего события; курсор другого запуска
+                  сервера с допустимым номером не определяется - см. Player.epoch)
+        """
+        with self.__changed:
+            last = self.__last_sequence
+            if after > last or after < last - self.capacity:
+                return [], last, True
+            events = [self.__buffer[sequence % self.capacity] for sequence in range(after + 1, last + 1)]
+            return events, last, False
+
+    def wait(self, after: int, timeout: Optional[float] = None) -> tuple:
+        """
+        ожидание событий с номерами больше after не дольше timeout секунд
+        :param after: курсор подписчика
+        :param timeout:
+        :return: то же, что read()
+        """
+        with self.__changed:
+            self.__changed.wait_for(lambda: self.__last_sequence != after, timeout=timeout)
+        return self.read(after)
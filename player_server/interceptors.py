@@ -0,0 +1,177 @@
+from threading import Lock
+
+import grpc
+
+import player_server.player_pb2 as pb2
+from player_server.metrics import Metrics
+from player_server.profiling import Profiler
+
+
+def method_name(handler_call_details) -> str:
+    # '/player_server.Player/GetPlayList' -> 'GetPlayList'
+    return handler_call_details.method.rsplit('/', 1)[-1]
+
+
+def error_response(method: str, error: str):
+    """
+    ответ метода RPC с текстом ошибки (у ответов всех методов Player есть поле error)
+    :param method: имя метода
+    :param error:
+    :return:
+    """
+    output = pb2.DESCRIPTOR.services_by_name['Player'].methods_by_name[method].output_type
+    return getattr(pb2, output.name)(error=error)
+
+
+def wrap_handler(handler, wrap_unary, wrap_stream):
+    """
+    копия обработчика RPC с заменённой функцией обработки
+    :param handler: grpc.RpcMethodHandler
+    :param wrap_unary: функция обработки -> обёртка (для методов с одним ответом)
+    :param wrap_stream: функция обработки -> обёртка (для методов с потоком ответов)
+    :return: grpc.RpcMethodHandler
+    """
+    serializers = dict(request_deserializer=handler.request_deserializer,
+                       response_serializer=handler.response_serializer)
+    if handler.unary_unary:
+        return grpc.unary_unary_rpc_method_handler(wrap_unary(handler.unary_unary), **serializers)
+    if handler.stream_unary:
+        return grpc.stream_unary_rpc_method_handler(wrap_unary(handler.stream_unary), **serializers)
+    if handler.unary_stream:
+        return grpc.unary_stream_rpc_method_handler(wrap_stream(handler.unary_stream), **serializers)
+    return grpc.stream_stream_rpc_method_handler(wrap_stream(handler.stream_stream), **serializers)
+
+
+class MetricsInterceptor(grpc.ServerInterceptor):
+    """
+    учёт времени ответа и количества выполняющихся вызовов для синхронного сервера.
+    Для потоков ответов учитывается только количество открытых потоков
+    """
+
+    def __init__(self, metrics: Metrics):
+        self.metrics = metrics
+
+    def intercept_service(self, continuation, handler_call_details):
+        handler = continuation(handler_call_details)
+        if handler is None:
+            return None
+        method = method_name(handler_call_details)
+        metrics = self.metrics
+
+        def wrap_unary(behavior):
+            def unary(request, context):
+                with metrics.rpc(method):
+                    return behavior(request, context)
+            return unary
+
+        def wrap_stream(behavior):
+            def stream(request, context):
+                with metrics.rpc(method, latency=False):
+                    yield from behavior(request, context)
+            return stream
+
+        return wrap_handler(handler, wrap_unary, wrap_stream)
+
+
+class AsyncMetricsInterceptor(grpc.aio.ServerInterceptor):
+    """
+    то же для сервера grpc.aio
+    """
+
+    def __init__(self, metrics: Metrics):
+        self.metrics = metrics
+
+    async def intercept_service(self, continuation, handler_call_details):
+        handler = await continuation(handler_call_details)
+        if handler is None:
+            return None
+        method = method_name(handler_call_details)
+        metrics = self.metrics
+
+        def wrap_unary(behavior):
+            async def unary(request, context):
+                with metrics.rpc(method):
+                    return await behavior(request, context)
+            return unary
+
+        def wrap_stream(behavior):
+            async def stream(request, context):
+                with metrics.rpc(method, latency=False):
+                    async for response in behavior(request, context):
+                        yield response
+            return stream
+
+        return wrap_handler(handler, wrap_unary, wrap_stream)
+
+
+class StreamLimitInterceptor(grpc.ServerInterceptor):
+    """
+    ограничение количества одновременно открытых бесконечных потоков ответов (подписок) синхронного
+    сервера. Каждый такой поток занимает поток сервера на всё время подписки; сверх limit подписка
+    получает одно сообщение с ошибкой и закрывается, и потоки сервера остаются для остальных RPC
+    """
+
+    def __init__(self, limit: int, methods):
+        """
+        :param limit: максимальное количество одновременных потоков ответов
+        :param methods: имена ограничиваемых методов
+        """
+        self.limit = limit
+        self.methods = frozenset(methods)
+        self.__open = 0
+        self.__lock = Lock()
+
+    def intercept_service(self, continuation, handler_call_details):
+        handler = continuation(handler_call_details)
+        method = method_name(handler_call_details)
+        if handler is None or method not in self.methods:
+            return handler
+
+        def wrap_stream(behavior):
+            def stream(request, context):
+                with self.__lock:
+                    opened = self.__open < self.limit
+                    if opened:
+                        self.__open += 1
+                if not opened:
+                    yield error_response(method, f'Открыто максимальное количество подписок ({self.limit})')
+                    return
+                try:
+                    yield from behavior(request, context)
+                finally:
+                    with self.__lock:
+                        self.__open -= 1
+            return stream
+
+        return wrap_handler(handler, lambda behavior: behavior, wrap_stream)
+
+
+class ProfilingInterceptor(grpc.ServerInterceptor):
+    """
+    профилирование обработчиков синхронного сервера по запросу (см. Profiler).
+    Пока сеанс не запущен, обработчик возвращается без изменений
+    """
+
+    def __init__(self, profiler: Profiler):
+        self.profiler = profiler
+
+    def intercept_service(self, continuation, handler_call_details):
+        handler = continuation(handler_call_details)
+        if handler is None or not self.profiler.active:
+            return handler
+        method = method_name(handler_call_details)
+        if not self.profiler.wants(method):
+            return handler
+        profiler = self.profiler
+
+        def wrap_unary(behavior):
+            def unary(request, context):
+                return profiler.call(method, behavior, request, context)
+            return unary
+
+        def wrap_stream(behavior):
+            def stream(request, context):
+                return profiler.iterate(method, behavior(request, context))
+            return stream
+
+        return wrap_handler(handler, wrap_unary, wrap_stream)
@@ -0,0 +1,245 @@
+import os
+import zlib
+import struct
+import time
+from pathlib import Path
+from threading import Event, Lock, Thread
+
+import player_server.player_pb2 as pb2
+from player_server.snapshot import sync_directory
+
+# задержка fsync после записи в журнал, с: записи пакетов за это время сбрасываются на диск одним fsync
+JOURNAL_SYNC_INTERVAL = 0.1
+
+# заголовок записи: длина данных, crc32 (вид, версия и данные), вид записи, версия плейлиста
+RECORD = struct.Struct('=IIBQ')
+# вид записи состояния плеера; виды изменений плейлиста - значения pb2.PlaylistEditKind
+STATE_RECORD = 16
+INSERTED_HEADER = struct.Struct('=QI') # позиция, количество треков
+INSERTED_SONG = struct.Struct('=dI') # длительность (NaN - неизвестна), длина пути
+DELETED_DATA = struct.Struct('=Q') # позиция
+MOVED_DATA = struct.Struct('=QQ') # позиция, новая позиция
+STATE_DATA = struct.Struct('=qBd') # индекс активного трека, пауза, позиция трека
+
+
+def encode_change(version: int, kind: int, index: int, to_index: int = -1, songs=()) -> bytes:
+    """
+    запись изменения плейлиста; размер пропорционален изменению, а не плейлисту
+    :param version: версия плейлиста после изменения
+    :param kind: pb2.INSERTED / pb2.DELETED / pb2.MOVED
+    :param index:
+    :param to_index: новая позиция перемещённого трека
+    :param songs: вставленные треки - пары (путь в байтах, длительность или NaN)
+    :return:
+    """
+    if kind == pb2.INSERTED:
+        parts = [INSERTED_HEADER.pack(index, len(songs))]
+        for raw_path, duration in songs:
+            parts.append(INSERTED_SONG.pack(duration, len(raw_path)))
+            parts.append(raw_path)
+        data = b''.join(parts)
+    elif kind == pb2.DELETED:
+        data = DELETED_DATA.pack(index)
+    else:
+        data = MOVED_DATA.pack(index, to_index)
+    return _record(kind, version, data)
+
+
+def encode_state(version: int, playing: int, paused: bool, position: float) -> bytes:
+    """
+    запись состояния плеера (активный трек, пауза, позиция)
+    :param version: версия плейлиста, к которой относится индекс playing
+    :param playing: индекс активного трека (-1 - нет)
+    :param paused:
+    :param position: позиция трека, с
+    :return:
+    """
+    return _record(STATE_RECORD, version, STATE_DATA.pack(playing, paused, position))
+
+
+def _record(kind: int, version: int, data: bytes) -> bytes:
+    head = struct.pack('=BQ', kind, version)
+    return RECORD.pack(len(data), zlib.crc32(data, zlib.crc32(head)), kind, version) + data
+
+
+def decode(kind: int, data: bytes) -> tuple:
+    """
+    данные записи
+    :param kind:
+    :param data:
+    :return: STATE_RECORD - (индекс, пауза, позиция); INSERTED - (позиция, [(путь в байтах, длительность)]);
+             DELETED - (позиция,); MOVED - (позиция, новая позиция)
+    """
+    if kind == STATE_RECORD:
+        playing, paused, position = STATE_DATA.unpack(data)
+        return playing, bool(paused), position
+    if kind == pb2.INSERTED:
+        index, count = INSERTED_HEADER.unpack_from(data)
+        offset = INSERTED_HEADER.size
+        songs = []
+        for _ in range(count):
+            duration, length = INSERTED_SONG.unpack_from(data, offset)
+            offset += INSERTED_SONG.size
+            songs.append((data[offset:offset + length], duration))
+            offset += length
+        return index, songs
+    if kind == pb2.DELETED:
+        return DELETED_DATA.unpack(data)
+    return MOVED_DATA.unpack(data)
+
+
+def read_records(path) -> tuple:
+    """
+    чтение записей журнала до конца файла или до первой неполной/повреждённой записи
+    (запись, прерванная сбоем)
+    :param path:
+    :return: (список (вид, версия, данные), длина целой части файла)
+    """
+    try:
+        content = Path(path).read_bytes()
+    except FileNotFoundError:
+        return [], 0
+    records, offset = [], 0
+    while offset + RECORD.size <= len(content):
+        length, crc, kind, version = RECORD.unpack_from(content, offset)
+        end = offset + RECORD.size + length
+        data = content[offset + RECORD.size:end]
+        if end > len(content) or zlib.crc32(data, zlib.crc32(struct.pack('=BQ', kind, version))) != crc:
+            break
+        records.append((kind, version, data))
+        offset = end
+    return records, offset
+
+
+class PlaylistJournal:
+    """
+    журнал изменений плейлиста (write-ahead log) рядом со снимком. Записи копятся в памяти и
+    записываются в файл одним вызовом на пакет команд (write); fsync выполняет фоновый поток не
+    чаще JOURNAL_SYNC_INTERVAL, объединяя записи нескольких пакетов. После сбоя процесса записи,
+    переданные в write, сохраняются; после сбоя системы теряется не больше JOURNAL_SYNC_INTERVAL.
+    При сжатии (см. Player.save_snapshot) журнал переименовывается в .old (rotate), записывается
+    новый снимок и .old удаляется (remove_rotated)
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.rotated_path = self.path.with_name(f'{self.path.name}.old')
+        records, valid = read_records(self.path)
+        rotated, _ = read_records(self.rotated_path)
+        # записи обоих файлов для восстановления: сначала .old (сжатие не завершилось), затем текущий
+        self.__records = rotated + records
+        # счётчики изменений плейлиста: добавленных (поток команд) и записанных в снимок (поток сжатия)
+        self.__appended: int = sum(kind != STATE_RECORD for kind, _, _ in self.__records)
+        self.__rotated: int = 0
+        self.__compacted: int = 0
+        self.__file = open(self.path, 'ab', buffering=0)
+        # повреждённый конец (запись, прерванная сбоем) отбрасывается
+        self.__file.truncate(valid)
+        self.size: int = valid # размер текущего файла журнала
+        self.__pending = [] # записи, ещё не переданные в файл (поток команд)
+        self.__dirty = False # есть записи, не сброшенные на диск
+        self.__closed = False
+        self.__lock = Lock()
+        self.__written = Event() # write передал записи в файл - поток сброса просыпается
+        Thread(target=self.__sync_loop, name='journal-sync', daemon=True).start()
+
+    def take_records(self) -> list:
+        """
+        записи, прочитанные при открытии журнала, для восстановления плейлиста (один раз)
+        :return: список (вид, версия, данные)
+        """
+        records, self.__records = self.__records, []
+        return records
+
+    def append(self, record: bytes, change: bool = True) -> None:
+        """
+        добавление записи (поток команд); в файл записывается при следующем write
+        :param record: encode_change / encode_state
+        :param change: изменение плейлиста (не состояние плеера)
+        :return:
+        """
+        self.__pending.append(record)
+        if change:
+            self.__appended += 1
+
+    @property
+    def changes(self) -> int:
+        # количество изменений плейлиста в журнале после последнего снимка
+        return self.__appended - self.__compacted
+
+    def write(self) -> None:
+        # запись накопленных записей одним системным вызовом (поток команд, после пакета команд)
+        if not self.__pending:
+            return
+        data = b''.join(self.__pending)
+        self.__pending.clear()
+        with self.__lock:
+            view = memoryview(data)
+            while view:
+                view = view[self.__file.write(view):]
+            self.size += len(data)
+            self.__dirty = True
+        self.__written.set()
+
+    def sync(self) -> None:
+        with self.__lock:
+            if self.__dirty:
+                os.fsync(self.__file.fileno())
+                self.__dirty = False
+
+    def close(self) -> None:
+        # запись и сброс на диск оставшихся записей, остановка потока сброса (плеер закрыт)
+        self.write()
+        with self.__lock:
+            if self.__closed:
+                return
+            os.fsync(self.__file.fileno())
+            self.__file.close()
+            self.__dirty = False
+            self.__closed = True
+        self.__written.set()
+
+    def __sync_loop(self) -> None:
+        # без записей поток спит в ожидании события, а не просыпается каждые JOURNAL_SYNC_INTERVAL
+        while True:
+            self.__written.wait()
+            if self.__closed:
+                return
+            time.sleep(JOURNAL_SYNC_INTERVAL)
+            # сброс события до fsync: запись после него разбудит поток снова
+            self.__written.clear()
+            try:
+                self.sync()
+            except Exception as err:
+                print(f'Ошибка записи журнала плейлиста. {err}')
+
+    def rotate(self) -> None:
+        """
+        начало сжатия (поток команд): текущие записи переносятся в .old, дальше пишется новый файл.
+        Если .old остался от незавершённого сжатия, записи добавляются в его конец
+        :return:
+        """
+        self.write()
+        with self.__lock:
+            os.fsync(self.__file.fileno())
+            self.__file.close()
+            if self.rotated_path.exists():
+                with open(self.rotated_path, 'ab') as rotated:
+                    rotated.write(self.path.read_bytes())
+                    rotated.flush()
+                    os.fsync(rotated.fileno())
+                os.remove(self.path)
+            else:
+                os.replace(self.path, self.rotated_path)
+            self.__file = open(self.path, 'ab', buffering=0)
+            self.size = 0
+            self.__dirty = False
+            self.__rotated = self.__appended
+        sync_directory(self.path.parent)
+
+    def remove_rotated(self) -> None:
+        # окончание сжатия: снимок записан, записи .old больше не нужны
+        with self.__lock:
+            self.rotated_path.unlink(missing_ok=True)
+            self.__compacted = self.__rotated
+        sync_directory(self.path.parent)
@@ -0,0 +1,69 @@
+import os
+from threading import Event, Thread
+from typing import Optional
+
+# расширения файлов, импортируемых по умолчанию
+IMPORT_EXTENSIONS = ('.mp3',)
+
+
+def normalize_extensions(extensions) -> tuple:
+    """
+    расширения в виде '.mp3' в нижнем регистре
+    :param extensions: 'mp3', '.MP3', ...
+    :return:
+    """
+    return tuple(f'.{extension.lower().lstrip(".")}' for extension in extensions if extension) or IMPORT_EXTENSIONS
+
+
+def scan_directory(root, extensions: tuple = IMPORT_EXTENSIONS, errors: Optional[list] = None,
+                   cancelled: Optional[Event] = None):
+    """
+    обход дерева каталогов через os.scandir без рекурсии. В каждом каталоге сначала файлы,
+    затем подкаталоги, по порядку имён. Символические ссылки на каталоги не обходятся
+    :param root:
+    :param extensions: расширения в нижнем регистре ('.mp3', ...)
+    :param errors: список для пар (путь, ошибка) - каталоги, которые не удалось прочитать
+    :param cancelled: остановка обхода
+    :return: генератор путей файлов
+    """
+    stack = [os.fspath(root)]
+    while stack and not (cancelled and cancelled.is_set()):
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as iterator:
+                entries = sorted(iterator, key=lambda entry: entry.name)
+        except OSError as err:
+            if errors is not None:
+                errors.append((directory, f'{err}'))
+            continue
+        subdirectories = []
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirectories.append(entry.path)
+                elif entry.name.lower().endswith(extensions) and entry.is_file():
+                    yield entry.path
+            except OSError as err:
+                if errors is not None:
+                    errors.append((entry.path, f'{err}'))
+        stack.extend(reversed(subdirectories))
+
+
+class ScanCounter:
+    """
+    подсчёт файлов в дереве каталогов в фоновом потоке - для оценки оставшегося времени импорта
+    """
+
+    def __init__(self, root, extensions: tuple = IMPORT_EXTENSIONS):
+        self.found = 0 # найдено файлов
+        self.complete = False # обход закончен
+        self.cancelled = Event()
+        Thread(target=self.__run, args=(root, extensions), name='scan-counter', daemon=True).start()
+
+    def __run(self, root, extensions: tuple) -> None:
+        for _ in scan_directory(root, extensions, cancelled=self.cancelled):
+            self.found += 1
+        self.complete = not self.cancelled.is_set()
+
+    def cancel(self) -> None:
+        self.cancelled.set()
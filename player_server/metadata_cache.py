@@ -0,0 +1,156 @@
+import os
+import json
+import sqlite3
+from pathlib import Path
+from threading import Lock
+from typing import NamedTuple, Optional
+
+from mutagen.mp3 import MP3
+
+# файл кэша по умолчанию лежит рядом с сервером
+DEFAULT_CACHE_PATH = Path(__file__).parent / 'metadata_cache.sqlite3'
+# доля удалённых при сжатии записей, начиная с которой файл кэша перестраивается (VACUUM)
+VACUUM_THRESHOLD = 0.25
+
+
+class SongMetadata(NamedTuple):
+    """
+    метаданные трека, сохраняемые в кэше
+    """
+    duration: float # длительность трека
+    title: str # название трека (тег TIT2 или имя файла)
+    tags: Optional[dict] = None # дополнительные теги
+
+
+def read_metadata(song_path) -> SongMetadata:
+    """
+    чтение метаданных из заголовка файла
+    :param song_path:
+    :return: SongMetadata
+    """
+    audio = MP3(song_path)
+    title = None
+    if audio.tags is not None and 'TIT2' in audio.tags:
+        title = str(audio.tags['TIT2'])
+    return SongMetadata(duration=audio.info.length, title=title or Path(song_path).stem)
+
+
+class MetadataCache:
+    """
+    постоянный кэш метаданных треков в SQLite. Ключ - (путь, mtime, размер файла):
+    если файл не изменился, заголовок повторно не разбирается
+    """
+
+    def __init__(self, db_path=DEFAULT_CACHE_PATH):
+        self.db_path = Path(db_path)
+        self.hits = 0 # количество попаданий в кэш
+        self.misses = 0 # количество промахов (только в get: промах lookup в отложенном режиме не окончательный)
+        self.__pending = [] # новые записи, ожидающие записи в базу
+        self.__lock = Lock()
+        # соединение используется из потоков пула чтения заголовков - доступ через блокировку
+        self.__connection = sqlite3.connect(self.db_path, check_same_thread=False)
+        with self.__lock, self.__connection:
+            self.__connection.execute('PRAGMA journal_mode=WAL')
+            self.__connection.execute(
+                'CREATE TABLE IF NOT EXISTS songs ('
+                'path TEXT PRIMARY KEY, mtime INTEGER NOT NULL, size INTEGER NOT NULL, '
+                'duration REAL NOT NULL, title TEXT NOT NULL, tags TEXT)')
+
+    def lookup(self, song_path, stat=None) -> Optional[SongMetadata]:
+        """
+        получение метаданных трека только из кэша, без чтения заголовка. Промах не учитывается:
+        за ним следует get при первом обращении к длительности, который его и учтёт
+        :param song_path:
+        :param stat: результат os.stat для файла (если уже получен)
+        :return: SongMetadata или None, если записи нет или файл изменился
+        """
+        path = str(song_path)
+        stat = stat or os.stat(path)
+        with self.__lock:
+            row = self.__connection.execute(
+                'SELECT duration, title, tags FROM songs WHERE path = ? AND mtime = ? AND size = ?',
+                (path, stat.st_mtime_ns, stat.st_size)).fetchone()
+            if not row:
+                return None
+            self.hits += 1
+        duration, title, tags = row
+        return SongMetadata(duration, title, json.loads(tags) if tags else None)
+
+    def get(self, song_path) -> SongMetadata:
+        """
+        получение метаданных трека: из кэша, если файл не менялся, иначе чтением заголовка.
+        Новые записи накапливаются до вызова flush()
+        :param song_path:
+        :return: SongMetadata
+        """
+        path = str(song_path)
+        stat = os.stat(path)
+        metadata = self.lookup(path, stat)
+        if metadata:
+            return metadata
+        with self.__lock:
+            self.misses += 1
+        metadata = read_metadata(path)
+        with self.__lock:
+            self.__pending.append((path, stat.st_mtime_ns, stat.st_size, metadata.duration, metadata.title,
+                                   json.dumps(metadata.tags) if metadata.tags else None))
+        return metadata
+
+    def flush(self) -> None:
+        """
+        запись накопленных записей в базу одной транзакцией. Если база занята сжатием (compact),
+        записи остаются до следующего вызова
+        :return:
+        """
+        with self.__lock:
+            if not self.__pending:
+                return
+            try:
+                with self.__connection:
+                    self.__connection.executemany(
+                        'INSERT OR REPLACE INTO songs (path, mtime, size, duration, title, tags) '
+                        'VALUES (?, ?, ?, ?, ?, ?)', self.__pending)
+            except sqlite3.OperationalError as err:
+                print(f'Ошибка записи кэша метаданных. {err}')
+                return
+            self.__pending.clear()
+
+    def compact(self) -> int:
+        """
+        удаление записей о файлах, которых больше нет на диске или которые изменились.
+        Выполняется через отдельное соединение без общей блокировки: lookup/get в это время
+        читают базу (WAL) без ожидания. Файл базы перестраивается (VACUUM) только если удалено
+        не меньше VACUUM_THRESHOLD записей
+        :return: количество удалённых записей
+        """
+        connection = sqlite3.connect(self.db_path)
+        try:
+            rows = connection.execute('SELECT path, mtime, size FROM songs').fetchall()
+            stale = []
+            for path, mtime, size in rows:
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    stale.append((path, mtime, size))
+                else:
+                    if (stat.st_mtime_ns, stat.st_size) != (mtime, size):
+                        stale.append((path, mtime, size))
+            if not stale:
+                return 0
+            # запись, обновлённая после чтения списка, не удаляется
+            with connection:
+                connection.executemany('DELETE FROM songs WHERE path = ? AND mtime = ? AND size = ?', stale)
+            if len(stale) >= len(rows) * VACUUM_THRESHOLD:
+                connection.execute('VACUUM')
+            return len(stale)
+        finally:
+            connection.close()
+
+    def __len__(self) -> int:
+        with self.__lock:
+            return self.__connection.execute('SELECT COUNT(*) FROM songs').fetchone()[0]
+
+    def close(self) -> None:
+        self.flush()
+        with self.__lock:
+            self.__connection.close()
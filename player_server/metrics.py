@@ -0,0 +1,234 @@
+import time
+from bisect import bisect_left
+from concurrent import futures
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+
+import player_server.player_pb2 as pb2
+
+# границы корзин гистограмм времени ответа, с
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+# префикс имён метрик в формате Prometheus
+METRICS_PREFIX = 'player_'
+
+# описания метрик для строк # HELP
+DESCRIPTIONS = {
+    'rpc_latency_seconds': 'время обработки unary RPC',
+    'rpc_in_flight': 'количество выполняющихся RPC (включая открытые потоки)',
+    'probe_seconds': 'время проверки одного файла при добавлении в плейлист',
+    'transition_gap_seconds': 'время от окончания трека до запуска следующего',
+    'playlist_tracks': 'количество треков в плейлисте',
+    'command_queue_depth': 'команд в очереди потока команд плеера',
+    'executor_queue_depth': 'запросов, ожидающих свободного потока сервера',
+    'metadata_cache_hits': 'попаданий в кэш метаданных',
+    'metadata_cache_misses': 'промахов кэша метаданных',
+}
+
+
+class Histogram:
+    """
+    гистограмма с фиксированными корзинами (как histogram в Prometheus): запись значения - O(log корзин)
+    """
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = tuple(bounds) # верхние границы корзин (включительно)
+        self.__counts = [0] * (len(self.bounds) + 1) # количество значений в корзине, последняя - +Inf
+        self.__sum = 0.0
+        self.__lock = Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.bounds, value)
+        with self.__lock:
+            self.__counts[index] += 1
+            self.__sum += value
+
+    def snapshot(self) -> tuple:
+        """
+        :return: (количество значений по корзинам, сумма значений)
+        """
+        with self.__lock:
+            return list(self.__counts), self.__sum
+
+
+class Metrics:
+    """
+    реестр метрик сервера: гистограммы, показатели, вычисляемые при чтении (функции без аргументов),
+    и счётчики выполняющихся RPC
+    """
+
+    def __init__(self):
+        self.__histograms = {} # (имя, метки) -> Histogram
+        self.__gauges = {} # (имя, метки) -> функция
+        self.__in_flight = {} # имя метода -> количество выполняющихся вызовов
+        self.__lock = Lock()
+
+    def histogram(self, name: str, bounds=LATENCY_BUCKETS, **labels) -> Histogram:
+        """
+        гистограмма по имени и меткам (создаётся при первом обращении)
+        :param name:
+        :param bounds: границы корзин для новой гистограммы
+        :param labels:
+        :return: Histogram
+        """
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self.__histograms.get(key)
+        if histogram is None:
+            with self.__lock:
+                histogram = self.__histograms.setdefault(key, Histogram(bounds))
+        return histogram
+
+    def gauge(self, name: str, function, **labels) -> None:
+        """
+        регистрация показателя, значение которого вычисляется при чтении метрик
+        :param name:
+        :param function: функция без аргументов -> число
+        :param labels:
+        :return:
+        """
+        with self.__lock:
+            self.__gauges[(name, tuple(sorted(labels.items())))] = function
+
+    @contextmanager
+    def rpc(self, method: str, latency: bool = True):
+        """
+        учёт вызова RPC: счётчик выполняющихся вызовов и время обработки
+        :param method: имя метода
+        :param latency: записывать время в гистограмму (для потоков не записывается)
+        :return:
+        """
+        with self.__lock:
+            self.__in_flight[method] = self.__in_flight.get(method, 0) + 1
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            if latency:
+                self.histogram('rpc_latency_seconds', method=method).observe(time.perf_counter() - started)
+            with self.__lock:
+                self.__in_flight[method] -= 1
+
+    def collect(self) -> list:
+        """
+        текущие значения всех метрик
+        :return: список pb2.Metric
+        """
+        with self.__lock:
+            histograms = list(self.__histograms.items())
+            gauges = list(self.__gauges.items())
+            in_flight = list(self.__in_flight.items())
+        metrics = []
+        for (name, labels), histogram in histograms:
+            counts, total = histogram.snapshot()
+            metrics.append(pb2.Metric(name=name, kind=pb2.HISTOGRAM, labels=dict(labels), bounds=histogram.bounds,
+                                      bucket_counts=counts, count=sum(counts), sum=total))
+        for method, value in in_flight:
+            metrics.append(pb2.Metric(name='rpc_in_flight', kind=pb2.GAUGE, labels={'method': method}, value=value))
+        for (name, labels), function in gauges:
+            try:
+                value = float(function())
+            except Exception:
+                # показатель недоступен (например, кэш метаданных закрыт)
+                continue
+            metrics.append(pb2.Metric(name=name, kind=pb2.GAUGE, labels=dict(labels), value=value))
+        return metrics
+
+
+class CountingExecutor(futures.ThreadPoolExecutor):
+    """
+    пул потоков, считающий задачи, которые ждут свободного потока (метрика executor_queue_depth).
+    Задача перестаёт считаться ожидающей, когда начинает выполняться или отменяется
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.__pending = 0
+        self.__lock = Lock()
+
+    @property
+    def pending(self) -> int:
+        # количество задач, ожидающих свободного потока
+        return self.__pending
+
+    def submit(self, fn, /, *args, **kwargs) -> futures.Future:
+        started = [] # не пусто - задача уже не ожидает
+
+        def run():
+            self.__leave_queue(started)
+            return fn(*args, **kwargs)
+
+        with self.__lock:
+            self.__pending += 1
+        try:
+            future = super().submit(run)
+        except BaseException:
+            self.__leave_queue(started)
+            raise
+        future.add_done_callback(lambda _: self.__leave_queue(started))
+        return future
+
+    def __leave_queue(self, started: list) -> None:
+        with self.__lock:
+            if not started:
+                started.append(True)
+                self.__pending -= 1
+
+
+def prometheus_text(metrics: list) -> str:
+    """
+    метрики в текстовом формате Prometheus (version 0.0.4)
+    :param metrics: список pb2.Metric
+    :return:
+    """
+    lines = []
+    described = set()
+    for metric in sorted(metrics, key=lambda metric: metric.name):
+        name = METRICS_PREFIX + metric.name
+        if metric.name not in described:
+            described.add(metric.name)
+            lines.append(f'# HELP {name} {DESCRIPTIONS.get(metric.name, metric.name)}')
+            lines.append(f'# TYPE {name} {"histogram" if metric.kind == pb2.HISTOGRAM else "gauge"}')
+        labels = [f'{key}="{value}"' for key, value in sorted(metric.labels.items())]
+        if metric.kind == pb2.HISTOGRAM:
+            cumulative = 0
+            for bound, count in zip(list(metric.bounds) + ['+Inf'], metric.bucket_counts):
+                cumulative += count
+                bucket_labels = ','.join(labels + [f'le="{bound}"'])
+                lines.append(f'{name}_bucket{{{bucket_labels}}} {cumulative}')
+            suffix = f'{{{",".join(labels)}}}' if labels else ''
+            lines.append(f'{name}_sum{suffix} {metric.sum}')
+            lines.append(f'{name}_count{suffix} {metric.count}')
+        else:
+            suffix = f'{{{",".join(labels)}}}' if labels else ''
+            lines.append(f'{name}{suffix} {metric.value:g}')
+    return '\n'.join(lines) + '\n'
+
+
+def start_metrics_server(metrics: Metrics, port: int, host: str = '127.0.0.1') -> ThreadingHTTPServer:
+    """
+    запуск HTTP сервера метрик для Prometheus (GET /metrics) в фоновом потоке
+    :param metrics:
+    :param port:
+    :param host: по умолчанию только локальные подключения
+    :return: сервер (для остановки - shutdown())
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = prometheus_text(metrics.collect()).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            # без записи каждого запроса в stderr
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    Thread(target=server.serve_forever, name='metrics', daemon=True).start()
+    return server
@@ -1,55 +1,392 @@
+import os
+import sys
+import math
 import time
+import asyncio
+import argparse
+import random
+import signal
+import functools
+from collections import deque
+from itertools import islice
 
-import pygame
-from pygame import mixer
 from pathlib import Path
+from stat import S_ISREG
 from mutagen.mp3 import MP3
 import grpc
 from concurrent import futures
 import player_server.player_pb2_grpc as pb2_grpc
 import player_server.player_pb2 as pb2
-from typing import Optional
-from threading import Thread
+from player_server.metadata_cache import MetadataCache, DEFAULT_CACHE_PATH
+from player_server.events import EventLog
+from player_server.commands import CommandQueue
+from player_server.audio import AudioBackend, PygameBackend, HeadlessBackend
+from player_server.metrics import Metrics, Histogram, CountingExecutor, start_metrics_server
+from player_server.interceptors import MetricsInterceptor, ProfilingInterceptor, StreamLimitInterceptor
+from player_server.profiling import Profiler
+from player_server.library import scan_directory, normalize_extensions, ScanCounter
+from player_server.snapshot import PlaylistSnapshot, write_snapshot, DEFAULT_SNAPSHOT_PATH
+from player_server.journal import PlaylistJournal, encode_change, encode_state, decode, STATE_RECORD
+from player_server.search import PlaylistSearchIndex
+from typing import NamedTuple, Optional
+from threading import Thread, Event, Lock
+
+PREFETCH_PAUSE = 0.001 # пауза фонового чтения метаданных между файлами, с
+PREFETCH_FLUSH_EVERY = 100 # через сколько прочитанных файлов сохранять кэш метаданных
+# поля PlayerSnapshot, которые можно запросить маской
+SNAPSHOT_FIELDS = frozenset(('title', 'duration', 'index', 'paused', 'position', 'playlist_version'))
+# максимальное количество названий в одном ответе GetPlayListRange/StreamPlayList/GetPlaylistDelta
+PLAYLIST_PAGE_LIMIT = 5000
+PLAYLIST_CHANGES_HISTORY = 1000 # сколько последних изменений плейлиста хранить для GetPlaylistDelta
+TRANSITION_GAPS_HISTORY = 100 # сколько последних переходов между треками хранить для измерений
+STATUS_IDLE_CHECK = 1.0 # как часто поток статуса без изменений проверяет, подключён ли клиент, с
+# минимальный интервал сообщений подписки GetPlayerStatus: меньший request.heartbeat увеличивается до него, с
+MIN_STATUS_HEARTBEAT = 0.25
+# синхронный сервер: потоки для RPC, кроме подписок GetPlayerStatus, и максимум одновременных подписок
+# (каждая занимает свой поток сервера; тысячи подписок - асинхронный сервер --aio)
+SERVER_WORKERS = 10
+MAX_STATUS_STREAMS = 100
+IMPORT_BATCH_SIZE = 2000 # файлов в одном пакете ImportDirectory по умолчанию
+IMPORT_BATCH_LIMIT = 10000 # максимальный размер пакета ImportDirectory
+ADD_SONGS_BATCH = 1000 # сколько путей из потока AddSongs добавляется за один раз
+SNAPSHOT_INTERVAL = 10.0 # как часто записывать позицию трека в журнал и проверять размер журнала, с
+JOURNAL_COMPACT_SIZE = 8 * 1024 * 1024 # размер журнала, после которого записывается новый снимок, байт
+# границы корзин гистограммы времени перехода между треками, с
+TRANSITION_GAP_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5)
+
+
+def status_heartbeat(request) -> float:
+    """
+    интервал сообщений подписки на состояние: слишком частые сообщения превращали бы подписку
+    в непрерывную отправку
+    :param request: RequestPlayerStatus
+    :return: с (0 - только при событиях)
+    """
+    return max(request.heartbeat, MIN_STATUS_HEARTBEAT) if request.heartbeat > 0 else 0.0
+
+
+def song_title(name: str) -> str:
+    # название трека по имени файла (как Path.stem)
+    dot = name.rfind('.')
+    return name[:dot] if 0 < dot < len(name) - 1 else name
+
+
+def with_snapshot(handler):
+    """
+    декоратор управляющих RPC: если в запросе задан with_snapshot, к ответу добавляется
+    снимок состояния плеера (поля по snapshot_mask), чтобы клиенту не нужны были
+    дополнительные запросы после нажатия кнопки
+    :param handler:
+    :return:
+    """
+    @functools.wraps(handler)
+    def wrapper(self, request, context):
+        result = handler(self, request, context)
+        if request is not None and request.with_snapshot:
+            result.snapshot.CopyFrom(self.snapshot(request.snapshot_mask))
+        return result
+    return wrapper
+
+
+def serialized(handler):
+    """
+    декоратор изменяющих RPC: обработчик выполняется в потоке команд плеера (по одному),
+    ответ возвращается после публикации нового снимка состояния
+    :param handler:
+    :return:
+    """
+    @functools.wraps(handler)
+    def wrapper(self, request, context):
+        return self.commands.call(handler, self, request, context)
+    return wrapper
+
+
+class PlaylistChanges:
+    """
+    история последних изменений плейлиста - кольцевой буфер фиксированного размера, как журнал
+    событий (EventLog): изменение с версией v лежит в ячейке v % capacity. Поток команд дописывает
+    изменения, читающие потоки берут нужные версии без копирования буфера; изменение, уже
+    вытесненное более новым, определяется по версии в записи
+    """
+
+    def __init__(self, capacity: int = PLAYLIST_CHANGES_HISTORY):
+        self.capacity = capacity
+        self.__buffer: list = [None] * capacity
+
+    def append(self, change: tuple) -> None:
+        """
+        запись изменения (поток команд)
+        :param change: (версия, вид, позиция, новая позиция, объекты)
+        :return:
+        """
+        self.__buffer[change[0] % self.capacity] = change
+
+    def since(self, version: int, last: int) -> Optional[list]:
+        """
+        изменения после версии version до версии last включительно
+        :param version:
+        :param last: версия плейлиста, до которой нужны изменения
+        :return: список (версия, вид, позиция, новая позиция, объекты) или None,
+                 если версия неизвестна или часть изменений вытеснена из истории
+        """
+        if version > last or last - version > self.capacity:
+            return None
+        changes = []
+        for expected in range(version + 1, last + 1):
+            change = self.__buffer[expected % self.capacity]
+            if change is None or change[0] != expected:
+                return None
+            changes.append(change)
+        return changes
+
+
+class PlayerState(NamedTuple):
+    """
+    неизменяемый снимок состояния плеера. Публикуется потоком команд после каждого пакета
+    изменений; читающие RPC берут последний снимок одной ссылкой, без блокировок
+    """
+    playing: object = None # активный объект SongItem
+    index: int = -1 # индекс активного объекта
+    paused: bool = False # на паузе / не на паузе
+    playlist_version: int = 0 # версия плейлиста
+    # объекты плейлиста по порядку: Playlist.SongsView (после восстановления из снимка - Playlist.StoredSongs)
+    songs: object = None
+    changes: Optional[PlaylistChanges] = None # история изменений плейлиста (см. Playlist.changes)
+
+    def changes_since(self, version: int) -> Optional[list]:
+        """
+        изменения плейлиста после версии version
+        :param version:
+        :return: список (версия, вид, позиция, новая позиция, объекты) или None,
+                 если версия неизвестна или вытеснена из истории
+        """
+        if version == self.playlist_version:
+            return []
+        if self.changes is None:
+            return None
+        return self.changes.since(version, self.playlist_version)
+
 
 class Player(pb2_grpc.PlayerServicer):
 
-    def __init__(self):
-        self.playlist:Player.Playlist = self.Playlist()  # двусвязный список объектов SongItem
+    def __init__(self, metadata_cache_path=DEFAULT_CACHE_PATH, audio: Optional[AudioBackend] = None,
+                 snapshot_path=None, metadata_cache: Optional[MetadataCache] = None, probe_workers: int = 8,
+                 probe_executor: Optional[futures.Executor] = None, metrics: Optional[Metrics] = None):
+        """
+        :param metadata_cache_path: файл кэша метаданных (None - без кэша)
+        :param audio: звуковой модуль (по умолчанию pygame.mixer)
+        :param snapshot_path: файл снимка плейлиста (None - не сохранять)
+        :param metadata_cache: открытый кэш метаданных другого плеера (вместо metadata_cache_path)
+        :param probe_workers: количество потоков проверки добавляемых файлов
+        :param probe_executor: общий пул потоков проверки файлов нескольких плееров (вместо probe_workers)
+        :param metrics: общие метрики нескольких плееров: гистограммы плеера пишутся в них, показатели
+                        плеера (размер плейлиста, очередь команд) не регистрируются (см. PlayerSessions)
+        """
+        # метрики сервера (GetMetrics, Prometheus)
+        self.metrics: Metrics = metrics or Metrics()
+        # профилирование обработчиков по запросу StartProfiling
+        self.profiler: Profiler = Profiler()
+        self.metadata_cache: Optional[MetadataCache] = metadata_cache # постоянный кэш метаданных треков
+        if metadata_cache is None and metadata_cache_path:
+            try:
+                self.metadata_cache = MetadataCache(metadata_cache_path)
+                # удаление из кэша записей об исчезнувших файлах - в фоне, чтобы не задерживать запуск
+                Thread(target=self.metadata_cache.compact, daemon=True).start()
+            except Exception as err:
+                print(f'Ошибка открытия кэша метаданных. {err}')
+        # плейлист, активный объект и пауза изменяются только в потоке команд (self.commands)
+        self.playlist:Player.Playlist = self.Playlist(metadata_cache=self.metadata_cache,  # плейлист объектов SongItem
+                                                      probe_workers=probe_workers, probe_executor=probe_executor,
+                                                      probe_time=self.metrics.histogram('probe_seconds'))
         self.playing_item: Optional[Player.Playlist.SongItem] = None  # активный объект SongItem
         self.paused:bool = False # на паузе / не на паузе
-        self.react_to_next_new_song_event:bool = True # пропустить событие на окончание песни
-                                                      # (появляется при нажатии Next)
-        self.status:list = [] # список состояний плейера для клиента
+        # позиция, с которой активный трек запущен в последний раз (audio.position() считается от неё), с
+        self.track_offset: float = 0.0
+        # длительность последних переходов между треками (от события окончания до запуска следующего), с
+        self.transition_gaps: deque = deque(maxlen=TRANSITION_GAPS_HISTORY)
+        # журнал событий плеера для подписчиков GetPlayerStatus
+        self.events: EventLog = EventLog()
+        # идентификатор запуска плеера: номера событий и история изменений плейлиста начинаются заново
+        # при каждом запуске, поэтому курсор клиента (from_sequence, версия плейлиста) действителен
+        # только вместе с эпохой, в которой он получен
+        self.epoch: int = random.randrange(1, 2 ** 63)
+        # последний опубликованный снимок состояния - для читающих RPC
+        self.state: PlayerState = PlayerState(songs=self.playlist.songs(), changes=self.playlist.changes)
+        # построение индекса поиска в фоне (см. SearchPlaylist): запущено ли и блокировка запуска
+        self.__indexing: bool = False
+        self.__indexing_lock = Lock()
+        # события, записываемые в журнал после публикации снимка, в котором они уже учтены
+        self.__pending_events: list = []
+        # единственный поток, изменяющий состояние плеера
+        # команды профилируемых вызовов профилируются в потоке команд (self.profiler заменяется у сеансов)
+        self.commands: CommandQueue = CommandQueue(self.__publish_state,
+                                                   delegate=lambda *args: self.profiler.delegate(*args))
+        self.__transition_gap: Histogram = self.metrics.histogram('transition_gap_seconds', TRANSITION_GAP_BUCKETS)
+        if metrics is None:
+            self.metrics.gauge('playlist_tracks', lambda: len(self.state.songs))
+            self.metrics.gauge('command_queue_depth', lambda: self.commands.pending)
+            if self.metadata_cache is not None:
+                self.metrics.gauge('metadata_cache_hits', lambda: self.metadata_cache.hits)
+                self.metrics.gauge('metadata_cache_misses', lambda: self.metadata_cache.misses)
+
+        # плеер закрыт (close) - фоновые потоки завершаются
+        self.__closed = Event()
+        # фоновое чтение метаданных треков, начиная от активного
+        self.__prefetch_wakeup = Event()
+        Thread(target=self.__prefetch_metadata, daemon=True).start()
 
+        # звуковой модуль (по умолчанию pygame.mixer)
+        self.audio: AudioBackend = audio or PygameBackend()
         try:
-            pygame.init() # модуль для проигрывания файлов
-            mixer.music.set_endevent(pb2.NEW_SONG)  # какое событие будет получено при окончании песни
+            self.audio.init()
         except Exception as err:
             print(f'Ошибка инициализации музыкального модуля. {err}')
         else:
             try:
-                # запуск потока для опроса модуля pygame на событие окончания песни
+                # запуск потока ожидания события окончания песни
                 Thread(target=self.__end_playing_event, daemon=True).start()
             except Exception as err:
                 print(f'Ошибка запуска события. {err}')
 
-    def AddSong(self, request, context) -> pb2.ResponseResult:
+        # снимок плейлиста и журнал изменений после него для быстрого перезапуска сервера
+        # (None - не сохраняются)
+        self.snapshot_path = snapshot_path
+        self.journal: Optional[PlaylistJournal] = None
+        self.__journaled_state: tuple = (None, False, 0.0) # активный трек, пауза и позиция в журнале
+        self.__snapshot_lock = Lock()
+        if snapshot_path:
+            try:
+                self.commands.call(self.__restore, snapshot_path)
+            except Exception as err:
+                print(f'Ошибка восстановления плейлиста. {err}')
+            if self.journal is not None:
+                Thread(target=self.__maintain_snapshot, daemon=True).start()
+
+    def AddSong(self, request, context) -> pb2.ResponseAddSong:
         """
-        добавляет объекты в двусвязный список
+        добавляет объекты в плейлист. Файлы проверяются параллельно, метаданные читаются позже
+        фоновым потоком; ошибки по отдельным файлам возвращаются списком и не прерывают добавление остальных
         :param request:
         :param context:
-        :return: pb2.ResponseResult
+        :return: pb2.ResponseAddSong
         """
         try:
-            self.playlist.append_songs(*request.path)
+            added, failed = self.add_paths(request.path)
         except Exception as err:
-            return pb2.ResponseResult(error=f'Ошибка добавления файла. {err}')
+            return pb2.ResponseAddSong(error=f'Ошибка добавления файла. {err}')
         else:
-            return pb2.ResponseResult()
+            return pb2.ResponseAddSong(
+                added=added,
+                failed=[pb2.SongError(path=path, error=error) for path, error in failed])
+
+    def AddSongs(self, request_iterator, context) -> pb2.ResponseAddSong:
+        """
+        добавляет объекты в плейлист из потока запросов: пути добавляются пакетами по ADD_SONGS_BATCH,
+        пока клиент ещё передаёт остальные. Следующие сообщения читаются только после добавления
+        пакета, поэтому быстрый клиент ждёт (управление потоком HTTP/2). Ошибки по отдельным
+        файлам возвращаются в конце
+        :param request_iterator:
+        :param context:
+        :return: pb2.ResponseAddSong
+        """
+        added, failed = 0, []
+        try:
+            paths = (path for request in request_iterator for path in request.path)
+            while batch := list(islice(paths, ADD_SONGS_BATCH)):
+                batch_added, batch_failed = self.add_paths(batch)
+                added += batch_added
+                failed += batch_failed
+        except Exception as err:
+            return pb2.ResponseAddSong(error=f'Ошибка добавления файла. {err}', added=added,
+                                       failed=[pb2.SongError(path=path, error=error) for path, error in failed])
+        return pb2.ResponseAddSong(added=added,
+                                   failed=[pb2.SongError(path=path, error=error) for path, error in failed])
+
+    def add_paths(self, paths) -> tuple:
+        """
+        добавление файлов в конец плейлиста: проверка файлов - в потоке запроса,
+        в потоке команд только вставка готовых объектов
+        :param paths:
+        :return: (количество добавленных, список пар (путь, ошибка))
+        """
+        songs, failed = self.playlist.create_songs(paths)
+        self.commands.call(self.__append_songs, songs)
+        self.__prefetch_wakeup.set()
+        return len(songs), failed
+
+    def ImportDirectory(self, request, context) -> pb2.ImportProgress:
+        """
+        Импорт всех файлов из дерева каталогов сервера (см. import_directory); прогресс - потоком
+        :param request:
+        :param context:
+        :return: поток ImportProgress
+        """
+        yield from self.import_directory(request, context.is_active)
+
+    def import_directory(self, request, is_active=lambda: True):
+        """
+        обход каталога request.path через os.scandir и добавление файлов с расширениями
+        request.extensions пакетами по request.batch_size. После каждого пакета отправляется прогресс:
+        найдено/обработано/добавлено файлов, новые ошибки и оценка оставшегося времени
+        (после того, как фоновый подсчёт файлов закончен)
+        :param request:
+        :param is_active: функция - продолжать ли импорт (клиент не отключился)
+        :return: генератор ImportProgress
+        """
+        root = Path(request.path)
+        if not root.is_dir():
+            yield pb2.ImportProgress(error=f'Ошибка импорта. {request.path} не является каталогом', done=True)
+            return
+        extensions = normalize_extensions(request.extensions)
+        batch_size = min(request.batch_size or IMPORT_BATCH_SIZE, IMPORT_BATCH_LIMIT)
+        started = time.monotonic()
+        counter = ScanCounter(root, extensions)
+        scan_errors = [] # каталоги, которые не удалось прочитать
+        paths = scan_directory(root, extensions, scan_errors)
+        processed = added = failed = 0
+        try:
+            while True:
+                batch = list(islice(paths, batch_size))
+                errors = []
+                if batch:
+                    try:
+                        batch_added, errors = self.add_paths(batch)
+                    except Exception as err:
+                        yield pb2.ImportProgress(found=counter.found, processed=processed, added=added,
+                                                 failed=failed, error=f'Ошибка импорта. {err}', done=True)
+                        return
+                    processed += len(batch)
+                    added += batch_added
+                    failed += len(errors)
+                errors += scan_errors
+                scan_errors.clear()
+                done = len(batch) < batch_size
+                elapsed = time.monotonic() - started
+                found = max(counter.found, processed)
+                eta = -1
+                if done:
+                    eta = 0
+                elif counter.complete and processed:
+                    eta = (found - processed) * elapsed / processed
+                yield pb2.ImportProgress(found=found if done else counter.found, processed=processed,
+                                         added=added, failed=failed, elapsed=elapsed, eta=eta,
+                                         scan_complete=done or counter.complete, done=done,
+                                         errors=[pb2.SongError(path=path, error=error) for path, error in errors])
+                if done or not is_active():
+                    return
+        finally:
+            counter.cancel()
+
+    def __append_songs(self, songs: list) -> None:
+        # команда: добавление готовых объектов в конец плейлиста
+        if songs:
+            self.playlist.append_items(songs)
+            self.__emit(pb2.PLAYLIST_CHANGED)
 
+    @serialized
     def DeleteSong(self, request, context) -> pb2.ResponseResult:
         """
-        Удаляет объект из двусвязного списка
+        Удаляет объект из плейлиста
         :param request:
         :param context:
         :return: pb2.ResponseResult
@@ -61,33 +398,252 @@ class Player(pb2_grpc.PlayerServicer):
         except Exception as err:
             return pb2.ResponseResult(error=f'Ошибка удаления файла. {err}')
         else:
+            self.__emit(pb2.PLAYLIST_CHANGED)
             return pb2.ResponseResult()
 
     def GetSongIndex(self, request, context) -> pb2.ResponseSongIndex:
         """
-        Возвращает порядковый номер активного объекта в двусвязном списке
+        Возвращает порядковый номер активного объекта в плейлисте
         :param request:
         :param context:
         :return: ResponseSongIndex
         """
-        return pb2.ResponseSongIndex(index=self.__index_playing)
+        return pb2.ResponseSongIndex(index=self.state.index)
+
+    def GetSnapshot(self, request, context) -> pb2.PlayerSnapshot:
+        """
+        Возвращает одним ответом название, длительность и индекс активного трека, паузу,
+        позицию и версию плейлиста; request.mask ограничивает набор полей (пустая маска - все поля)
+        :param request:
+        :param context:
+        :return: PlayerSnapshot
+        """
+        return self.snapshot(request.mask)
+
+    def snapshot(self, mask=None) -> pb2.PlayerSnapshot:
+        """
+        снимок состояния плеера. Вычисляются только поля, указанные в маске
+        :param mask: google.protobuf.FieldMask (None или пустая маска - все поля)
+        :return: PlayerSnapshot
+        """
+        fields = set(mask.paths) if mask is not None and mask.paths else SNAPSHOT_FIELDS
+        if not fields <= SNAPSHOT_FIELDS:
+            return pb2.PlayerSnapshot(error=f'Неизвестные поля снимка: {", ".join(sorted(fields - SNAPSHOT_FIELDS))}')
+        snapshot = pb2.PlayerSnapshot()
+        state = self.state
+        playing_item = state.playing
+        try:
+            if 'title' in fields and playing_item:
+                snapshot.title = str(playing_item)
+            if 'duration' in fields and playing_item:
+                snapshot.duration = playing_item.duration
+            if 'index' in fields:
+                snapshot.index = state.index
+            if 'paused' in fields:
+                snapshot.paused = state.paused
+            if 'playlist_version' in fields:
+                snapshot.playlist_version = state.playlist_version
+                snapshot.epoch = self.epoch
+            if 'position' in fields:
+                snapshot.position = int(self.track_offset + self.audio.position()) if playing_item else -1
+        except Exception as err:
+            snapshot.error = f'Ошибка получения состояния плеера. {err}'
+        return snapshot
+
+    def GetMetrics(self, request, context) -> pb2.ResponseMetrics:
+        """
+        Возвращает метрики сервера: гистограммы времени ответа RPC, проверки файлов и переходов
+        между треками, количество выполняющихся RPC, размер плейлиста и очередей
+        :param request:
+        :param context:
+        :return: ResponseMetrics
+        """
+        try:
+            return pb2.ResponseMetrics(metrics=self.metrics.collect())
+        except Exception as err:
+            return pb2.ResponseMetrics(error=f'Ошибка получения метрик. {err}')
+
+    def StartProfiling(self, request, context) -> pb2.ResponseProfiling:
+        """
+        Запускает профилирование обработчиков RPC на request.seconds секунд (только методы
+        request.methods, если заданы). Результат записывается в файл, путь к которому возвращается
+        сразу: свёрнутые стеки в режиме SAMPLING, pstats в режиме DETERMINISTIC
+        :param request:
+        :param context:
+        :return: ResponseProfiling
+        """
+        try:
+            path = self.profiler.start(request.seconds, request.mode, request.methods, request.file_name,
+                                       request.interval)
+        except Exception as err:
+            return pb2.ResponseProfiling(error=f'Ошибка запуска профилирования. {err}')
+        return pb2.ResponseProfiling(path=str(path))
 
-    # этот метод не является эффективным в плане производительности, но
-    # он сильно упрощает код синхронизации текущего объекта с клиентом
-    @property
-    def __index_playing(self) -> int:
+    def __restore(self, snapshot_path) -> None:
         """
-        Перебором находится активный объект
-        :return: порядковый номер объекта в двусвязном списке
+        команда: восстановление плейлиста, активного трека, паузы и позиции из снимка (объекты треков
+        создаются при первом обращении, см. Playlist.StoredSongs) и повтор журнала изменений после него.
+        Изменения, уже учтённые в снимке, пропускаются по версии плейлиста
+        :param snapshot_path:
+        :return:
         """
+        position = 0.0
+        try:
+            snapshot = PlaylistSnapshot(snapshot_path)
+        except FileNotFoundError:
+            pass
+        except Exception as err:
+            print(f'Ошибка чтения снимка плейлиста. {err}')
+        else:
+            stored = self.Playlist.StoredSongs(snapshot, self.metadata_cache)
+            self.playlist.restore(stored, snapshot.version)
+            if 0 <= snapshot.playing < len(stored):
+                self.playing_item = stored[snapshot.playing]
+                self.paused, position = snapshot.paused, snapshot.position
+        self.journal = PlaylistJournal(f'{snapshot_path}.journal')
+        playlist = self.playlist
+        try:
+            for kind, version, data in self.journal.take_records():
+                if kind == STATE_RECORD:
+                    if version == playlist.version:
+                        playing, self.paused, position = decode(kind, data)
+                        self.playing_item = playlist[playing] if playing >= 0 else None
+                    continue
+                if version <= playlist.version:
+                    continue
+                if version != playlist.version + 1:
+                    raise ValueError(f'после версии плейлиста {playlist.version} записана версия {version}')
+                if kind == pb2.INSERTED:
+                    index, songs = decode(kind, data)
+                    playlist.insert_items(index, [
+                        self.Playlist.SongItem(os.fsdecode(path), duration=None if math.isnan(duration) else duration,
+                                               metadata_cache=self.metadata_cache)
+                        for path, duration in songs])
+                elif kind == pb2.DELETED:
+                    playlist.delete_song(*decode(kind, data))
+                else:
+                    playlist.move_song(*decode(kind, data))
+        except Exception as err:
+            print(f'Ошибка чтения журнала плейлиста. {err}')
+        playlist.journal = self.journal
+        self.__journaled_state = (self.playing_item, self.paused, position)
         if self.playing_item:
-            for idx, song in enumerate(self.playlist):
-                if song is self.playing_item:
-                   return idx
+            try:
+                self.audio.load(self.playing_item.song_path)
+                self.audio.play(start=position)
+                self.track_offset = position
+                if self.paused:
+                    self.audio.pause()
+            except Exception as err:
+                print(f'Ошибка воспроизведения. {err}')
+
+    def save_snapshot(self) -> None:
+        """
+        сжатие журнала: запись снимка плейлиста по последнему опубликованному состоянию и удаление
+        журнала до него (вне потока команд). Изменения после начала сжатия пишутся в новый журнал
+        :return:
+        """
+        if self.journal is None:
+            return
+        with self.__snapshot_lock:
+            self.commands.call(self.journal.rotate)
+            # снимок опубликован после пакета с rotate - в нём есть все изменения из прежнего журнала
+            state = self.state
+            position = self.track_offset + self.audio.position() if state.playing else 0.0
+            write_snapshot(self.snapshot_path, state.songs.records(), state.index, state.paused, position,
+                           state.playlist_version)
+            self.journal.remove_rotated()
+
+    def save_state(self) -> None:
+        """
+        сохранение при остановке сервера: точная позиция трека записывается в журнал; если плейлист
+        менялся после последнего снимка, журнал сжимается, чтобы следующий запуск не повторял изменения
+        :return:
+        """
+        if self.journal is None:
+            return
+        if self.journal.changes:
+            self.save_snapshot()
         else:
-            return -1
-        raise LookupError
+            self.commands.call(self.__journal_position)
+            self.journal.sync()
 
+    def close(self) -> None:
+        """
+        остановка плеера (например, вытеснение неактивного сеанса, см. PlayerSessions): сохранение
+        состояния, как при остановке сервера, и завершение фоновых потоков, потока команд и журнала.
+        Команды после закрытия не выполняются (RuntimeError)
+        :return:
+        """
+        if self.__closed.is_set():
+            return
+        try:
+            self.save_state()
+        finally:
+            self.__closed.set()
+            self.__prefetch_wakeup.set()
+            self.audio.close()
+            self.commands.close()
+            if self.journal is not None:
+                self.journal.close()
+            self.playlist.close()
+
+    def __journal_position(self) -> None:
+        # команда: запись текущей позиции трека в журнал
+        if self.playing_item:
+            self.__journal_state(self.playing_item, self.playlist.index(self.playing_item))
+
+    def __journal_state(self, playing_item, index: int) -> None:
+        # запись активного трека, паузы и позиции в журнал (поток команд)
+        position = self.track_offset + self.audio.position() if playing_item else 0.0
+        self.journal.append(encode_state(self.playlist.version, index, self.paused, position), change=False)
+        self.__journaled_state = (playing_item, self.paused, self.track_offset)
+
+    def __maintain_snapshot(self) -> None:
+        """
+        фоновый поток: периодическая запись позиции проигрываемого трека в журнал и сжатие журнала,
+        когда он становится больше JOURNAL_COMPACT_SIZE
+        :return:
+        """
+        while not self.__closed.wait(SNAPSHOT_INTERVAL):
+            try:
+                state = self.state
+                if state.playing and not state.paused:
+                    self.commands.call(self.__journal_position)
+                if self.journal.size > JOURNAL_COMPACT_SIZE:
+                    self.save_snapshot()
+            except Exception as err:
+                print(f'Ошибка записи снимка плейлиста. {err}')
+
+    def __emit(self, event) -> None:
+        # событие для журнала; записывается после публикации снимка состояния (в потоке команд)
+        self.__pending_events.append(event)
+
+    def __publish_state(self) -> None:
+        """
+        публикация снимка состояния после пакета команд (в потоке команд) за O(log n): при изменении
+        плейлиста публикуются корень его дерева и общая история изменений, без копирования
+        :return:
+        """
+        state = self.state
+        playlist = self.playlist
+        if playlist.version != state.playlist_version:
+            state = state._replace(playlist_version=playlist.version, songs=playlist.songs(),
+                                   changes=playlist.changes)
+        playing_item = self.playing_item
+        self.state = state._replace(playing=playing_item, paused=self.paused,
+                                    index=playlist.index(playing_item) if playing_item else -1)
+        if self.journal is not None:
+            if (playing_item, self.paused, self.track_offset) != self.__journaled_state:
+                self.__journal_state(playing_item, self.state.index)
+            # записи пакета команд передаются в файл до ответов на команды
+            self.journal.write()
+        events, self.__pending_events = self.__pending_events, []
+        for event in events:
+            self.events.publish(event)
+
+    @with_snapshot
+    @serialized
     def Play(self, request, context) -> pb2.ResponseResult:
         """
         Запучкает проигрывание файла
@@ -98,32 +654,43 @@ class Player(pb2_grpc.PlayerServicer):
         if request:
             # если запрос на проигрывание получен от пользователя
             # получаем нужный объект по его индексу
-            self.playing_item = self.playlist[request.index]
+            try:
+                self.playing_item = self.playlist[request.index]
+            except Exception as err:
+                return pb2.ResponseResult(error=f'Ошибка выбора трека. {err}')
         elif not self.playing_item:
             # если нет активной композиции - проигрывается первая
             self.playing_item = self.playlist.head
+        # предзагрузка метаданных продолжается от нового активного трека
+        self.__prefetch_wakeup.set()
 
         if self.paused:
             # если плеер был на паузе - возобновлем проигрывание
             try:
-                mixer.music.unpause()
+                self.audio.unpause()
             except Exception as err:
                 return pb2.ResponseResult(error=f'Ошибка возобновления проигрывания. {err}')
             else:
                 self.paused = False
+                self.__emit(pb2.PLAYING)
 
         elif self.playing_item:
             # если паузы не было - получем путь к файлу из объекта ItemSong
             path = self.playing_item.song_path
             try:
                 # запускаем модуль проигрывания композиции
-                mixer.music.load(path)
-                mixer.music.play()
+                self.audio.load(path)
+                self.audio.play()
+                self.track_offset = 0.0
             except Exception as err:
                 return pb2.ResponseResult(error=f'Ошибка воспроизведения. {err}')
+            finally:
+                self.__emit(pb2.NEW_SONG)
 
         return pb2.ResponseResult()
 
+    @with_snapshot
+    @serialized
     def Pause(self, request, context) -> pb2.ResponseResult:
         """
         Пауза воспроизведения
@@ -132,13 +699,16 @@ class Player(pb2_grpc.PlayerServicer):
         :return: ResponseResult
         """
         try:
-            mixer.music.pause()
+            self.audio.pause()
         except Exception as err:
             return pb2.ResponseResult(error=f'Ошибка приостановки воспроизведения. {err}')
         else:
             self.paused = True
+            self.__emit(pb2.PAUSED)
         return pb2.ResponseResult()
 
+    @with_snapshot
+    @serialized
     def Stop(self, request, contex) -> pb2.ResponseResult:
         """
         Остановка воспроизведения
@@ -150,9 +720,12 @@ class Player(pb2_grpc.PlayerServicer):
         self.stopped = True
         self.playing_item = None
         self.paused = False
-        mixer.music.stop()
+        self.__emit(pb2.STOPED)
+        self.audio.stop()
         return pb2.ResponseResult()
 
+    @with_snapshot
+    @serialized
     def Next(self, request, contex) -> pb2.ResponseResult:
         """
         Запуск воспроизведения следующей композиции
@@ -160,8 +733,8 @@ class Player(pb2_grpc.PlayerServicer):
         :param contex:
         :return: ResponseResult
         """
-        # установка не реагировать на эту остановку воспроизведения
-        self.react_to_next_new_song_event = False
+        if not self.playing_item:
+            return pb2.ResponseResult(error='Нет активного трека')
         # получаем следующую композицию из двусвязного списка
         if next_item:= self.playing_item.next_song:
             try:
@@ -181,6 +754,8 @@ class Player(pb2_grpc.PlayerServicer):
                 return pb2.ResponseResult(error=f'Сбой в структуре плейлиста Next. {RuntimeError}')
         return pb2.ResponseResult()
 
+    @with_snapshot
+    @serialized
     def Prev(self, request, contex) -> pb2.ResponseResult:
         """
         Запуск воспроизведения предыдущей композиции
@@ -188,7 +763,8 @@ class Player(pb2_grpc.PlayerServicer):
         :param contex:
         :return: ResponseResult
         """
-        self.react_to_next_new_song_event = False
+        if not self.playing_item:
+            return pb2.ResponseResult(error='Нет активного трека')
         if prev_item := self.playing_item.prev_song:
             try:
                 self.Stop(None, None)
@@ -211,13 +787,15 @@ class Player(pb2_grpc.PlayerServicer):
         """
         try:
             # получаем информацию из активного объекта
+            playing_item = self.state.playing
             song_info =  pb2.ResponseSongInformation(
-                title = self.playing_item.song_path.stem,
-                duration = self.playing_item.duration)
+                title = playing_item.song_path.stem,
+                duration = playing_item.duration)
         except Exception as err:
-            return pb2.ResponseResult(error=f'Ошибка получения информации о файле. {err}')
+            return pb2.ResponseSongInformation(error=f'Ошибка получения информации о файле. {err}')
         return song_info
 
+    @serialized
     def SetPosition(self, request, context) -> pb2.ResponseResult:
         """
         Установка позиции трека (не работает)
@@ -227,7 +805,8 @@ class Player(pb2_grpc.PlayerServicer):
         """
         # Не работает как следует функция установки позиции в библиотеке pygame.mixer
         try:
-            mixer.music.play(request.position*1000)
+            self.audio.play(start=request.position)
+            self.track_offset = request.position
         except Exception as err:
             return pb2.ResponseResult(error=f'Ошибка получения информации о файле. {err}')
         return pb2.ResponseResult()
@@ -239,130 +818,1143 @@ class Player(pb2_grpc.PlayerServicer):
         :param context:
         :return: ResponsePaused
         """
+        state = self.state
         paused = -1
-        if self.playing_item:
-            paused = int(self.paused)
+        if state.playing:
+            paused = int(state.paused)
         return pb2.ResponsePaused(result=paused)
 
     def GetPlayList(self, request, contex) -> pb2.ResponsePlaylist:
         """
-        Возвращает список названий композиций и индекс проигрываемой композиции
+        Возвращает список названий композиций, индекс проигрываемой композиции и версию плейлиста
         :param request:
         :param contex:
         :return: ResponsePlaylist
         """
+        state = self.state
         try:
             playlist = pb2.ResponsePlaylist(
-                song_title=[str(item) for item in self.playlist],
-                playing = self.__index_playing)
+                song_title=[str(item) for item in state.songs],
+                playing = state.index,
+                version = state.playlist_version,
+                epoch = self.epoch)
         except Exception as err:
-            return pb2.ResponseResult(error=f'Ошибка получения плейлиста. {err}')
+            return pb2.ResponsePlaylist(error=f'Ошибка получения плейлиста. {err}')
         return playlist
 
-    def GetPlayerStatus(self, request, contex) -> pb2.ResponsePlayerStatus:
+    def GetPlayListRange(self, request, context) -> pb2.ResponsePlaylist:
         """
-        Возвращает состояние плеера - Воспроизведение/Пауза/Было переключение трека на следующий/
-                                      Текущее время проигрывания трека
+        Возвращает названия композиций с позиции request.offset, не более request.limit
+        (и не более PLAYLIST_PAGE_LIMIT) штук
         :param request:
-        :param contex:
-        :return: ResponsePlayerStatus
+        :param context:
+        :return: ResponsePlaylist
         """
-        self.status.append(pb2.PLAYING if self.playing_item else pb2.WAITING)
-        if self.paused: self.status.append(pb2.PAUSED)
+        limit = min(request.limit or PLAYLIST_PAGE_LIMIT, PLAYLIST_PAGE_LIMIT)
         try:
-            song_position = int(mixer.music.get_pos()/1000)
+            playlist = self.playlist_page(request.offset, limit)
         except Exception as err:
-            return pb2.ResponsePlayerStatus(error=f'Ошибка получения текущей позиции. {err}')
+            return pb2.ResponsePlaylist(error=f'Ошибка получения плейлиста. {err}')
+        return playlist
 
-        yield pb2.ResponsePlayerStatus(status=self.status, position=song_position)
-        self.status.clear()
+    def StreamPlayList(self, request, context) -> pb2.ResponsePlaylist:
+        """
+        Передаёт плейлист потоком частей по request.chunk_size названий начиная с request.offset
+        (всего не более request.limit, если задано). Следующая часть формируется только когда
+        gRPC готов её отправить, поэтому память на сервере ограничена одной частью.
+        Если плейлист изменился во время передачи, версия в следующих частях будет другой
+        :param request:
+        :param context:
+        :return: поток ResponsePlaylist
+        """
+        chunk_size = min(request.chunk_size or PLAYLIST_PAGE_LIMIT, PLAYLIST_PAGE_LIMIT)
+        offset = request.offset
+        end = offset + request.limit if request.limit else None
+        while context.is_active():
+            limit = chunk_size if end is None else min(chunk_size, end - offset)
+            try:
+                chunk = self.playlist_page(offset, limit)
+            except Exception as err:
+                yield pb2.ResponsePlaylist(error=f'Ошибка получения плейлиста. {err}')
+                return
+            yield chunk
+            offset += len(chunk.song_title)
+            if not chunk.song_title or offset >= chunk.total or offset == end:
+                return
 
-    def __end_playing_event(self) -> None:
+    def playlist_page(self, offset: int, limit: int) -> pb2.ResponsePlaylist:
+        """
+        часть плейлиста из последнего снимка состояния
+        :param offset:
+        :param limit:
+        :return: ResponsePlaylist
         """
-        функция циклично проверяет объект pygame на наличие события завершения трека
+        state = self.state
+        total = len(state.songs)
+        if not 0 <= offset <= total:
+            raise IndexError(offset)
+        titles = [str(item) for item in state.songs[offset:offset + limit]]
+        return pb2.ResponsePlaylist(song_title=titles, playing=state.index, version=state.playlist_version,
+                                    epoch=self.epoch, offset=offset, total=total)
+
+    def SearchPlaylist(self, request, context) -> pb2.ResponseSearchPlaylist:
+        """
+        Поиск треков по названию без учёта регистра (request.mode: подстрока или начало названия).
+        Возвращает позиции и названия не более request.limit (и не более PLAYLIST_PAGE_LIMIT)
+        треков начиная с позиции request.offset. Индекс поиска строится в фоне после первого запроса
+        (см. __index_playlist); пока он строится, ответ - indexing без результатов
+        :param request:
+        :param context:
+        :return: ResponseSearchPlaylist
+        """
+        limit = min(request.limit or PLAYLIST_PAGE_LIMIT, PLAYLIST_PAGE_LIMIT)
+        try:
+            if self.playlist.search_index is None:
+                self.__start_indexing()
+                return pb2.ResponseSearchPlaylist(indexing=True, version=self.state.playlist_version)
+            found, songs, version = self.commands.call(self.__search, request.query, request.mode == pb2.PREFIX,
+                                                       max(request.offset, 0), limit)
+            # названия - по неизменяемому списку треков той же версии, вне потока команд
+            result = pb2.ResponseSearchPlaylist(index=found, song_title=[str(songs[position]) for position in found],
+                                                version=version)
+        except Exception as err:
+            return pb2.ResponseSearchPlaylist(error=f'Ошибка поиска в плейлисте. {err}')
+        return result
+
+    def __search(self, query: str, prefix: bool, offset: int, limit: int) -> tuple:
+        """
+        поиск в потоке команд - позиции соответствуют текущей версии плейлиста
+        :param query:
+        :param prefix:
+        :param offset:
+        :param limit:
+        :return: (список позиций, треки этой версии плейлиста, версия плейлиста)
+        """
+        found = self.playlist.search_index.search(query, prefix, offset, limit)
+        return found, self.playlist.songs(), self.playlist.version
+
+    def __start_indexing(self) -> None:
+        # запуск построения индекса поиска, если оно ещё не запущено
+        with self.__indexing_lock:
+            if self.__indexing:
+                return
+            self.__indexing = True
+        Thread(target=self.__index_playlist, name='search-index', daemon=True).start()
+
+    def __index_playlist(self) -> None:
+        """
+        построение индекса поиска по снимку состояния вне потока команд: названия треков,
+        восстановленных из снимка, берутся из путей снимка без создания объектов. Если за время
+        построения плейлист изменился больше, чем хранит история изменений, индекс строится заново
+        по новому снимку. При ошибке следующий запрос запустит построение снова
         :return:
         """
         try:
-            while True:
-                for event in pygame.event.get():
-                    if self.react_to_next_new_song_event and event.type == pb2.NEW_SONG:
-                        self.status.append(pb2.NEW_SONG)
-                        self.Next(None, None)
-                    self.react_to_next_new_song_event = True
-                time.sleep(0.5)
+            attached = False
+            while not attached:
+                state = self.state
+                index = PlaylistSearchIndex(state.songs.titles(), state.playlist_version)
+                attached = self.commands.call(self.playlist.attach_search_index, index)
+        except Exception as err:
+            # после закрытия плеера (close) команды не выполняются - индекс больше не нужен
+            if not self.__closed.is_set():
+                print(f'Ошибка построения индекса поиска. {err}')
+        finally:
+            with self.__indexing_lock:
+                self.__indexing = False
+
+    def GetPlaylistDelta(self, request, context) -> pb2.ResponsePlaylistDelta:
+        """
+        Возвращает изменения плейлиста (вставки, удаления, перемещения) после версии request.version.
+        Если версия получена в другом запуске плеера (request.epoch), слишком старая или вставленных
+        после неё треков больше PLAYLIST_PAGE_LIMIT
+        (ответ с названиями мог бы превысить ограничение размера сообщения gRPC), возвращается
+        reset - клиент должен загрузить плейлист заново. При request.counts_only вставки передаются
+        только количеством треков (PlaylistEdit.count) без названий и ограничения нет
+        :param request:
+        :param context:
+        :return: ResponsePlaylistDelta
+        """
+        state = self.state
+        try:
+            changes = state.changes_since(request.version) if request.epoch == self.epoch else None
+            if changes is not None and not request.counts_only and \
+                    sum(len(songs) for *_, songs in changes) > PLAYLIST_PAGE_LIMIT:
+                changes = None
+            if changes is None:
+                return pb2.ResponsePlaylistDelta(version=state.playlist_version, reset=True, playing=state.index,
+                                                 epoch=self.epoch)
+            edits = [pb2.PlaylistEdit(kind=kind, index=index, to_index=to_index, count=len(songs),
+                                      song_title=() if request.counts_only else [str(song) for song in songs])
+                     for _, kind, index, to_index, songs in changes]
+            delta = pb2.ResponsePlaylistDelta(version=state.playlist_version, edits=edits, playing=state.index,
+                                              epoch=self.epoch)
+        except Exception as err:
+            return pb2.ResponsePlaylistDelta(error=f'Ошибка получения изменений плейлиста. {err}')
+        return delta
+
+    @serialized
+    def MoveSong(self, request, context) -> pb2.ResponseResult:
+        """
+        Перемещает объект плейлиста на новую позицию
+        :param request:
+        :param context:
+        :return: ResponseResult
+        """
+        try:
+            self.playlist.move_song(request.index, request.to_index)
         except Exception as err:
-            raise err
+            return pb2.ResponseResult(error=f'Ошибка перемещения файла. {err}')
+        else:
+            self.__emit(pb2.PLAYLIST_CHANGED)
+            return pb2.ResponseResult()
+
+    def GetPlayerStatus(self, request, context) -> pb2.ResponsePlayerStatus:
+        """
+        Подписка на состояние плеера - Воспроизведение/Пауза/Было переключение трека/Изменился плейлист/
+                                       Текущее время проигрывания трека.
+        Сообщение отправляется сразу после подписки и затем только при появлении новых событий
+        в журнале, а также раз в request.heartbeat секунд (если задано, не чаще MIN_STATUS_HEARTBEAT)
+        для обновления позиции. Если задан request.from_sequence, подписка продолжается с этого номера события
+        (номер из другого запуска плеера - request.epoch - не подходит: события считаются потерянными)
+        :param request:
+        :param context:
+        :return: поток ResponsePlayerStatus
+        """
+        heartbeat = status_heartbeat(request)
+        # курсор подписчика в журнале событий
+        sequence, resumed = self.status_cursor(request)
+        send = True
+        next_heartbeat = time.monotonic()
+        while context.is_active():
+            if send:
+                events, last_sequence, lost = self.events.read(sequence)
+                lost = lost or not resumed
+            else:
+                timeout = STATUS_IDLE_CHECK
+                if heartbeat > 0:
+                    timeout = min(timeout, max(next_heartbeat - time.monotonic(), 0))
+                events, last_sequence, lost = self.events.wait(sequence, timeout)
+            now = time.monotonic()
+            if not (send or events or lost or (heartbeat > 0 and now >= next_heartbeat)):
+                continue
+
+            yield self.status_message(events, last_sequence, lost)
+            sequence = last_sequence
+            send = False
+            next_heartbeat = now + heartbeat
+
+    def status_cursor(self, request) -> tuple:
+        """
+        начальный курсор подписки на состояние
+        :param request: RequestPlayerStatus
+        :return: (номер события, продолжается ли подписка с request.from_sequence - иначе
+                  события, пропущенные клиентом, потеряны)
+        """
+        if not request.from_sequence:
+            return self.events.last_sequence, True
+        if request.epoch != self.epoch:
+            return self.events.last_sequence, False
+        return request.from_sequence, True
+
+    def status_message(self, events: list, last_sequence: int, lost: bool) -> pb2.ResponsePlayerStatus:
+        """
+        сообщение потока состояния плеера
+        :param events: новые события журнала для подписчика
+        :param last_sequence: номер последнего события
+        :param lost: потеряны ли события
+        :return: ResponsePlayerStatus
+        """
+        state = self.state
+        status = [pb2.PLAYING if state.playing else pb2.WAITING]
+        if state.paused:
+            status.append(pb2.PAUSED)
+        # если события потеряны, клиент должен обновить и трек, и плейлист
+        status.extend(event for event in (pb2.NEW_SONG, pb2.PLAYLIST_CHANGED) if lost or event in events)
+        try:
+            song_position = int(self.track_offset + self.audio.position())
+        except Exception as err:
+            return pb2.ResponsePlayerStatus(status=status, position=-1, sequence=last_sequence, epoch=self.epoch,
+                                            events_lost=lost, error=f'Ошибка получения текущей позиции. {err}')
+        return pb2.ResponsePlayerStatus(status=status, position=song_position, sequence=last_sequence,
+                                        epoch=self.epoch, events_lost=lost)
+
+    def __end_playing_event(self) -> None:
+        """
+        функция ожидает от звукового модуля событие завершения трека (блокирующее ожидание без опроса)
+        и ставит переход к следующему треку в очередь команд. Время перехода сохраняется в transition_gaps
+        :return:
+        """
+        # выход - звуковой модуль завершён (остановка сервера)
+        while self.audio.wait_track_end():
+            track_ended = time.monotonic()
+            try:
+                started = self.commands.call(self.__track_ended)
+            except RuntimeError:
+                if self.__closed.is_set():
+                    # плеер закрыт между событием и командой
+                    return
+                raise
+            if started:
+                gap = time.monotonic() - track_ended
+                self.transition_gaps.append(gap)
+                self.__transition_gap.observe(gap)
+
+    def __track_ended(self) -> bool:
+        """
+        команда: переход к следующему треку по событию окончания. Событие приходит и при остановке
+        трека командами Next/Prev/Stop/Play - тогда к моменту обработки уже играет другой трек
+        (или активного трека нет) и событие пропускается. После последнего трека плейлиста
+        следующий не запускается
+        :return: был ли запущен следующий трек
+        """
+        if not self.playing_item or self.paused or self.audio.busy():
+            return False
+        next_item = self.playing_item.next_song
+        if next_item is None:
+            return False
+        result = self.Next(None, None)
+        return not result.error and self.playing_item is next_item
+
+    def __prefetch_metadata(self) -> None:
+        """
+        фоновое чтение метаданных треков: обход от активного трека в обе стороны плейлиста.
+        При добавлении треков или смене активного обход начинается заново
+        :return:
+        """
+        while True:
+            self.__prefetch_wakeup.wait()
+            if self.__closed.is_set():
+                return
+            self.__prefetch_wakeup.clear()
+            # обход снимка состояния - плейлист может меняться потоком команд
+            state = self.state
+            start = max(state.index, 0)
+            forward, backward = state.songs.iterate(start), state.songs.iterate(start - 1, reverse=True)
+            resolved = 0
+            while not self.__prefetch_wakeup.is_set():
+                items = [item for item in (next(forward, None), next(backward, None)) if item is not None]
+                if not items:
+                    break
+                for item in items:
+                    if not item.has_metadata:
+                        try:
+                            item.duration
+                        except Exception:
+                            # файл недоступен - ошибка вернётся клиенту при обращении к треку
+                            pass
+                        resolved += 1
+                        if self.metadata_cache is not None and resolved % PREFETCH_FLUSH_EVERY == 0:
+                            self.metadata_cache.flush()
+                        # низкий приоритет - уступаем GIL потокам обработки запросов
+                        time.sleep(PREFETCH_PAUSE)
+            if self.metadata_cache is not None:
+                self.metadata_cache.flush()
 
     class Playlist:
         """
-        класс двусвязного списка
+        класс плейлиста - неявное декартово дерево (treap), ключом в котором служит позиция трека.
+        Доступ по индексу, поиск индекса объекта, вставка и удаление выполняются за O(log n).
+        Дерево персистентное: изменение создаёт новые узлы только на пути от корня, поэтому
+        корень прежней версии остаётся неизменным и публикуется читающим потокам за O(1) (SongsView).
+        Дополнительно объекты связаны в двусвязный список (prev_song/next_song) для
+        переходов Next/Prev и итерации за O(1) на шаг
         """
-        head = None
-        tail = None
 
         class SongItem:
             """
-            класс объектов двусвязного списка
+            класс объектов плейлиста (элемент двусвязного списка). Поля хранятся в слотах
+            без словаря атрибутов, путь - общей для треков каталога строкой и именем файла
+            (объект Path создаётся только при обращении к song_path)
             """
-            def __init__(self, song_path, previous_song=None, next_song=None):
-                self.song_path = Path(song_path) # путь к треку
-                self.duration = MP3(song_path).info.length # длительность трека
+            __slots__ = ('directory', 'name', '_duration', 'metadata_cache', 'prev_song', 'next_song', 'node')
+
+            def __init__(self, song_path, previous_song=None, next_song=None, duration=None, metadata_cache=None):
+                directory, self.name = os.path.split(os.fspath(song_path))
+                # каталог трека - одна строка на все треки каталога
+                self.directory = sys.intern(directory)
+                # длительность трека - если не передана, читается при первом обращении
+                self._duration: Optional[float] = duration
+                self.metadata_cache = metadata_cache # кэш метаданных для отложенного чтения
                 self.prev_song = previous_song # предыдущий объект
                 self.next_song = next_song # следующий объект
+                self.node = None # узел объекта в последней версии дерева (None - объекта нет в плейлисте)
+
+            @property
+            def song_path(self) -> Path:
+                # путь к треку
+                return Path(self.directory, self.name)
+
+            @property
+            def duration(self) -> float:
+                # длительность трека (не более одного чтения заголовка при первом обращении)
+                if self._duration is None:
+                    if self.metadata_cache is not None:
+                        self._duration = self.metadata_cache.get(self.song_path).duration
+                    else:
+                        self._duration = MP3(self.song_path).info.length
+                return self._duration
+
+            @property
+            def has_metadata(self) -> bool:
+                # прочитаны ли уже метаданные трека
+                return self._duration is not None
+
+            def record(self) -> tuple:
+                # запись для снимка плейлиста: (путь в байтах, длительность или NaN)
+                return (os.fsencode(os.path.join(self.directory, self.name)),
+                        self._duration if self._duration is not None else math.nan)
 
             def __str__(self):
-                # название трека из его пути
-                return self.song_path.stem
+                return song_title(self.name)
 
-        def __init__(self):
-            pass
+        class Node:
+            """
+            узел дерева плейлиста. Поля item, left, right, size и priority не меняются после создания
+            узла (кроме новых узлов при построении в _build), поэтому узлы опубликованных версий
+            читаются без блокировок. parent - родитель в последней версии дерева: меняется потоком
+            команд и нужен только для Playlist.index
+            """
+            __slots__ = ('item', 'left', 'right', 'parent', 'size', 'priority')
+
+            def __init__(self, item, left=None, right=None, priority: Optional[float] = None):
+                self.item = item # объект SongItem
+                self.left = left # левое поддерево
+                self.right = right # правое поддерево
+                self.parent = None # родительский узел
+                self.size = 1 + (left.size if left else 0) + (right.size if right else 0) # узлов в поддереве
+                # приоритет узла (куча по приоритетам); копия узла сохраняет приоритет
+                self.priority = random.random() if priority is None else priority
+                if left:
+                    left.parent = self
+                if right:
+                    right.parent = self
+                item.node = self
+
+        class StoredSongItem(SongItem):
+            """
+            объект плейлиста, восстановленный из снимка. Путь, длительность, соседние объекты и узел
+            читаются из снимка (см. StoredSongs) при первом обращении (__getattr__ вызывается только
+            для незаполненного слота) и дальше хранятся в слотах как у SongItem
+            """
+            __slots__ = ('stored', 'stored_index')
+
+            def __init__(self, stored, stored_index: int):
+                self.stored = stored # Playlist.StoredSongs
+                self.stored_index = stored_index # позиция в снимке
+
+            def __getattr__(self, name: str):
+                stored, index = self.stored, self.stored_index
+                if name == 'directory' or name == 'name':
+                    directory, self.name = os.path.split(stored.snapshot.song_path(index))
+                    self.directory = sys.intern(directory)
+                elif name == '_duration':
+                    self._duration = stored.snapshot.duration(index)
+                elif name == 'metadata_cache':
+                    self.metadata_cache = stored.metadata_cache
+                elif name == 'prev_song':
+                    self.prev_song = stored.item(index - 1)
+                elif name == 'next_song':
+                    self.next_song = stored.item(index + 1)
+                elif name == 'node':
+                    self.node = stored.node(index)
+                else:
+                    raise AttributeError(f'{type(self).__name__} не имеет атрибута {name}')
+                return object.__getattribute__(self, name)
+
+            def record(self) -> tuple:
+                # путь копируется из снимка без декодирования; длительность могла быть прочитана позже
+                raw_path, duration = self.stored.snapshot.record(self.stored_index)
+                if math.isnan(duration):
+                    try:
+                        known = object.__getattribute__(self, '_duration')
+                    except AttributeError:
+                        known = None
+                    if known is not None:
+                        duration = known
+                return raw_path, duration
+
+        class StoredNode(Node):
+            """
+            узел дерева, восстановленного из снимка: поля вычисляются по позиции в снимке
+            (см. StoredSongs) при первом обращении, как у StoredSongItem
+            """
+            __slots__ = ('stored', 'stored_index')
+
+            def __init__(self, stored, stored_index: int):
+                self.stored = stored # Playlist.StoredSongs
+                self.stored_index = stored_index # позиция в снимке
+
+            def __getattr__(self, name: str):
+                stored, index = self.stored, self.stored_index
+                if name == 'item' or name == 'left' or name == 'right' or name == 'size':
+                    # при обходе дерева нужны все четыре поля - заполняются одним вызовом
+                    self.item = stored.item(index)
+                    self.left = stored.left(index)
+                    self.right = stored.right(index)
+                    self.size = stored.size(index)
+                elif name == 'parent':
+                    self.parent = stored.parent(index)
+                elif name == 'priority':
+                    self.priority = stored.priority(index)
+                else:
+                    raise AttributeError(f'{type(self).__name__} не имеет атрибута {name}')
+                return object.__getattribute__(self, name)
+
+        class StoredSongs:
+            """
+            треки плейлиста, восстановленного из снимка: объекты StoredSongItem и StoredNode создаются
+            при первом обращении к треку. Дерево - сбалансированное по позициям (позиция p = индекс + 1
+            на высоте, равной числу нулевых младших битов p), поэтому связи узла вычисляются из его позиции.
+            Приоритеты узлов на высоте h - случайные из [1 - 2^-h, 1 - 2^-(h+1)): свойство кучи
+            выполняется, а новые узлы со случайным приоритетом встают на ту же глубину, что и в
+            обычном декартовом дереве. До первого изменения плейлиста служит списком треков
+            снимка состояния (PlayerState.songs)
+            """
+
+            def __init__(self, snapshot: PlaylistSnapshot, metadata_cache: Optional[MetadataCache] = None):
+                self.snapshot = snapshot
+                self.metadata_cache = metadata_cache
+                self.count = len(snapshot)
+                self.root_position = 1 << (self.count.bit_length() - 1) if self.count else 0
+                self.__items = [None] * self.count # созданные объекты по позициям
+                self.__nodes = [None] * self.count # созданные узлы по позициям
+                # объекты создаются и потоком команд, и читающими потоками
+                self.__lock = Lock()
+
+            def item(self, index: int):
+                """
+                объект трека по индексу в снимке (создаётся при первом обращении)
+                :param index:
+                :return: StoredSongItem или None, если индекс вне снимка
+                """
+                if not 0 <= index < self.count:
+                    return None
+                item = self.__items[index]
+                if item is None:
+                    with self.__lock:
+                        item = self.__items[index]
+                        if item is None:
+                            item = self.__items[index] = Player.Playlist.StoredSongItem(self, index)
+                return item
+
+            def node(self, index: int):
+                """
+                узел дерева по индексу в снимке (создаётся при первом обращении)
+                :param index:
+                :return: StoredNode или None, если индекс вне снимка
+                """
+                if not 0 <= index < self.count:
+                    return None
+                node = self.__nodes[index]
+                if node is None:
+                    with self.__lock:
+                        node = self.__nodes[index]
+                        if node is None:
+                            node = self.__nodes[index] = Player.Playlist.StoredNode(self, index)
+                return node
+
+            @staticmethod
+            def _height(position: int) -> int:
+                return (position & -position).bit_length() - 1
+
+            def left(self, index: int):
+                position = index + 1
+                height = self._height(position)
+                return self.node(position - (1 << (height - 1)) - 1) if height else None
+
+            def right(self, index: int):
+                # позиции больше count отсутствуют - правым потомком становится первый
+                # существующий узел при спуске влево от отсутствующего
+                position = index + 1
+                height = self._height(position)
+                if not height:
+                    return None
+                step = 1 << (height - 1)
+                child = position + step
+                while child > self.count:
+                    step >>= 1
+                    if not step:
+                        return None
+                    child -= step
+                return self.node(child - 1)
+
+            def parent(self, index: int):
+                # подъём через отсутствующие позиции до первого существующего предка
+                position = index + 1
+                height = self._height(position)
+                while position != self.root_position:
+                    if position >> (height + 1) & 1:
+                        position -= 1 << height
+                    else:
+                        position += 1 << height
+                    height += 1
+                    if position <= self.count:
+                        return self.node(position - 1)
+                return None
+
+            def subtree(self, index: int) -> range:
+                # индексы снимка в поддереве узла index по порядку (поддерево узла из снимка не меняется -
+                # изменения плейлиста создают новые узлы)
+                position = index + 1
+                half = 1 << self._height(position)
+                return range(position - half, min(position + half - 1, self.count))
+
+            def size(self, index: int) -> int:
+                return len(self.subtree(index))
+
+            def priority(self, index: int) -> float:
+                height = self._height(index + 1)
+                return 1 - 2.0 ** -height + 2.0 ** -(height + 1) * random.random()
+
+            def __len__(self) -> int:
+                return self.count
+
+            def __getitem__(self, index):
+                if isinstance(index, slice):
+                    return [self.item(i) for i in range(*index.indices(self.count))]
+                if index < 0:
+                    index += self.count
+                if not 0 <= index < self.count:
+                    raise IndexError(index)
+                return self.item(index)
+
+            def __iter__(self):
+                return self.iterate()
+
+            def iterate(self, start: int = 0, reverse: bool = False):
+                """
+                обход треков с позиции start (см. SongsView.iterate)
+                :param start:
+                :param reverse: к началу плейлиста
+                :return:
+                """
+                if reverse:
+                    indices = range(min(start, self.count - 1), -1, -1)
+                else:
+                    indices = range(max(start, 0), self.count)
+                for index in indices:
+                    yield self.item(index)
+
+            def records(self, indices: Optional[range] = None):
+                # записи для следующего снимка; треки без созданных объектов копируются из снимка
+                items, record = self.__items, self.snapshot.record
+                for index in range(self.count) if indices is None else indices:
+                    item = items[index]
+                    yield record(index) if item is None else item.record()
 
-        def append_songs(self, *items):
+            def titles(self, indices: Optional[range] = None):
+                # названия треков; для треков без созданных объектов - из пути в снимке, объекты не создаются
+                items, raw_path = self.__items, self.snapshot.raw_path
+                for index in range(self.count) if indices is None else indices:
+                    item = items[index]
+                    yield song_title(os.fsdecode(os.path.basename(raw_path(index)))) if item is None else str(item)
+
+        class SongsView:
+            """
+            неизменяемый список треков одной версии плейлиста - корень персистентного дерева.
+            Создаётся за O(1) при публикации снимка состояния (PlayerState.songs); доступ по индексу -
+            O(log n), срез и обход с позиции - O(log n + k). Читается без блокировок: узлы этой
+            версии поток команд не изменяет
+            """
+            __slots__ = ('root',)
+
+            def __init__(self, root):
+                self.root = root
+
+            def __len__(self) -> int:
+                return self.root.size if self.root else 0
+
+            def __getitem__(self, index):
+                if isinstance(index, slice):
+                    start, stop, step = index.indices(len(self))
+                    if step != 1:
+                        return list(self)[index]
+                    return list(islice(self.iterate(start), max(stop - start, 0)))
+                if index < 0:
+                    index += len(self)
+                if not 0 <= index < len(self):
+                    raise IndexError(index)
+                return Player.Playlist._find(self.root, index).item
+
+            def __iter__(self):
+                return self.iterate()
+
+            def iterate(self, start: int = 0, reverse: bool = False):
+                """
+                обход треков с позиции start
+                :param start:
+                :param reverse: к началу плейлиста (start, start - 1, ... 0)
+                :return:
+                """
+                for node, indices in self._walk(start, reverse):
+                    if indices is None:
+                        yield node.item
+                    else:
+                        yield from map(node.item, indices)
+
+            def records(self):
+                # записи для снимка плейлиста; треки без созданных объектов копируются из снимка
+                for node, indices in self._walk(0, False):
+                    if indices is None:
+                        yield node.item.record()
+                    else:
+                        yield from node.records(indices)
+
+            def titles(self):
+                # названия треков по порядку; треки снимка - без создания объектов (см. StoredSongs.titles)
+                for node, indices in self._walk(0, False):
+                    if indices is None:
+                        yield str(node.item)
+                    else:
+                        yield from node.titles(indices)
+
+            def _walk(self, start: int, reverse: bool):
+                """
+                узлы по порядку с позиции start: спуск от корня до start, дальше - симметричный обход
+                со стеком узлов пути. Поддерево узла из снимка (StoredNode) после восстановления
+                не менялось, поэтому вместо его узлов выдаётся диапазон индексов снимка
+                :param start:
+                :param reverse: к началу плейлиста
+                :return: пары (узел, None) или (StoredSongs, индексы снимка)
+                """
+                stored_node = Player.Playlist.StoredNode
+
+                def subtree(node, skip: int = 0) -> tuple:
+                    # индексы снимка поддерева без первых skip в порядке обхода
+                    indices = node.stored.subtree(node.stored_index)
+                    if reverse:
+                        return node.stored, indices[:max(len(indices) - skip, 0)][::-1]
+                    return node.stored, indices[skip:]
+
+                # при обратном обходе поддеревья меняются местами, позиция отсчитывается с конца
+                position = max(len(self) - 1 - start if reverse else start, 0)
+                stack = []
+                node = self.root
+                while node:
+                    if isinstance(node, stored_node):
+                        stack.append(subtree(node, position))
+                        break
+                    near = node.right if reverse else node.left
+                    near_size = near.size if near else 0
+                    if position < near_size:
+                        stack.append((node, None))
+                        node = near
+                    elif position == near_size:
+                        stack.append((node, None))
+                        break
+                    else:
+                        position -= near_size + 1
+                        node = node.left if reverse else node.right
+                while stack:
+                    entry = stack.pop()
+                    yield entry
+                    node, indices = entry
+                    if indices is not None:
+                        continue
+                    node = node.left if reverse else node.right
+                    while node:
+                        if isinstance(node, stored_node):
+                            stack.append(subtree(node))
+                            break
+                        stack.append((node, None))
+                        node = node.right if reverse else node.left
+
+        def __init__(self, probe_workers: int = 8, metadata_cache: Optional[MetadataCache] = None,
+                     lazy_metadata: bool = True, probe_time: Optional[Histogram] = None,
+                     probe_executor: Optional[futures.Executor] = None):
+            self.root: Optional[Player.Playlist.Node] = None # корень дерева
+            self.head: Optional[Player.Playlist.SongItem] = None # первый объект
+            self.tail: Optional[Player.Playlist.SongItem] = None # последний объект
+            self.version: int = 0 # версия плейлиста, увеличивается при каждом изменении
+            # история последних изменений для GetPlaylistDelta
+            self.changes: PlaylistChanges = PlaylistChanges()
+            self.metadata_cache = metadata_cache # кэш метаданных (если None - заголовки читаются всегда)
+            # откладывать чтение заголовков до первого обращения (при добавлении проверяется только наличие файла)
+            self.lazy_metadata = lazy_metadata
+            self.probe_time = probe_time # гистограмма времени проверки файла (метрики)
+            # журнал изменений (Player.journal); None - изменения не записываются
+            self.journal: Optional[PlaylistJournal] = None
+            # треки, восстановленные из снимка, и версия плейлиста при восстановлении
+            self.restored: Optional[Player.Playlist.StoredSongs] = None
+            self.restored_version: int = -1
+            # индекс поиска по названиям (строится в фоне после первого поиска, см. attach_search_index)
+            self.search_index: Optional[PlaylistSearchIndex] = None
+            # пул потоков для параллельного чтения заголовков файлов (общий пул не закрывается в close)
+            self.__own_executor = probe_executor is None
+            self.__probe_executor = probe_executor or futures.ThreadPoolExecutor(max_workers=probe_workers,
+                                                                                 thread_name_prefix='probe')
+
+        @staticmethod
+        def _size(node) -> int:
+            return node.size if node else 0
+
+        @classmethod
+        def _update(cls, node) -> None:
+            # пересчёт размера поддерева нового узла после изменения потомков (только в _build)
+            node.size = 1 + cls._size(node.left) + cls._size(node.right)
+
+        @classmethod
+        def _copy(cls, node, left, right):
+            # копия узла с другими поддеревьями (узлы прежних версий не изменяются)
+            return cls.Node(node.item, left, right, node.priority)
+
+        @classmethod
+        def _merge(cls, left, right):
+            """
+            слияние двух деревьев (все узлы left идут перед узлами right)
+            :param left:
+            :param right:
+            :return: корень объединённого дерева (копии узлов на пути слияния)
+            """
+            if not left:
+                return right
+            if not right:
+                return left
+            if left.priority > right.priority:
+                return cls._copy(left, left.left, cls._merge(left.right, right))
+            return cls._copy(right, cls._merge(left, right.left), right.right)
+
+        @classmethod
+        def _split(cls, node, count: int):
+            """
+            разделение дерева на первые count узлов и остальные
+            :param node:
+            :param count:
+            :return: (левое дерево, правое дерево) - копии узлов на пути разделения
             """
-            добавить объекты в конец двусвязного списка
+            if not node:
+                return None, None
+            if cls._size(node.left) >= count:
+                left, right = cls._split(node.left, count)
+                return left, cls._copy(node, right, node.right)
+            left, right = cls._split(node.right, count - cls._size(node.left) - 1)
+            return cls._copy(node, node.left, left), right
+
+        @classmethod
+        def _remove(cls, node, index: int):
+            """
+            удаление узла с позицией index: на его место встаёт слияние его поддеревьев
+            :param node:
+            :param index:
+            :return: корень дерева без узла (копии узлов на пути от корня)
+            """
+            left_size = cls._size(node.left)
+            if index < left_size:
+                return cls._copy(node, cls._remove(node.left, index), node.right)
+            if index > left_size:
+                return cls._copy(node, node.left, cls._remove(node.right, index - left_size - 1))
+            return cls._merge(node.left, node.right)
+
+        @classmethod
+        def _build(cls, songs):
+            """
+            построение дерева из последовательности объектов за O(k) (стековый алгоритм декартова дерева).
+            Узлы новые, поэтому изменяются на месте
+            :param songs:
+            :return: корень построенного дерева
+            """
+            stack = []
+            for song in songs:
+                node = cls.Node(song)
+                last = None
+                while stack and stack[-1].priority < node.priority:
+                    # поддерево снятого со стека узла больше не изменится
+                    last = stack.pop()
+                    cls._update(last)
+                if last:
+                    node.left = last
+                    last.parent = node
+                if stack:
+                    stack[-1].right = node
+                    node.parent = stack[-1]
+                stack.append(node)
+            for node in reversed(stack):
+                cls._update(node)
+            return stack[0] if stack else None
+
+        @classmethod
+        def _find(cls, node, index: int):
+            # узел с позицией index в поддереве node (спуск от корня)
+            while True:
+                left_size = cls._size(node.left)
+                if index < left_size:
+                    node = node.left
+                elif index == left_size:
+                    return node
+                else:
+                    index -= left_size + 1
+                    node = node.right
+
+        def _set_root(self, node) -> None:
+            self.root = node
+            if node:
+                node.parent = None
+
+        def _probe_song(self, song_path) -> tuple:
+            """
+            создание объекта SongItem (выполняется в пуле потоков). В отложенном режиме
+            длительность берётся только из кэша, иначе читается заголовок файла
+            :param song_path:
+            :return: (объект SongItem или None, текст ошибки или None)
+            """
+            started = time.perf_counter()
+            try:
+                duration = None
+                if self.lazy_metadata:
+                    file_stat = os.stat(song_path)
+                    if not S_ISREG(file_stat.st_mode):
+                        raise OSError(f'{song_path} не является файлом')
+                    if self.metadata_cache is not None:
+                        metadata = self.metadata_cache.lookup(song_path, file_stat)
+                        duration = metadata.duration if metadata else None
+                elif self.metadata_cache is not None:
+                    duration = self.metadata_cache.get(song_path).duration
+                return self.SongItem(song_path, duration=duration, metadata_cache=self.metadata_cache), None
+            except Exception as err:
+                return None, f'{err}'
+            finally:
+                if self.probe_time is not None:
+                    self.probe_time.observe(time.perf_counter() - started)
+
+        def create_songs(self, items) -> tuple:
+            """
+            параллельное создание объектов SongItem с сохранением порядка путей.
+            Дерево плейлиста не изменяется - можно вызывать вне потока команд плеера
             :param items:
+            :return: (список созданных объектов, список пар (путь, ошибка) для файлов, которые не удалось прочитать)
+            """
+            if len(items) > 1:
+                results = self.__probe_executor.map(self._probe_song, items)
+            else:
+                results = map(self._probe_song, items)
+            songs, failed = [], []
+            for path, (song, error) in zip(items, results):
+                if song:
+                    songs.append(song)
+                else:
+                    failed.append((path, error))
+            if self.metadata_cache is not None:
+                # новые метаданные сохраняются одной транзакцией на пакет
+                self.metadata_cache.flush()
+            return songs, failed
+
+        def _link_songs(self, songs, prev_item=None, next_item=None) -> None:
+            """
+            связывание объектов SongItem в цепочку между prev_item и next_item
+            :param songs:
+            :param prev_item:
+            :param next_item:
             :return:
             """
-            for item in items:
-                if not self.tail:
-                    # если это первый объект, то он будет и первым и последним
-                    song = self.SongItem(item)
-                    self.tail = song
+            for song in songs:
+                song.prev_song = prev_item
+                if prev_item:
+                    prev_item.next_song = song
+                else:
+                    # если перед объектом ничего нет, то он будет первым
                     self.head = song
+                prev_item = song
+            if songs:
+                songs[-1].next_song = next_item
+                if next_item:
+                    next_item.prev_song = songs[-1]
                 else:
-                    # если не первый объект
-                    song = self.SongItem(item, previous_song=self.tail)
-                    self.tail.next_song = song
-                    self.tail = song
+                    self.tail = songs[-1]
 
-        def delete_song(self, index:int) -> None:
+        def _insert_nodes(self, index: int, songs: list) -> None:
             """
-            удаление объекта по индексу
+            вставка готовых объектов SongItem перед позицией index
             :param index:
+            :param songs:
             :return:
             """
+            if index == len(self):
+                self._link_songs(songs, prev_item=self.tail)
+                self._set_root(self._merge(self.root, self._build(songs)))
+                return
+            # соседние объекты, между которыми вставляются новые
+            next_item = self[index]
+            self._link_songs(songs, prev_item=next_item.prev_song, next_item=next_item)
+            left, right = self._split(self.root, index)
+            self._set_root(self._merge(self._merge(left, self._build(songs)), right))
+
+        def _remove_node(self, index: int) -> SongItem:
+            """
+            исключение объекта из дерева и двусвязного списка
+            :param index:
+            :return: исключённый объект
+            """
             # находим удаляемый объект
             deleted_item = self[index]
-            if not deleted_item.prev_song:
-                # если он первый в списке
-                deleted_item.next_song.prev_song = None
+            # обновляем ссылки соседних объектов
+            if deleted_item.prev_song:
+                deleted_item.prev_song.next_song = deleted_item.next_song
+            else:
                 self.head = deleted_item.next_song
-            elif not deleted_item.next_song:
-                # если он последний в списке
-                deleted_item.prev_song.next_song = None
-                self.tail = deleted_item.prev_song
+            if deleted_item.next_song:
+                deleted_item.next_song.prev_song = deleted_item.prev_song
             else:
-                # если между первым и последним - обновляем ссылки соседних объектов
-                deleted_item.prev_song.next_song, deleted_item.next_song.prev_song = \
-                    deleted_item.next_song, deleted_item.prev_song
-            del deleted_item
+                self.tail = deleted_item.prev_song
+            self._set_root(self._remove(self.root, index))
+            deleted_item.prev_song = deleted_item.next_song = deleted_item.node = None
+            return deleted_item
+
+        def restore(self, stored, version: int) -> None:
+            """
+            восстановление пустого плейлиста из снимка за O(1) (см. StoredSongs)
+            :param stored: StoredSongs
+            :param version: версия плейлиста в снимке
+            :return:
+            """
+            if self.root:
+                raise RuntimeError('плейлист не пуст')
+            if len(stored):
+                self.root = stored.node(stored.root_position - 1)
+                self.head = stored.item(0)
+                self.tail = stored.item(len(stored) - 1)
+            self.version = self.restored_version = version
+            self.restored = stored
+
+        def songs(self):
+            """
+            треки по порядку для снимка состояния плеера за O(1): пока плейлист не менялся после
+            восстановления - StoredSongs (запись следующего снимка копирует их без создания объектов),
+            иначе SongsView текущего корня дерева
+            :return:
+            """
+            if self.restored is not None and self.version == self.restored_version:
+                return self.restored
+            return self.SongsView(self.root)
+
+        def _record_change(self, kind: int, index: int, to_index: int = -1, songs: tuple = ()) -> None:
+            """
+            увеличение версии плейлиста и запись изменения в историю
+            :param kind: вид изменения (pb2.INSERTED / pb2.DELETED / pb2.MOVED)
+            :param index: позиция изменения
+            :param to_index: новая позиция перемещённого объекта
+            :param songs: вставленные объекты
+            :return:
+            """
+            self.version += 1
+            self.changes.append((self.version, kind, index, to_index, songs))
+            if self.search_index is not None:
+                self.search_index.apply(self.version, kind, index, to_index, songs)
+            if self.journal is not None:
+                self.journal.append(encode_change(self.version, kind, index, to_index,
+                                                  [song.record() for song in songs]))
+
+        def attach_search_index(self, index: PlaylistSearchIndex) -> bool:
+            """
+            подключение индекса поиска, построенного вне потока команд по снимку состояния:
+            изменения после его версии применяются из истории изменений
+            :param index:
+            :return: подключён ли индекс (False - истории изменений не хватает, индекс устарел)
+            """
+            changes = self.changes.since(index.version, self.version)
+            if changes is None:
+                return False
+            for change in changes:
+                index.apply(*change)
+            self.search_index = index
+            return True
+
+        def append_songs(self, *items) -> list:
+            """
+            добавить объекты в конец плейлиста. Файлы, которые не удалось прочитать, пропускаются
+            :param items:
+            :return: список пар (путь, ошибка) для пропущенных файлов
+            """
+            songs, failed = self.create_songs(items)
+            self.append_items(songs)
+            return failed
+
+        def append_items(self, songs: list) -> None:
+            """
+            добавить готовые объекты SongItem (см. create_songs) в конец плейлиста
+            :param songs:
+            :return:
+            """
+            if songs:
+                index = len(self)
+                self._insert_nodes(index, songs)
+                self._record_change(pb2.INSERTED, index, songs=tuple(songs))
+
+        def insert_items(self, index: int, songs: list) -> None:
+            """
+            вставить готовые объекты SongItem перед позицией index
+            :param index:
+            :param songs:
+            :return:
+            """
+            if not 0 <= index <= len(self):
+                raise IndexError(index)
+            if songs:
+                self._insert_nodes(index, songs)
+                self._record_change(pb2.INSERTED, index, songs=tuple(songs))
+
+        def insert_songs(self, index: int, *items) -> list:
+            """
+            вставить объекты в плейлист перед позицией index
+            :param index:
+            :param items:
+            :return: список пар (путь, ошибка) для пропущенных файлов
+            """
+            songs, failed = self.create_songs(items)
+            self.insert_items(index, songs)
+            return failed
+
+        def delete_song(self, index:int) -> None:
+            """
+            удаление объекта по индексу
+            :param index:
+            :return:
+            """
+            self._remove_node(index)
+            self._record_change(pb2.DELETED, index)
+
+        def move_song(self, index: int, to_index: int) -> None:
+            """
+            перемещение объекта с позиции index на позицию to_index
+            :param index:
+            :param to_index: позиция объекта после перемещения
+            :return:
+            """
+            if not 0 <= to_index < len(self):
+                raise IndexError(to_index)
+            self._insert_nodes(to_index, [self._remove_node(index)])
+            self._record_change(pb2.MOVED, index, to_index=to_index)
+
+        def index(self, item: SongItem) -> int:
+            """
+            порядковый номер объекта в плейлисте (подъём от узла объекта к корню)
+            :param item:
+            :return:
+            """
+            node = item.node
+            if node is None:
+                raise LookupError
+            idx = self._size(node.left)
+            while node.parent:
+                if node is node.parent.right:
+                    idx += self._size(node.parent.left) + 1
+                node = node.parent
+            if node is not self.root:
+                raise LookupError
+            return idx
+
+        def close(self) -> None:
+            if self.__own_executor:
+                self.__probe_executor.shutdown(wait=False)
 
         def __getitem__(self, index:int) -> SongItem:
-            # выдача объекта по индексу
-            item = self.head
-            for i in range(index):
-                item = item.next_song
-            return item
+            # выдача объекта по индексу (спуск от корня)
+            if not 0 <= index < len(self):
+                raise IndexError(index)
+            return self._find(self.root, index).item
+
+        def __len__(self) -> int:
+            return self._size(self.root)
 
         def __iter__(self):
             # итерируемый двусвязниый список
@@ -371,17 +1963,59 @@ class Player(pb2_grpc.PlayerServicer):
                 yield item
                 item = item.next_song
 
-
-def serve():
+def serve(audio: Optional[AudioBackend] = None, metrics_port: int = 0, snapshot_path=DEFAULT_SNAPSHOT_PATH):
     """
     запуск сервера
+    :param audio: звуковой модуль (по умолчанию pygame.mixer)
+    :param metrics_port: порт HTTP сервера метрик Prometheus (0 - не запускать)
+    :param snapshot_path: файл снимка плейлиста (None - не сохранять)
     :return:
     """
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
-    pb2_grpc.add_PlayerServicer_to_server(Player(), server)
+    from player_server.sessions import PlayerSessions, SessionPlayer
+    player = Player(audio=audio, snapshot_path=snapshot_path)
+    # запросы с идентификатором сеанса в метаданных выполняют отдельные плееры (см. PlayerSessions)
+    sessions = PlayerSessions(player, snapshot_path)
+    # у каждой подписки на состояние свой поток: подписки не занимают потоки остальных RPC.
+    # Запросы сверх числа потоков отклоняются (RESOURCE_EXHAUSTED), а не ждут в очереди без ограничения
+    workers = SERVER_WORKERS + MAX_STATUS_STREAMS
+    executor = CountingExecutor(max_workers=workers)
+    # запросы, ожидающие свободного потока
+    player.metrics.gauge('executor_queue_depth', lambda: executor.pending)
+    server = grpc.server(executor, maximum_concurrent_rpcs=workers,
+                         interceptors=[MetricsInterceptor(player.metrics),
+                                       StreamLimitInterceptor(MAX_STATUS_STREAMS, ('GetPlayerStatus',)),
+                                       ProfilingInterceptor(player.profiler)])
+    pb2_grpc.add_PlayerServicer_to_server(SessionPlayer(sessions), server)
     server.add_insecure_port('[::]:50051')
+    if metrics_port:
+        start_metrics_server(player.metrics, metrics_port)
     server.start()
-    server.wait_for_termination()
+    try:
+        server.wait_for_termination()
+    finally:
+        # при остановке сервера сохраняется и точная позиция трека
+        sessions.save_state()
 
 if __name__ == '__main__':
-    serve()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Сервер плеера')
+    parser.add_argument('--aio', action='store_true',
+                        help='асинхронный сервер grpc.aio (тысячи одновременных подписок на состояние)')
+    parser.add_argument('--headless', action='store_true',
+                        help='без звукового устройства: проигрывание имитируется по часам')
+    parser.add_argument('--metrics-port', type=int, default=0,
+                        help='порт для метрик в формате Prometheus на 127.0.0.1 (GET /metrics)')
+    parser.add_argument('--snapshot', default=str(DEFAULT_SNAPSHOT_PATH),
+                        help='файл снимка плейлиста для быстрого перезапуска (пустая строка - не сохранять)')
+    args = parser.parse_args()
+    audio = HeadlessBackend() if args.headless else None
+    snapshot_path = args.snapshot or None
+    # SIGTERM завершает сервер как Ctrl+C - с записью снимка плейлиста
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        if args.aio:
+            from player_server.aio_server import serve_aio
+            asyncio.run(serve_aio(audio=audio, metrics_port=args.metrics_port, snapshot_path=snapshot_path))
+        else:
+            serve(audio, args.metrics_port, snapshot_path)
+    except KeyboardInterrupt:
+        pass
@@ -13,29 +13,68 @@ from google.protobuf import symbol_database as _symbol_database
 _sym_db = _symbol_database.Default()
 
 
+from google.protobuf import field_mask_pb2 as google_dot_protobuf_dot_field__mask__pb2
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0cplayer.proto\x12\rplayer_server\"\x1f\n\x0fRequestSongPath\x12\x0c\n\x04path\x18\x01 \x03(\t\"!\n\x10RequestSongIndex\x12\r\n\x05index\x18\x01 \x01(\x05\"\'\n\x13RequestSongPosition\x12\x10\n\x08position\x18\x01 \x01(\x05\"1\n\x11ResponseSongIndex\x12\r\n\x05index\x18\x01 \x01(\x05\x12\r\n\x05\x65rror\x18\x02 \x01(\t\"d\n\x14ResponsePlayerStatus\x12+\n\x06status\x18\x01 \x03(\x0e\x32\x1b.player_server.PlayerStatus\x12\x10\n\x08position\x18\x02 \x01(\x05\x12\r\n\x05\x65rror\x18\x03 \x01(\t\"I\n\x17ResponseSongInformation\x12\r\n\x05title\x18\x01 \x01(\t\x12\x10\n\x08\x64uration\x18\x02 \x01(\x02\x12\r\n\x05\x65rror\x18\x03 \x01(\t\"F\n\x10ResponsePlaylist\x12\x12\n\nsong_title\x18\x01 \x03(\t\x12\x0f\n\x07playing\x18\x02 \x01(\x05\x12\r\n\x05\x65rror\x18\x03 \x01(\t\"\x1f\n\x0eResponseResult\x12\r\n\x05\x65rror\x18\x01 \x01(\t\"/\n\x0eResponsePaused\x12\x0e\n\x06result\x18\x01 \x01(\x05\x12\r\n\x05\x65rror\x18\x03 \x01(\t\"\x07\n\x05\x45mpty*N\n\x0cPlayerStatus\x12\x0b\n\x07WAITING\x10\x00\x12\x0b\n\x07PLAYING\x10\x01\x12\n\n\x06PAUSED\x10\x02\x12\n\n\x06STOPED\x10\x03\x12\x0c\n\x08NEW_SONG\x10\x04\x32\x9f\x07\n\x06Player\x12H\n\x07\x41\x64\x64Song\x12\x1e.player_server.RequestSongPath\x1a\x1d.player_server.ResponseResult\x12\x46\n\x04Play\x12\x1f.player_server.RequestSongIndex\x1a\x1d.player_server.ResponseResult\x12\x44\n\x0bGetPlayList\x12\x14.player_server.Empty\x1a\x1f.player_server.ResponsePlaylist\x12O\n\x0fPlayingSongInfo\x12\x14.player_server.Empty\x1a&.player_server.ResponseSongInformation\x12<\n\x05Pause\x12\x14.player_server.Empty\x1a\x1d.player_server.ResponseResult\x12;\n\x04Next\x12\x14.player_server.Empty\x1a\x1d.player_server.ResponseResult\x12;\n\x04Prev\x12\x14.player_server.Empty\x1a\x1d.player_server.ResponseResult\x12;\n\x04Stop\x12\x14.player_server.Empty\x1a\x1d.player_server.ResponseResult\x12P\n\x0bSetPosition\x12\".player_server.RequestSongPosition\x1a\x1d.player_server.ResponseResult\x12?\n\x08IsPaused\x12\x14.player_server.Empty\x1a\x1d.player_server.ResponsePaused\x12L\n\nDeleteSong\x12\x1f.player_server.RequestSongIndex\x1a\x1d.player_server.ResponseResult\x12N\n\x0fGetPlayerStatus\x12\x14.player_server.Empty\x1a#.player_server.ResponsePlayerStatus0\x01\x12\x46\n\x0cGetSongIndex\x12\x14.player_server.Empty\x1a .player_server.ResponseSongIndexb\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0cplayer.proto\x12\rplayer_server\x1a google/protobuf/field_mask.proto\"\x1f\n\x0fRequestSongPath\x12\x0c\n\x04path\x18\x01 \x03(\t\"!\n\x10RequestSongIndex\x12\r\n\x05index\x18\x01 \x01(\x05\";\n\x0fRequestSnapshot\x12(\n\x04mask\x18\x01 \x01(\x0b\x32\x1a.google.protobuf.FieldMask\"i\n\x0eRequestControl\x12\r\n\x05index\x18\x01 \x01(\x05\x12\x15\n\rwith_snapshot\x18\x02 \x01(\x08\x12\x31\n\rsnapshot_mask\x18\x03 \x01(\x0b\x32\x1a.google.protobuf.FieldMask\"2\n\x0fRequestMoveSong\x12\r\n\x05index\x18\x01 \x01(\x05\x12\x10\n\x08to_index\x18\x02 \x01(\x05\"I\n\x14RequestPlaylistRange\x12\x0e\n\x06offset\x18\x01 \x01(\x05\x12\r\n\x05limit\x18\x02 \x01(\x05\x12\x12\n\nchunk_size\x18\x03 \x01(\x05\"K\n\x14RequestPlaylistDelta\x12\x0f\n\x07version\x18\x01 \x01(\x03\x12\x13\n\x0b\x63ounts_only\x18\x02 \x01(\x08\x12\r\n\x05\x65poch\x18\x03 \x01(\x03\"\'\n\x13RequestSongPosition\x12\x10\n\x08position\x18\x01 \x01(\x05\"N\n\x13RequestPlayerStatus\x12\x11\n\theartbeat\x18\x01 \x01(\x02\x12\x15\n\rfrom_sequence\x18\x02 \x01(\x03\x12\r\n\x05\x65poch\x18\x03 \x01(\x03\"1\n\x11ResponseSongIndex\x12\r\n\x05index\x18\x01 \x01(\x05\x12\r\n\x05\x65rror\x18\x02 \x01(\t\"\x9a\x01\n\x14ResponsePlayerStatus\x12+\n\x06status\x18\x01 \x03(\x0e\x32\x1b.player_server.PlayerStatus\x12\x10\n\x08position\x18\x02 \x01(\x05\x12\r\n\x05\x65rror\x18\x03 \x01(\t\x12\x10\n\x08sequence\x18\x04 \x01(\x03\x12\x13\n\x0b\x65vents_lost\x18\x05 \x01(\x08\x12\r\n\x05\x65poch\x18\x06 \x01(\x03\"I\n\x17ResponseSongInformation\x12\r\n\x05title\x18\x01 \x01(\t\x12\x10\n\x08\x64uration\x18\x02 \x01(\x02\x12\r\n\x05\x65rror\x18\x03 \x01(\t\"\x85\x01\n\x10ResponsePlaylist\x12\x12\n\nsong_title\x18\x01 \x03(\t\x12\x0f\n\x07playing\x18\x02 \x01(\x05\x12\r\n\x05\x65rror\x18\x03 \x01(\t\x12\x0f\n\x07version\x18\x04 \x01(\x03\x12\x0e\n\x06offset\x18\x05 \x01(\x05\x12\r\n\x05total\x18\x06 \x01(\x05\x12\r\n\x05\x65poch\x18\x07 \x01(\x03\"\x81\x01\n\x0cPlaylistEdit\x12-\n\x04kind\x18\x01 \x01(\x0e\x32\x1f.player_server.PlaylistEditKind\x12\r\n\x05index\x18\x02 \x01(\x05\x12\x10\n\x08to_index\x18\x03 \x01(\x05\x12\x12\n\nsong_title\x18\x04 \x03(\t\x12\r\n\x05\x63ount\x18\x05 \x01(\x05\"\x92\x01\n\x15ResponsePlaylistDelta\x12\x0f\n\x07version\x18\x01 \x01(\x03\x12\r\n\x05reset\x18\x02 \x01(\x08\x12*\n\x05\x65\x64its\x18\x03 \x03(\x0b\x32\x1b.player_server.PlaylistEdit\x12\x0f\n\x07playing\x18\x04 \x01(\x05\x12\r\n\x05\x65rror\x18\x05 \x01(\t\x12\r\n\x05\x65poch\x18\x06 \x01(\x03\"\x9a\x01\n\x0ePlayerSnapshot\x12\r\n\x05title\x18\x01 \x01(\t\x12\x10\n\x08\x64uration\x18\x02 \x01(\x02\x12\r\n\x05index\x18\x03 \x01(\x05\x12\x0e\n\x06paused\x18\x04 \x01(\x08\x12\x10\n\x08position\x18\x05 \x01(\x05\x12\x18\n\x10playlist_version\x18\x06 \x01(\x03\x12\r\n\x05\x65rror\x18\x07 \x01(\t\x12\r\n\x05\x65poch\x18\x08 \x01(\x03\"P\n\x0eResponseResult\x12\r\n\x05\x65rror\x18\x01 \x01(\t\x12/\n\x08snapshot\x18\x02 \x01(\x0b\x32\x1d.player_server.PlayerSnapshot\"(\n\tSongError\x12\x0c\n\x04path\x18\x01 \x01(\t\x12\r\n\x05\x65rror\x18\x02 \x01(\t\"Y\n\x0fResponseAddSong\x12\r\n\x05\x65rror\x18\x01 \x01(\t\x12(\n\x06\x66\x61iled\x18\x02 \x03(\x0b\x32\x18.player_server.SongError\x12\r\n\x05\x61\x64\x64\x65\x64\x18\x03 \x01(\x05\"/\n\x0eResponsePaused\x12\x0e\n\x06result\x18\x01 \x01(\x05\x12\r\n\x05\x65rror\x18\x03 \x01(\t\"\x07\n\x05\x45mpty\"\xf3\x01\n\x06Metric\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\'\n\x04kind\x18\x02 \x01(\x0e\x32\x19.player_server.MetricKind\x12\x31\n\x06labels\x18\x03 \x03(\x0b\x32!.player_server.Metric.LabelsEntry\x12\r\n\x05value\x18\x04 \x01(\x01\x12\x0e\n\x06\x62ounds\x18\x05 \x03(\x01\x12\x15\n\rbucket_counts\x18\x06 \x03(\x04\x12\r\n\x05\x63ount\x18\x07 \x01(\x04\x12\x0b\n\x03sum\x18\x08 \x01(\x01\x1a-\n\x0bLabelsEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01\"H\n\x0fResponseMetrics\x12&\n\x07metrics\x18\x01 \x03(\x0b\x32\x15.player_server.Metric\x12\r\n\x05\x65rror\x18\x02 \x01(\t\"\x85\x01\n\x10RequestProfiling\x12\x0f\n\x07seconds\x18\x01 \x01(\x02\x12*\n\x04mode\x18\x02 \x01(\x0e\x32\x1c.player_server.ProfilingMode\x12\x0f\n\x07methods\x18\x03 \x03(\t\x12\x11\n\tfile_name\x18\x04 \x01(\t\x12\x10\n\x08interval\x18\x05 \x01(\x02\"0\n\x11ResponseProfiling\x12\x0c\n\x04path\x18\x01 \x01(\t\x12\r\n\x05\x65rror\x18\x02 \x01(\t\"N\n\x16RequestImportDirectory\x12\x0c\n\x04path\x18\x01 \x01(\t\x12\x12\n\nextensions\x18\x02 \x03(\t\x12\x12\n\nbatch_size\x18\x03 \x01(\x05\"\xcd\x01\n\x0eImportProgress\x12\r\n\x05\x66ound\x18\x01 \x01(\x05\x12\x11\n\tprocessed\x18\x02 \x01(\x05\x12\r\n\x05\x61\x64\x64\x65\x64\x18\x03 \x01(\x05\x12\x0e\n\x06\x66\x61iled\x18\x04 \x01(\x05\x12(\n\x06\x65rrors\x18\x05 \x03(\x0b\x32\x18.player_server.SongError\x12\x0f\n\x07\x65lapsed\x18\x06 \x01(\x02\x12\x0b\n\x03\x65ta\x18\x07 \x01(\x02\x12\x15\n\rscan_complete\x18\x08 \x01(\x08\x12\x0c\n\x04\x64one\x18\t \x01(\x08\x12\r\n\x05\x65rror\x18\n \x01(\t\"n\n\x15RequestSearchPlaylist\x12\r\n\x05query\x18\x01 \x01(\t\x12\'\n\x04mode\x18\x02 \x01(\x0e\x32\x19.player_server.SearchMode\x12\x0e\n\x06offset\x18\x03 \x01(\x05\x12\r\n\x05limit\x18\x04 \x01(\x05\"m\n\x16ResponseSearchPlaylist\x12\r\n\x05index\x18\x01 \x03(\x05\x12\x12\n\nsong_title\x18\x02 \x03(\t\x12\x0f\n\x07version\x18\x03 \x01(\x03\x12\r\n\x05\x65rror\x18\x04 \x01(\t\x12\x10\n\x08indexing\x18\x05 \x01(\x08*d\n\x0cPlayerStatus\x12\x0b\n\x07WAITING\x10\x00\x12\x0b\n\x07PLAYING\x10\x01\x12\n\n\x06PAUSED\x10\x02\x12\n\n\x06STOPED\x10\x03\x12\x0c\n\x08NEW_SONG\x10\x04\x12\x14\n\x10PLAYLIST_CHANGED\x10\x05*8\n\x10PlaylistEditKind\x12\x0c\n\x08INSERTED\x10\x00\x12\x0b\n\x07\x44\x45LETED\x10\x01\x12\t\n\x05MOVED\x10\x02*&\n\nMetricKind\x12\t\n\x05GAUGE\x10\x00\x12\r\n\tHISTOGRAM\x10\x01*0\n\rProfilingMode\x12\x0c\n\x08SAMPLING\x10\x00\x12\x11\n\rDETERMINISTIC\x10\x01*\'\n\nSearchMode\x12\r\n\tSUBSTRING\x10\x00\x12\n\n\x06PREFIX\x10\x01\x32\x9d\x0e\n\x06Player\x12I\n\x07\x41\x64\x64Song\x12\x1e.player_server.RequestSongPath\x1a\x1e.player_server.ResponseAddSong\x12\x44\n\x04Play\x12\x1d.player_server.RequestControl\x1a\x1d.player_server.ResponseResult\x12\x44\n\x0bGetPlayList\x12\x14.player_server.Empty\x1a\x1f.player_server.ResponsePlaylist\x12O\n\x0fPlayingSongInfo\x12\x14.player_server.Empty\x1a&.player_server.ResponseSongInformation\x12\x45\n\x05Pause\x12\x1d.player_server.RequestControl\x1a\x1d.player_server.ResponseResult\x12\x44\n\x04Next\x12\x1d.player_server.RequestControl\x1a\x1d.player_server.ResponseResult\x12\x44\n\x04Prev\x12\x1d.player_server.RequestControl\x1a\x1d.player_server.ResponseResult\x12\x44\n\x04Stop\x12\x1d.player_server.RequestControl\x1a\x1d.player_server.ResponseResult\x12P\n\x0bSetPosition\x12\".player_server.RequestSongPosition\x1a\x1d.player_server.ResponseResult\x12?\n\x08IsPaused\x12\x14.player_server.Empty\x1a\x1d.player_server.ResponsePaused\x12L\n\nDeleteSong\x12\x1f.player_server.RequestSongIndex\x1a\x1d.player_server.ResponseResult\x12\\\n\x0fGetPlayerStatus\x12\".player_server.RequestPlayerStatus\x1a#.player_server.ResponsePlayerStatus0\x01\x12\x46\n\x0cGetSongIndex\x12\x14.player_server.Empty\x1a .player_server.ResponseSongIndex\x12]\n\x10GetPlaylistDelta\x12#.player_server.RequestPlaylistDelta\x1a$.player_server.ResponsePlaylistDelta\x12I\n\x08MoveSong\x12\x1e.player_server.RequestMoveSong\x1a\x1d.player_server.ResponseResult\x12X\n\x10GetPlayListRange\x12#.player_server.RequestPlaylistRange\x1a\x1f.player_server.ResponsePlaylist\x12X\n\x0eStreamPlayList\x12#.player_server.RequestPlaylistRange\x1a\x1f.player_server.ResponsePlaylist0\x01\x12L\n\x0bGetSnapshot\x12\x1e.player_server.RequestSnapshot\x1a\x1d.player_server.PlayerSnapshot\x12\x42\n\nGetMetrics\x12\x14.player_server.Empty\x1a\x1e.player_server.ResponseMetrics\x12S\n\x0eStartProfiling\x12\x1f.player_server.RequestProfiling\x1a .player_server.ResponseProfiling\x12Y\n\x0fImportDirectory\x12%.player_server.RequestImportDirectory\x1a\x1d.player_server.ImportProgress0\x01\x12L\n\x08\x41\x64\x64Songs\x12\x1e.player_server.RequestSongPath\x1a\x1e.player_server.ResponseAddSong(\x01\x12]\n\x0eSearchPlaylist\x12$.player_server.RequestSearchPlaylist\x1a%.player_server.ResponseSearchPlaylistb\x06proto3')
 
 _PLAYERSTATUS = DESCRIPTOR.enum_types_by_name['PlayerStatus']
 PlayerStatus = enum_type_wrapper.EnumTypeWrapper(_PLAYERSTATUS)
+_PLAYLISTEDITKIND = DESCRIPTOR.enum_types_by_name['PlaylistEditKind']
+PlaylistEditKind = enum_type_wrapper.EnumTypeWrapper(_PLAYLISTEDITKIND)
+_METRICKIND = DESCRIPTOR.enum_types_by_name['MetricKind']
+MetricKind = enum_type_wrapper.EnumTypeWrapper(_METRICKIND)
+_PROFILINGMODE = DESCRIPTOR.enum_types_by_name['ProfilingMode']
+ProfilingMode = enum_type_wrapper.EnumTypeWrapper(_PROFILINGMODE)
+_SEARCHMODE = DESCRIPTOR.enum_types_by_name['SearchMode']
+SearchMode = enum_type_wrapper.EnumTypeWrapper(_SEARCHMODE)
 WAITING = 0
 PLAYING = 1
 PAUSED = 2
 STOPED = 3
 NEW_SONG = 4
+PLAYLIST_CHANGED = 5
+INSERTED = 0
+DELETED = 1
+MOVED = 2
+GAUGE = 0
+HISTOGRAM = 1
+SAMPLING = 0
+DETERMINISTIC = 1
+SUBSTRING = 0
+PREFIX = 1
 
 
 _REQUESTSONGPATH = DESCRIPTOR.message_types_by_name['RequestSongPath']
 _REQUESTSONGINDEX = DESCRIPTOR.message_types_by_name['RequestSongIndex']
+_REQUESTSNAPSHOT = DESCRIPTOR.message_types_by_name['RequestSnapshot']
+_REQUESTCONTROL = DESCRIPTOR.message_types_by_name['RequestControl']
+_REQUESTMOVESONG = DESCRIPTOR.message_types_by_name['RequestMoveSong']
+_REQUESTPLAYLISTRANGE = DESCRIPTOR.message_types_by_name['RequestPlaylistRange']
+_REQUESTPLAYLISTDELTA = DESCRIPTOR.message_types_by_name['RequestPlaylistDelta']
 _REQUESTSONGPOSITION = DESCRIPTOR.message_types_by_name['RequestSongPosition']
+_REQUESTPLAYERSTATUS = DESCRIPTOR.message_types_by_name['RequestPlayerStatus']
 _RESPONSESONGINDEX = DESCRIPTOR.message_types_by_name['ResponseSongIndex']
 _RESPONSEPLAYERSTATUS = DESCRIPTOR.message_types_by_name['ResponsePlayerStatus']
 _RESPONSESONGINFORMATION = DESCRIPTOR.message_types_by_name['ResponseSongInformation']
 _RESPONSEPLAYLIST = DESCRIPTOR.message_types_by_name['ResponsePlaylist']
+_PLAYLISTEDIT = DESCRIPTOR.message_types_by_name['PlaylistEdit']
+_RESPONSEPLAYLISTDELTA = DESCRIPTOR.message_types_by_name['ResponsePlaylistDelta']
+_PLAYERSNAPSHOT = DESCRIPTOR.message_types_by_name['PlayerSnapshot']
 _RESPONSERESULT = DESCRIPTOR.message_types_by_name['ResponseResult']
+_SONGERROR = DESCRIPTOR.message_types_by_name['SongError']
+_RESPONSEADDSONG = DESCRIPTOR.message_types_by_name['ResponseAddSong']
 _RESPONSEPAUSED = DESCRIPTOR.message_types_by_name['ResponsePaused']
 _EMPTY = DESCRIPTOR.message_types_by_name['Empty']
+_METRIC = DESCRIPTOR.message_types_by_name['Metric']
+_METRIC_LABELSENTRY = _METRIC.nested_types_by_name['LabelsEntry']
+_RESPONSEMETRICS = DESCRIPTOR.message_types_by_name['ResponseMetrics']
+_REQUESTPROFILING = DESCRIPTOR.message_types_by_name['RequestProfiling']
+_RESPONSEPROFILING = DESCRIPTOR.message_types_by_name['ResponseProfiling']
+_REQUESTIMPORTDIRECTORY = DESCRIPTOR.message_types_by_name['RequestImportDirectory']
+_IMPORTPROGRESS = DESCRIPTOR.message_types_by_name['ImportProgress']
+_REQUESTSEARCHPLAYLIST = DESCRIPTOR.message_types_by_name['RequestSearchPlaylist']
+_RESPONSESEARCHPLAYLIST = DESCRIPTOR.message_types_by_name['ResponseSearchPlaylist']
 RequestSongPath = _reflection.GeneratedProtocolMessageType('RequestSongPath', (_message.Message,), {
   'DESCRIPTOR' : _REQUESTSONGPATH,
   '__module__' : 'player_pb2'
@@ -50,6 +89,41 @@ RequestSongIndex = _reflection.GeneratedProtocolMessageType('RequestSongIndex',
   })
 _sym_db.RegisterMessage(RequestSongIndex)
 
+RequestSnapshot = _reflection.GeneratedProtocolMessageType('RequestSnapshot', (_message.Message,), {
+  'DESCRIPTOR' : _REQUESTSNAPSHOT,
+  '__module__' : 'player_pb2'
+  # @@protoc_insertion_point(class_scope:player_server.RequestSnapshot)
+  })
+_sym_db.RegisterMessage(RequestSnapshot)
+
+RequestControl = _reflection.GeneratedProtocolMessageType('RequestControl', (_message.Message,), {
+  'DESCRIPTOR' : _REQUESTCONTROL,
+  '__module__' : 'player_pb2'
+  # @@protoc_insertion_point(class_scope:player_server.RequestControl)
+  })
+_sym_db.RegisterMessage(RequestControl)
+
+RequestMoveSong = _reflection.GeneratedProtocolMessageType('RequestMoveSong', (_message.Message,), {
+  'DESCRIPTOR' : _REQUESTMOVESONG,
+  '__module__' : 'player_pb2'
+  # @@protoc_insertion_point(class_scope:player_server.RequestMoveSong)
+  })
+_sym_db.RegisterMessage(RequestMoveSong)
+
+RequestPlaylistRange = _reflection.GeneratedProtocolMessageType('RequestPlaylistRange', (_message.Message,), {
+  'DESCRIPTOR' : _REQUESTPLAYLISTRANGE,
+  '__module__' : 'player_pb2'
+  # @@protoc_insertion_point(class_scope:player_server.RequestPlaylistRange)
+  })
+_sym_db.RegisterMessage(RequestPlaylistRange)
+
+RequestPlaylistDelta = _reflection.GeneratedProtocolMessageType('RequestPlaylistDelta', (_message.Message,), {
+  'DESCRIPTOR' : _REQUESTPLAYLISTDELTA,
+  '__module__' : 'player_pb2'
+  # @@protoc_insertion_point(class_scope:player_server.RequestPlaylistDelta)
+  })
+_sym_db.RegisterMessage(RequestPlaylistDelta)
+
 RequestSongPosition = _reflection.GeneratedProtocolMessageType('RequestSongPosition', (_message.Message,), {
   'DESCRIPTOR' : _REQUESTSONGPOSITION,
   '__module__' : 'player_pb2'
@@ -57,6 +131,13 @@ RequestSongPosition = _reflection.GeneratedProtocolMessageType('RequestSongPosit
   })
 _sym_db.RegisterMessage(RequestSongPosition)
 
+RequestPlayerStatus = _reflection.GeneratedProtocolMessageType('RequestPlayerStatus', (_message.Message,), {
+  'DESCRIPTOR' : _REQUESTPLAYERSTATUS,
+  '__module__' : 'player_pb2'
+  # @@protoc_insertion_point(class_scope:player_server.RequestPlayerStatus)
+  })
+_sym_db.RegisterMessage(RequestPlayerStatus)
+
 ResponseSongIndex = _reflection.GeneratedProtocolMessageType('ResponseSongIndex', (_message.Message,), {
   'DESCRIPTOR' : _RESPONSESONGINDEX,
   '__module__' : 'player_pb2'
@@ -85,6 +166,27 @@ ResponsePlaylist = _reflection.GeneratedProtocolMessageType('ResponsePlaylist',
   })
 _sym_db.RegisterMessage(ResponsePlaylist)
 
+PlaylistEdit = _reflection.GeneratedProtocolMessageType('PlaylistEdit', (_message.Message,), {
+  'DESCRIPTOR' : _PLAYLISTEDIT,
+  '__module__' : 'player_pb2'
+  # @@protoc_insertion_point(class_scope:player_server.PlaylistEdit)
+  })
+_sym_db.RegisterMessage(PlaylistEdit)
+
+ResponsePlaylistDelta = _reflection.GeneratedProtocolMessageType('ResponsePlaylistDelta', (_message.Message,), {
+  'DESCRIPTOR' : _RESPONSEPLAYLISTDELTA,
+  '__module__' : 'player_pb2'
+  # @@protoc_insertion_point(class_scope:player_server.ResponsePlaylistDelta)
+  })
+_sym_db.RegisterMessage(ResponsePlaylistDelta)
+
+PlayerSnapshot = _reflection.GeneratedProtocolMessageType('PlayerSnapshot', (_message.Message,), {
+  'DESCRIPTOR' : _PLAYERSNAPSHOT,
+  '__module__' : 'player_pb2'
+  # @@protoc_insertion_point(class_scope:player_server.PlayerSnapshot)
+  })
+_sym_db.RegisterMessage(PlayerSnapshot)
+
 ResponseResult = _reflection.GeneratedProtocolMessageType('ResponseResult', (_message.Message,), {
   'DESCRIPTOR' : _RESPONSERESULT,
   '__module__' : 'player_pb2'
@@ -92,6 +194,20 @@ ResponseResult = _reflection.GeneratedProtocolMessageType('ResponseResult', (_me
   })
 _sym_db.RegisterMessage(ResponseResult)
 
+SongError = _reflection.GeneratedProtocolMessageType('SongError', (_message.Message,), {
+  'DESCRIPTOR' : _SONGERROR,
+  '__module__' : 'player_pb2'
+  # @@protoc_insertion_point(class_scope:player_server.SongError)
+  })
+_sym_db.RegisterMessage(SongError)
+
+ResponseAddSong = _reflection.GeneratedProtocolMessageType('ResponseAddSong', (_message.Message,), {
+  'DESCRIPTOR' : _RESPONSEADDSONG,
+  '__module__' : 'player_pb2'
+  # @@protoc_insertion_point(class_scope:player_server.ResponseAddSong)
+  })
+_sym_db.RegisterMessage(ResponseAddSong)
+
 ResponsePaused = _reflection.GeneratedProtocolMessageType('ResponsePaused', (_message.Message,), {
   'DESCRIPTOR' : _RESPONSEPAUSED,
   '__module__' : 'player_pb2'
@@ -106,32 +222,146 @@ Empty = _reflection.GeneratedProtocolMessageType('Empty', (_message.Message,), {
   })
 _sym_db.RegisterMessage(Empty)
 
+Metric = _reflection.GeneratedProtocolMessageType('Metric', (_message.Message,), {
+
+  'LabelsEntry' : _reflection.GeneratedProtocolMessageType('LabelsEntry', (_message.Message,), {
+    'DESCRIPTOR' : _METRIC_LABELSENTRY,
+    '__module__' : 'player_pb2'
+    # @@protoc_insertion_point(class_scope:player_server.Metric.LabelsEntry)
+    })
+  ,
+  'DESCRIPTOR' : _METRIC,
+  '__module__' : 'player_pb2'
+  # @@protoc_insertion_point(class_scope:player_server.Metric)
+  })
+_sym_db.RegisterMessage(Metric)
+_sym_db.RegisterMessage(Metric.LabelsEntry)
+
+ResponseMetrics = _reflection.GeneratedProtocolMessageType('ResponseMetrics', (_message.Message,), {
+  'DESCRIPTOR' : _RESPONSEMETRICS,
+  '__module__' : 'player_pb2'
+  # @@protoc_insertion_point(class_scope:player_server.ResponseMetrics)
+  })
+_sym_db.RegisterMessage(ResponseMetrics)
+
+RequestProfiling = _reflection.GeneratedProtocolMessageType('RequestProfiling', (_message.Message,), {
+  'DESCRIPTOR' : _REQUESTPROFILING,
+  '__module__' : 'player_pb2'
+  # @@protoc_insertion_point(class_scope:player_server.RequestProfiling)
+  })
+_sym_db.RegisterMessage(RequestProfiling)
+
+ResponseProfiling = _reflection.GeneratedProtocolMessageType('ResponseProfiling', (_message.Message,), {
+  'DESCRIPTOR' : _RESPONSEPROFILING,
+  '__module__' : 'player_pb2'
+  # @@protoc_insertion_point(class_scope:player_server.ResponseProfiling)
+  })
+_sym_db.RegisterMessage(ResponseProfiling)
+
+RequestImportDirectory = _reflection.GeneratedProtocolMessageType('RequestImportDirectory', (_message.Message,), {
+  'DESCRIPTOR' : _REQUESTIMPORTDIRECTORY,
+  '__module__' : 'player_pb2'
+  # @@protoc_insertion_point(class_scope:player_server.RequestImportDirectory)
+  })
+_sym_db.RegisterMessage(RequestImportDirectory)
+
+ImportProgress = _reflection.GeneratedProtocolMessageType('ImportProgress', (_message.Message,), {
+  'DESCRIPTOR' : _IMPORTPROGRESS,
+  '__module__' : 'player_pb2'
+  # @@protoc_insertion_point(class_scope:player_server.ImportProgress)
+  })
+_sym_db.RegisterMessage(ImportProgress)
+
+RequestSearchPlaylist = _reflection.GeneratedProtocolMessageType('RequestSearchPlaylist', (_message.Message,), {
+  'DESCRIPTOR' : _REQUESTSEARCHPLAYLIST,
+  '__module__' : 'player_pb2'
+  # @@protoc_insertion_point(class_scope:player_server.RequestSearchPlaylist)
+  })
+_sym_db.RegisterMessage(RequestSearchPlaylist)
+
+ResponseSearchPlaylist = _reflection.GeneratedProtocolMessageType('ResponseSearchPlaylist', (_message.Message,), {
+  'DESCRIPTOR' : _RESPONSESEARCHPLAYLIST,
+  '__module__' : 'player_pb2'
+  # @@protoc_insertion_point(class_scope:player_server.ResponseSearchPlaylist)
+  })
+_sym_db.RegisterMessage(ResponseSearchPlaylist)
+
 _PLAYER = DESCRIPTOR.services_by_name['Player']
 if _descriptor._USE_C_DESCRIPTORS == False:
 
   DESCRIPTOR._options = None
-  _PLAYERSTATUS._serialized_start=531
-  _PLAYERSTATUS._serialized_end=609
-  _REQUESTSONGPATH._serialized_start=31
-  _REQUESTSONGPATH._serialized_end=62
-  _REQUESTSONGINDEX._serialized_start=64
-  _REQUESTSONGINDEX._serialized_end=97
-  _REQUESTSONGPOSITION._serialized_start=99
-  _REQUESTSONGPOSITION._serialized_end=138
-  _RESPONSESONGINDEX._serialized_start=140
-  _RESPONSESONGINDEX._serialized_end=189
-  _RESPONSEPLAYERSTATUS._serialized_start=191
-  _RESPONSEPLAYERSTATUS._serialized_end=291
-  _RESPONSESONGINFORMATION._serialized_start=293
-  _RESPONSESONGINFORMATION._serialized_end=366
-  _RESPONSEPLAYLIST._serialized_start=368
-  _RESPONSEPLAYLIST._serialized_end=438
-  _RESPONSERESULT._serialized_start=440
-  _RESPONSERESULT._serialized_end=471
-  _RESPONSEPAUSED._serialized_start=473
-  _RESPONSEPAUSED._serialized_end=520
-  _EMPTY._serialized_start=522
-  _EMPTY._serialized_end=529
-  _PLAYER._serialized_start=612
-  _PLAYER._serialized_end=1539
+  _METRIC_LABELSENTRY._options = None
+  _METRIC_LABELSENTRY._serialized_options = b'8\001'
+  _PLAYERSTATUS._serialized_start=2773
+  _PLAYERSTATUS._serialized_end=2873
+  _PLAYLISTEDITKIND._serialized_start=2875
+  _PLAYLISTEDITKIND._serialized_end=2931
+  _METRICKIND._serialized_start=2933
+  _METRICKIND._serialized_end=2971
+  _PROFILINGMODE._serialized_start=2973
+  _PROFILINGMODE._serialized_end=3021
+  _SEARCHMODE._serialized_start=3023
+  _SEARCHMODE._serialized_end=3062
+  _REQUESTSONGPATH._serialized_start=65
+  _REQUESTSONGPATH._serialized_end=96
+  _REQUESTSONGINDEX._serialized_start=98
+  _REQUESTSONGINDEX._serialized_end=131
+  _REQUESTSNAPSHOT._serialized_start=133
+  _REQUESTSNAPSHOT._serialized_end=192
+  _REQUESTCONTROL._serialized_start=194
+  _REQUESTCONTROL._serialized_end=299
+  _REQUESTMOVESONG._serialized_start=301
+  _REQUESTMOVESONG._serialized_end=351
+  _REQUESTPLAYLISTRANGE._serialized_start=353
+  _REQUESTPLAYLISTRANGE._serialized_end=426
+  _REQUESTPLAYLISTDELTA._serialized_start=428
+  _REQUESTPLAYLISTDELTA._serialized_end=503
+  _REQUESTSONGPOSITION._serialized_start=505
+  _REQUESTSONGPOSITION._serialized_end=544
+  _REQUESTPLAYERSTATUS._serialized_start=546
+  _REQUESTPLAYERSTATUS._serialized_end=624
+  _RESPONSESONGINDEX._serialized_start=626
+  _RESPONSESONGINDEX._serialized_end=675
+  _RESPONSEPLAYERSTATUS._serialized_start=678
+  _RESPONSEPLAYERSTATUS._serialized_end=832
+  _RESPONSESONGINFORMATION._serialized_start=834
+  _RESPONSESONGINFORMATION._serialized_end=907
+  _RESPONSEPLAYLIST._serialized_start=910
+  _RESPONSEPLAYLIST._serialized_end=1043
+  _PLAYLISTEDIT._serialized_start=1046
+  _PLAYLISTEDIT._serialized_end=1175
+  _RESPONSEPLAYLISTDELTA._serialized_start=1178
+  _RESPONSEPLAYLISTDELTA._serialized_end=1324
+  _PLAYERSNAPSHOT._serialized_start=1327
+  _PLAYERSNAPSHOT._serialized_end=1481
+  _RESPONSERESULT._serialized_start=1483
+  _RESPONSERESULT._serialized_end=1563
+  _SONGERROR._serialized_start=1565
+  _SONGERROR._serialized_end=1605
+  _RESPONSEADDSONG._serialized_start=1607
+  _RESPONSEADDSONG._serialized_end=1696
+  _RESPONSEPAUSED._serialized_start=1698
+  _RESPONSEPAUSED._serialized_end=1745
+  _EMPTY._serialized_start=1747
+  _EMPTY._serialized_end=1754
+  _METRIC._serialized_start=1757
+  _METRIC._serialized_end=2000
+  _METRIC_LABELSENTRY._serialized_start=1955
+  _METRIC_LABELSENTRY._serialized_end=2000
+  _RESPONSEMETRICS._serialized_start=2002
+  _RESPONSEMETRICS._serialized_end=2074
+  _REQUESTPROFILING._serialized_start=2077
+  _REQUESTPROFILING._serialized_end=2210
+  _RESPONSEPROFILING._serialized_start=2212
+  _RESPONSEPROFILING._serialized_end=2260
+  _REQUESTIMPORTDIRECTORY._serialized_start=2262
+  _REQUESTIMPORTDIRECTORY._serialized_end=2340
+  _IMPORTPROGRESS._serialized_start=2343
+  _IMPORTPROGRESS._serialized_end=2548
+  _REQUESTSEARCHPLAYLIST._serialized_start=2550
+  _REQUESTSEARCHPLAYLIST._serialized_end=2660
+  _RESPONSESEARCHPLAYLIST._serialized_start=2662
+  _RESPONSESEARCHPLAYLIST._serialized_end=2771
+  _PLAYER._serialized_start=3065
+  _PLAYER._serialized_end=4886
 # @@protoc_insertion_point(module_scope)
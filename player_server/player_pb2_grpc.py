@@ -17,11 +17,11 @@ class PlayerStub(object):
         self.AddSong = channel.unary_unary(
                 '/player_server.Player/AddSong',
                 request_serializer=player__pb2.RequestSongPath.SerializeToString,
-                response_deserializer=player__pb2.ResponseResult.FromString,
+                response_deserializer=player__pb2.ResponseAddSong.FromString,
                 )
         self.Play = channel.unary_unary(
                 '/player_server.Player/Play',
-                request_serializer=player__pb2.RequestSongIndex.SerializeToString,
+                request_serializer=player__pb2.RequestControl.SerializeToString,
                 response_deserializer=player__pb2.ResponseResult.FromString,
                 )
         self.GetPlayList = channel.unary_unary(
@@ -36,22 +36,22 @@ class PlayerStub(object):
                 )
         self.Pause = channel.unary_unary(
                 '/player_server.Player/Pause',
-                request_serializer=player__pb2.Empty.SerializeToString,
+                request_serializer=player__pb2.RequestControl.SerializeToString,
                 response_deserializer=player__pb2.ResponseResult.FromString,
                 )
         self.Next = channel.unary_unary(
                 '/player_server.Player/Next',
-                request_serializer=player__pb2.Empty.SerializeToString,
+                request_serializer=player__pb2.RequestControl.SerializeToString,
                 response_deserializer=player__pb2.ResponseResult.FromString,
                 )
         self.Prev = channel.unary_unary(
                 '/player_server.Player/Prev',
-                request_serializer=player__pb2.Empty.SerializeToString,
+                request_serializer=player__pb2.RequestControl.SerializeToString,
                 response_deserializer=player__pb2.ResponseResult.FromString,
                 )
         self.Stop = channel.unary_unary(
                 '/player_server.Player/Stop',
-                request_serializer=player__pb2.Empty.SerializeToString,
+                request_serializer=player__pb2.RequestControl.SerializeToString,
                 response_deserializer=player__pb2.ResponseResult.FromString,
                 )
         self.SetPosition = channel.unary_unary(
@@ -71,7 +71,7 @@ class PlayerStub(object):
                 )
         self.GetPlayerStatus = channel.unary_stream(
                 '/player_server.Player/GetPlayerStatus',
-                request_serializer=player__pb2.Empty.SerializeToString,
+                request_serializer=player__pb2.RequestPlayerStatus.SerializeToString,
                 response_deserializer=player__pb2.ResponsePlayerStatus.FromString,
                 )
         self.GetSongIndex = channel.unary_unary(
@@ -79,6 +79,56 @@ class PlayerStub(object):
                 request_serializer=player__pb2.Empty.SerializeToString,
                 response_deserializer=player__pb2.ResponseSongIndex.FromString,
                 )
+        self.GetPlaylistDelta = channel.unary_unary(
+                '/player_server.Player/GetPlaylistDelta',
+                request_serializer=player__pb2.RequestPlaylistDelta.SerializeToString,
+                response_deserializer=player__pb2.ResponsePlaylistDelta.FromString,
+                )
+        self.MoveSong = channel.unary_unary(
+                '/player_server.Player/MoveSong',
+                request_serializer=player__pb2.RequestMoveSong.SerializeToString,
+                response_deserializer=player__pb2.ResponseResult.FromString,
+                )
+        self.GetPlayListRange = channel.unary_unary(
+                '/player_server.Player/GetPlayListRange',
+                request_serializer=player__pb2.RequestPlaylistRange.SerializeToString,
+                response_deserializer=player__pb2.ResponsePlaylist.FromString,
+                )
+        self.StreamPlayList = channel.unary_stream(
+                '/player_server.Player/StreamPlayList',
+                request_serializer=player__pb2.RequestPlaylistRange.SerializeToString,
+                response_deserializer=player__pb2.ResponsePlaylist.FromString,
+                )
+        self.GetSnapshot = channel.unary_unary(
+                '/player_server.Player/GetSnapshot',
+                request_serializer=player__pb2.RequestSnapshot.SerializeToString,
+                response_deserializer=player__pb2.PlayerSnapshot.FromString,
+                )
+        self.GetMetrics = channel.unary_unary(
+                '/player_server.Player/GetMetrics',
+                request_serializer=player__pb2.Empty.SerializeToString,
+                response_deserializer=player__pb2.ResponseMetrics.FromString,
+                )
+        self.StartProfiling = channel.unary_unary(
+                '/player_server.Player/StartProfiling',
+                request_serializer=player__pb2.RequestProfiling.SerializeToString,
+                response_deserializer=player__pb2.ResponseProfiling.FromString,
+                )
+        self.ImportDirectory = channel.unary_stream(
+                '/player_server.Player/ImportDirectory',
+                request_serializer=player__pb2.RequestImportDirectory.SerializeToString,
+                response_deserializer=player__pb2.ImportProgress.FromString,
+                )
+        self.AddSongs = channel.stream_unary(
+                '/player_server.Player/AddSongs',
+                request_serializer=player__pb2.RequestSongPath.SerializeToString,
+                response_deserializer=player__pb2.ResponseAddSong.FromString,
+                )
+        self.SearchPlaylist = channel.unary_unary(
+                '/player_server.Player/SearchPlaylist',
+                request_serializer=player__pb2.RequestSearchPlaylist.SerializeToString,
+                response_deserializer=player__pb2.ResponseSearchPlaylist.FromString,
+                )
 
 
 class PlayerServicer(object):
@@ -162,17 +212,77 @@ class PlayerServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def GetPlaylistDelta(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def MoveSong(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def GetPlayListRange(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def StreamPlayList(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def GetSnapshot(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def GetMetrics(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def StartProfiling(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def ImportDirectory(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def AddSongs(self, request_iterator, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def SearchPlaylist(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_PlayerServicer_to_server(servicer, server):
     rpc_method_handlers = {
             'AddSong': grpc.unary_unary_rpc_method_handler(
                     servicer.AddSong,
                     request_deserializer=player__pb2.RequestSongPath.FromString,
-                    response_serializer=player__pb2.ResponseResult.SerializeToString,
+                    response_serializer=player__pb2.ResponseAddSong.SerializeToString,
             ),
             'Play': grpc.unary_unary_rpc_method_handler(
                     servicer.Play,
-                    request_deserializer=player__pb2.RequestSongIndex.FromString,
+                    request_deserializer=player__pb2.RequestControl.FromString,
                     response_serializer=player__pb2.ResponseResult.SerializeToString,
             ),
             'GetPlayList': grpc.unary_unary_rpc_method_handler(
@@ -187,22 +297,22 @@ def add_PlayerServicer_to_server(servicer, server):
             ),
             'Pause': grpc.unary_unary_rpc_method_handler(
                     servicer.Pause,
-                    request_deserializer=player__pb2.Empty.FromString,
+                    request_deserializer=player__pb2.RequestControl.FromString,
                     response_serializer=player__pb2.ResponseResult.SerializeToString,
             ),
             'Next': grpc.unary_unary_rpc_method_handler(
                     servicer.Next,
-                    request_deserializer=player__pb2.Empty.FromString,
+                    request_deserializer=player__pb2.RequestControl.FromString,
                     response_serializer=player__pb2.ResponseResult.SerializeToString,
             ),
             'Prev': grpc.unary_unary_rpc_method_handler(
                     servicer.Prev,
-                    request_deserializer=player__pb2.Empty.FromString,
+                    request_deserializer=player__pb2.RequestControl.FromString,
                     response_serializer=player__pb2.ResponseResult.SerializeToString,
             ),
             'Stop': grpc.unary_unary_rpc_method_handler(
                     servicer.Stop,
-                    request_deserializer=player__pb2.Empty.FromString,
+                    request_deserializer=player__pb2.RequestControl.FromString,
                     response_serializer=player__pb2.ResponseResult.SerializeToString,
             ),
             'SetPosition': grpc.unary_unary_rpc_method_handler(
@@ -222,7 +332,7 @@ def add_PlayerServicer_to_server(servicer, server):
             ),
             'GetPlayerStatus': grpc.unary_stream_rpc_method_handler(
                     servicer.GetPlayerStatus,
-                    request_deserializer=player__pb2.Empty.FromString,
+                    request_deserializer=player__pb2.RequestPlayerStatus.FromString,
                     response_serializer=player__pb2.ResponsePlayerStatus.SerializeToString,
             ),
             'GetSongIndex': grpc.unary_unary_rpc_method_handler(
@@ -230,6 +340,56 @@ def add_PlayerServicer_to_server(servicer, server):
                     request_deserializer=player__pb2.Empty.FromString,
                     response_serializer=player__pb2.ResponseSongIndex.SerializeToString,
             ),
+            'GetPlaylistDelta': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetPlaylistDelta,
+                    request_deserializer=player__pb2.RequestPlaylistDelta.FromString,
+                    response_serializer=player__pb2.ResponsePlaylistDelta.SerializeToString,
+            ),
+            'MoveSong': grpc.unary_unary_rpc_method_handler(
+                    servicer.MoveSong,
+                    request_deserializer=player__pb2.RequestMoveSong.FromString,
+                    response_serializer=player__pb2.ResponseResult.SerializeToString,
+            ),
+            'GetPlayListRange': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetPlayListRange,
+                    request_deserializer=player__pb2.RequestPlaylistRange.FromString,
+                    response_serializer=player__pb2.ResponsePlaylist.SerializeToString,
+            ),
+            'StreamPlayList': grpc.unary_stream_rpc_method_handler(
+                    servicer.StreamPlayList,
+                    request_deserializer=player__pb2.RequestPlaylistRange.FromString,
+                    response_serializer=player__pb2.ResponsePlaylist.SerializeToString,
+            ),
+            'GetSnapshot': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetSnapshot,
+                    request_deserializer=player__pb2.RequestSnapshot.FromString,
+                    response_serializer=player__pb2.PlayerSnapshot.SerializeToString,
+            ),
+            'GetMetrics': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetMetrics,
+                    request_deserializer=player__pb2.Empty.FromString,
+                    response_serializer=player__pb2.ResponseMetrics.SerializeToString,
+            ),
+            'StartProfiling': grpc.unary_unary_rpc_method_handler(
+                    servicer.StartProfiling,
+                    request_deserializer=player__pb2.RequestProfiling.FromString,
+                    response_serializer=player__pb2.ResponseProfiling.SerializeToString,
+            ),
+            'ImportDirectory': grpc.unary_stream_rpc_method_handler(
+                    servicer.ImportDirectory,
+                    request_deserializer=player__pb2.RequestImportDirectory.FromString,
+                    response_serializer=player__pb2.ImportProgress.SerializeToString,
+            ),
+            'AddSongs': grpc.stream_unary_rpc_method_handler(
+                    servicer.AddSongs,
+                    request_deserializer=player__pb2.RequestSongPath.FromString,
+                    response_serializer=player__pb2.ResponseAddSong.SerializeToString,
+            ),
+            'SearchPlaylist': grpc.unary_unary_rpc_method_handler(
+                    servicer.SearchPlaylist,
+                    request_deserializer=player__pb2.RequestSearchPlaylist.FromString,
+                    response_serializer=player__pb2.ResponseSearchPlaylist.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'player_server.Player', rpc_method_handlers)
@@ -253,7 +413,7 @@ class Player(object):
             metadata=None):
         return grpc.experimental.unary_unary(request, target, '/player_server.Player/AddSong',
             player__pb2.RequestSongPath.SerializeToString,
-            player__pb2.ResponseResult.FromString,
+            player__pb2.ResponseAddSong.FromString,
             options, channel_credentials,
             insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
 
@@ -269,7 +429,7 @@ class Player(object):
             timeout=None,
             metadata=None):
         return grpc.experimental.unary_unary(request, target, '/player_server.Player/Play',
-            player__pb2.RequestSongIndex.SerializeToString,
+            player__pb2.RequestControl.SerializeToString,
             player__pb2.ResponseResult.FromString,
             options, channel_credentials,
             insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
@@ -320,7 +480,7 @@ class Player(object):
             timeout=None,
             metadata=None):
         return grpc.experimental.unary_unary(request, target, '/player_server.Player/Pause',
-            player__pb2.Empty.SerializeToString,
+            player__pb2.RequestControl.SerializeToString,
             player__pb2.ResponseResult.FromString,
             options, channel_credentials,
             insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
@@ -337,7 +497,7 @@ class Player(object):
             timeout=None,
             metadata=None):
         return grpc.experimental.unary_unary(request, target, '/player_server.Player/Next',
-            player__pb2.Empty.SerializeToString,
+            player__pb2.RequestControl.SerializeToString,
             player__pb2.ResponseResult.FromString,
             options, channel_credentials,
             insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
@@ -354,7 +514,7 @@ class Player(object):
             timeout=None,
             metadata=None):
         return grpc.experimental.unary_unary(request, target, '/player_server.Player/Prev',
-            player__pb2.Empty.SerializeToString,
+            player__pb2.RequestControl.SerializeToString,
             player__pb2.ResponseResult.FromString,
             options, channel_credentials,
             insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
@@ -371,7 +531,7 @@ class Player(object):
             timeout=None,
             metadata=None):
         return grpc.experimental.unary_unary(request, target, '/player_server.Player/Stop',
-            player__pb2.Empty.SerializeToString,
+            player__pb2.RequestControl.SerializeToString,
             player__pb2.ResponseResult.FromString,
             options, channel_credentials,
             insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
@@ -439,7 +599,7 @@ class Player(object):
             timeout=None,
             metadata=None):
         return grpc.experimental.unary_stream(request, target, '/player_server.Player/GetPlayerStatus',
-            player__pb2.Empty.SerializeToString,
+            player__pb2.RequestPlayerStatus.SerializeToString,
             player__pb2.ResponsePlayerStatus.FromString,
             options, channel_credentials,
             insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
@@ -460,3 +620,173 @@ class Player(object):
             player__pb2.ResponseSongIndex.FromString,
             options, channel_credentials,
             insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def GetPlaylistDelta(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/player_server.Player/GetPlaylistDelta',
+            player__pb2.RequestPlaylistDelta.SerializeToString,
+            player__pb2.ResponsePlaylistDelta.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def MoveSong(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/player_server.Player/MoveSong',
+            player__pb2.RequestMoveSong.SerializeToString,
+            player__pb2.ResponseResult.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def GetPlayListRange(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/player_server.Player/GetPlayListRange',
+            player__pb2.RequestPlaylistRange.SerializeToString,
+            player__pb2.ResponsePlaylist.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def StreamPlayList(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(request, target, '/player_server.Player/StreamPlayList',
+            player__pb2.RequestPlaylistRange.SerializeToString,
+            player__pb2.ResponsePlaylist.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def GetSnapshot(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/player_server.Player/GetSnapshot',
+            player__pb2.RequestSnapshot.SerializeToString,
+            player__pb2.PlayerSnapshot.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def GetMetrics(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/player_server.Player/GetMetrics',
+            player__pb2.Empty.SerializeToString,
+            player__pb2.ResponseMetrics.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def StartProfiling(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/player_server.Player/StartProfiling',
+            player__pb2.RequestProfiling.SerializeToString,
+            player__pb2.ResponseProfiling.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def ImportDirectory(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(request, target, '/player_server.Player/ImportDirectory',
+            player__pb2.RequestImportDirectory.SerializeToString,
+            player__pb2.ImportProgress.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def AddSongs(request_iterator,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.stream_unary(request_iterator, target, '/player_server.Player/AddSongs',
+            player__pb2.RequestSongPath.SerializeToString,
+            player__pb2.ResponseAddSong.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def SearchPlaylist(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/player_server.Player/SearchPlaylist',
+            player__pb2.RequestSearchPlaylist.SerializeToString,
+            player__pb2.ResponseSearchPlaylist.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
@@ -0,0 +1,257 @@
+import sys
+import time
+import cProfile
+import pstats
+import tempfile
+from collections import Counter
+from pathlib import Path
+from threading import Event, Lock, Thread, get_ident, local
+from typing import Optional
+
+import player_server.player_pb2 as pb2
+
+# каталог для файлов профилирования по умолчанию
+PROFILE_DIR = Path(tempfile.gettempdir())
+# максимальная длительность одного сеанса профилирования, с
+MAX_PROFILE_SECONDS = 600
+# период опроса стеков потоков в режиме SAMPLING по умолчанию, с
+SAMPLE_INTERVAL = 0.005
+
+
+class ProfilingSession:
+    """
+    один сеанс профилирования: режим, отбор методов и накопленные данные
+    """
+
+    def __init__(self, mode: int, methods: frozenset, path: Path, interval: float):
+        self.mode = mode
+        self.methods = methods # имена профилируемых методов (пустое множество - все)
+        self.path = path
+        self.interval = interval
+        self.finished = Event()
+        self.samples = Counter() # SAMPLING: свёрнутый стек -> количество замеров
+        self.stats: Optional[pstats.Stats] = None # DETERMINISTIC: накопленная статистика cProfile
+        self.calls = 0 # количество профилированных вызовов
+
+
+class Profiler:
+    """
+    профилирование обработчиков RPC по запросу. Пока сеанс не запущен, стоимость - одна проверка
+    атрибута на вызов. В режиме SAMPLING отдельный поток периодически снимает стеки потоков,
+    выполняющих обработчики, и записывает свёрнутые стеки (формат flamegraph.pl / speedscope).
+    В режиме DETERMINISTIC обработчики выполняются под cProfile (одновременно профилируется
+    один вызов, остальные выполняются как обычно), результат - файл pstats. Команды, которые
+    профилируемый вызов передаёт в поток команд плеера (delegate), профилируются в потоке команд
+    под именем того же метода
+    """
+
+    def __init__(self, directory=PROFILE_DIR):
+        self.directory = Path(directory)
+        self.session: Optional[ProfilingSession] = None
+        self.__threads = {} # SAMPLING: id потока -> имя выполняемого метода
+        # профилируемый вызов текущего потока: method - имя метода, profile - cProfile.Profile (DETERMINISTIC)
+        self.__current = local()
+        self.__profile_lock = Lock() # DETERMINISTIC: один профилируемый вызов одновременно
+        self.__lock = Lock()
+
+    def start(self, seconds: float, mode: int = pb2.SAMPLING, methods=(), file_name: str = '',
+              interval: float = SAMPLE_INTERVAL) -> Path:
+        """
+        запуск сеанса профилирования на seconds секунд; по окончании данные записываются в файл
+        :param seconds:
+        :param mode: pb2.SAMPLING или pb2.DETERMINISTIC
+        :param methods: имена методов RPC (пусто - все)
+        :param file_name: имя файла в каталоге профилирования (пусто - по времени запуска)
+        :param interval: период опроса стеков в режиме SAMPLING, с
+        :return: путь к файлу, который будет записан
+        """
+        if not 0 < seconds <= MAX_PROFILE_SECONDS:
+            raise ValueError(f'длительность должна быть от 0 до {MAX_PROFILE_SECONDS} с')
+        if file_name and Path(file_name).name != file_name:
+            raise ValueError('имя файла не должно содержать каталогов')
+        suffix = '.pstats' if mode == pb2.DETERMINISTIC else '.collapsed'
+        path = self.directory / (file_name or f'player-profile-{time.strftime("%Y%m%d-%H%M%S")}{suffix}')
+        session = ProfilingSession(mode, frozenset(methods), path, interval or SAMPLE_INTERVAL)
+        with self.__lock:
+            if self.session is not None:
+                raise RuntimeError(f'профилирование уже запущено, результат: {self.session.path}')
+            self.session = session
+        if mode == pb2.SAMPLING:
+            Thread(target=self.__sample, args=(session,), name='profiler', daemon=True).start()
+        Thread(target=self.__finish, args=(session, seconds), name='profiler-timer', daemon=True).start()
+        return path
+
+    @property
+    def active(self) -> bool:
+        return self.session is not None
+
+    def wants(self, method: str) -> bool:
+        # профилируется ли метод в текущем сеансе
+        session = self.session
+        return session is not None and (not session.methods or method in session.methods)
+
+    def call(self, method: str, function, *args):
+        """
+        выполнение обработчика с профилированием (если сеанс запущен и метод отобран)
+        :param method: имя метода RPC
+        :param function:
+        :param args:
+        :return: результат function
+        """
+        session = self.session
+        if session is None or (session.methods and method not in session.methods):
+            return function(*args)
+        if session.mode == pb2.SAMPLING:
+            thread = get_ident()
+            self.__threads[thread] = method
+            self.__current.method = method
+            try:
+                return function(*args)
+            finally:
+                self.__current.method = None
+                self.__threads.pop(thread, None)
+        if not self.__profile_lock.acquire(blocking=False):
+            return function(*args)
+        try:
+            profile = cProfile.Profile()
+            self.__current.method, self.__current.profile = method, profile
+            try:
+                return profile.runcall(function, *args)
+            finally:
+                self.__current.method = self.__current.profile = None
+                self.__add_profile(session, profile)
+        finally:
+            self.__profile_lock.release()
+
+    def delegate(self, run, function, *args):
+        """
+        передача функции в другой поток (поток команд плеера) с ожиданием результата. Если текущий поток
+        выполняет профилируемый вызов, function профилируется в том потоке под именем того же метода,
+        а ожидание результата в текущем потоке не профилируется
+        :param run: функция (function, *args), выполняющая function в другом потоке и возвращающая результат
+        :param function:
+        :param args:
+        :return: результат function
+        """
+        method = getattr(self.__current, 'method', None)
+        session = self.session
+        if method is None or session is None:
+            return run(function, *args)
+        profile = getattr(self.__current, 'profile', None)
+        thread = get_ident()
+
+        def delegated(*args):
+            if session.mode == pb2.SAMPLING:
+                worker = get_ident()
+                self.__threads[worker] = method
+                try:
+                    return function(*args)
+                finally:
+                    self.__threads.pop(worker, None)
+            # профиль вызывающего потока на это время отключён: одновременно активен один cProfile
+            worker_profile = cProfile.Profile()
+            try:
+                return worker_profile.runcall(function, *args)
+            finally:
+                self.__add_profile(session, worker_profile, call=False)
+
+        # вызывающий поток только ждёт - его стек и время ожидания в результат не попадают
+        self.__threads.pop(thread, None)
+        if profile is not None:
+            profile.disable()
+        try:
+            return run(delegated, *args)
+        finally:
+            if profile is not None:
+                profile.enable()
+            if session.mode == pb2.SAMPLING:
+                self.__threads[thread] = method
+
+    def iterate(self, method: str, iterator):
+        """
+        поток ответов с профилированием каждого шага (только режим SAMPLING)
+        :param method: имя метода RPC
+        :param iterator:
+        :return: генератор ответов
+        """
+        iterator = iter(iterator)
+        while True:
+            session = self.session
+            if session is None or session.mode != pb2.SAMPLING:
+                yield from iterator
+                return
+            try:
+                response = self.call(method, next, iterator)
+            except StopIteration:
+                return
+            yield response
+
+    def __add_profile(self, session: ProfilingSession, profile: cProfile.Profile, call: bool = True) -> None:
+        """
+        :param session:
+        :param profile:
+        :param call: профиль отдельного вызова (False - часть вызова, выполненная в другом потоке)
+        :return:
+        """
+        with self.__lock:
+            if session.stats is None:
+                session.stats = pstats.Stats(profile)
+            else:
+                session.stats.add(profile)
+            session.calls += call
+
+    def __sample(self, session: ProfilingSession) -> None:
+        """
+        поток опроса стеков потоков, выполняющих обработчики. Поток опроса получает GIL только когда
+        его отпускают другие потоки: на время сеанса интервал переключения потоков уменьшается до
+        периода опроса, иначе команды короче интервала (5 мс) не попадали бы в замеры, а попадало бы
+        только ожидание
+        :param session:
+        :return:
+        """
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(min(session.interval, switch_interval))
+        try:
+            self.__sample_stacks(session)
+        finally:
+            sys.setswitchinterval(switch_interval)
+
+    def __sample_stacks(self, session: ProfilingSession) -> None:
+        while not session.finished.wait(session.interval):
+            frames = sys._current_frames()
+            for thread, method in list(self.__threads.items()):
+                frame = frames.get(thread)
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f'{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})')
+                    frame = frame.f_back
+                if stack:
+                    session.samples[';'.join([method] + stack[::-1])] += 1
+                    session.calls += 1
+
+    def __finish(self, session: ProfilingSession, seconds: float) -> None:
+        """
+        окончание сеанса и запись результата
+        :param session:
+        :param seconds:
+        :return:
+        """
+        time.sleep(seconds)
+        with self.__lock:
+            self.session = None
+        session.finished.set()
+        # ожидание профилируемого вызова, который мог ещё выполняться
+        with self.__profile_lock:
+            pass
+        try:
+            session.path.parent.mkdir(parents=True, exist_ok=True)
+            if session.mode == pb2.DETERMINISTIC:
+                if session.stats is not None:
+                    session.stats.dump_stats(session.path)
+                else:
+                    session.path.write_text('')
+            else:
+                session.path.write_text(''.join(f'{stack} {count}\n' for stack, count in session.samples.items()))
+        except Exception as err:
+            print(f'Ошибка записи результата профилирования {session.path}. {err}')
@@ -0,0 +1,203 @@
+from array import array
+from bisect import bisect_right
+from itertools import accumulate, islice
+
+import player_server.player_pb2 as pb2
+
+# треков в блоке индекса при построении; блок, выросший вдвое, разделяется
+SEARCH_BLOCK_SIZE = 1024
+
+
+def normalize(text: str) -> str:
+    # текст для сравнения без учёта регистра; перевод строки - разделитель названий в блоке
+    return text.casefold().replace('\n', ' ')
+
+
+class SearchBlock:
+    """
+    блок индекса - названия треков подряд идущих позиций плейлиста. Для поиска названия блока
+    склеены в одну строку ('\\n' перед каждым названием), поэтому поиск подстроки - один вызов
+    str.find на блок, а поиск по началу названия - поиск '\\n' + запрос. Построенный блок хранит
+    только строку; список названий восстанавливается из неё при изменении блока
+    """
+
+    def __init__(self, titles: list):
+        self.count = len(titles) # количество треков
+        self.titles = titles # нормализованные названия по порядку (None - блок построен)
+        self.text = None # склеенные названия (None - блок изменён, строка строится при поиске)
+        self.offsets = None # начала названий в text и len(text) + 1 - начало следующего
+
+    def build(self) -> None:
+        if self.text is None:
+            self.text = '\n' + '\n'.join(self.titles)
+            self.offsets = array('I', accumulate((len(title) + 1 for title in self.titles), initial=1))
+            self.titles = None
+
+    def edit(self) -> list:
+        """
+        список названий для изменения блока; строка блока будет построена заново при поиске
+        :return: изменяемый список названий (после изменения нужно обновить count)
+        """
+        if self.titles is None:
+            self.titles = self.text[1:].split('\n') if self.count else []
+            self.text = self.offsets = None
+        return self.titles
+
+
+class PlaylistSearchIndex:
+    """
+    индекс поиска по названиям треков плейлиста. Треки разбиты на блоки по позициям, поэтому
+    позиция найденного трека вычисляется без обращения к дереву плейлиста, а изменение
+    плейлиста (apply) меняет только список названий одного блока - строка блока строится заново
+    при следующем поиске. Блок позиции находится по дереву Фенвика размеров блоков за O(log блоков).
+    Обновляется в потоке команд плеера (см. Playlist.attach_search_index)
+    """
+
+    def __init__(self, titles, version: int, title=str):
+        """
+        :param titles: названия треков плейлиста по порядку (например, SongsView.titles())
+        :param version: версия плейлиста, которой соответствуют titles
+        :param title: название трека по объекту плейлиста - для треков, вставленных после построения
+        """
+        self.title = title
+        self.version = version
+        self.blocks = []
+        iterator = map(normalize, titles)
+        while block := list(islice(iterator, SEARCH_BLOCK_SIZE)):
+            self.blocks.append(SearchBlock(block))
+        for block in self.blocks:
+            block.build()
+        self.count = sum(block.count for block in self.blocks)
+        self.__tree = None # дерево Фенвика размеров блоков
+        self._index_blocks()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _index_blocks(self) -> None:
+        # дерево Фенвика строится заново при изменении списка блоков (разделение или удаление блока)
+        tree = [0] + [block.count for block in self.blocks]
+        for number in range(1, len(tree)):
+            parent = number + (number & -number)
+            if parent < len(tree):
+                tree[parent] += tree[number]
+        self.__tree = tree
+
+    def _resize(self, number: int, delta: int) -> None:
+        # изменение размера блока number на delta
+        self.blocks[number].count += delta
+        self.count += delta
+        tree = self.__tree
+        number += 1
+        while number < len(tree):
+            tree[number] += delta
+            number += number & -number
+
+    def _locate(self, index: int) -> tuple:
+        """
+        блок, содержащий позицию index (позиция после последнего трека - в последнем блоке):
+        спуск по дереву Фенвика
+        :param index:
+        :return: (номер блока, позиция в блоке)
+        """
+        if not 0 <= index <= self.count or not self.blocks:
+            raise IndexError(index)
+        if index == self.count:
+            return len(self.blocks) - 1, self.blocks[-1].count
+        tree = self.__tree
+        number = 0
+        step = 1 << (len(tree) - 1).bit_length()
+        while step:
+            following = number + step
+            if following < len(tree) and tree[following] <= index:
+                number = following
+                index -= tree[following]
+            step >>= 1
+        return number, index
+
+    def insert(self, index: int, titles) -> None:
+        """
+        :param index:
+        :param titles: нормализованные названия вставленных треков
+        :return:
+        """
+        if not self.blocks:
+            self.blocks.append(SearchBlock([]))
+            self._index_blocks()
+        number, position = self._locate(index)
+        block = self.blocks[number]
+        edited = block.edit()
+        edited[position:position] = titles
+        self._resize(number, len(edited) - block.count)
+        if block.count >= 2 * SEARCH_BLOCK_SIZE:
+            self.blocks[number:number + 1] = [SearchBlock(edited[start:start + SEARCH_BLOCK_SIZE])
+                                              for start in range(0, len(edited), SEARCH_BLOCK_SIZE)]
+            self._index_blocks()
+
+    def delete(self, index: int) -> str:
+        """
+        :param index:
+        :return: нормализованное название удалённого трека
+        """
+        number, position = self._locate(index)
+        if position == self.blocks[number].count:
+            raise IndexError(index)
+        block = self.blocks[number]
+        title = block.edit().pop(position)
+        self._resize(number, -1)
+        if not block.count:
+            del self.blocks[number]
+            self._index_blocks()
+        return title
+
+    def apply(self, version: int, kind: int, index: int, to_index: int = -1, songs: tuple = ()) -> None:
+        """
+        учёт изменения плейлиста (аргументы - запись Playlist.changes)
+        :param version: версия плейлиста после изменения
+        :param kind: pb2.INSERTED / pb2.DELETED / pb2.MOVED
+        :param index:
+        :param to_index: позиция перемещённого трека после перемещения
+        :param songs: вставленные объекты
+        :return:
+        """
+        if kind == pb2.INSERTED:
+            self.insert(index, [normalize(self.title(song)) for song in songs])
+        elif kind == pb2.DELETED:
+            self.delete(index)
+        else:
+            self.insert(to_index, [self.delete(index)])
+        self.version = version
+
+    def search(self, query: str, prefix: bool = False, offset: int = 0, limit: int = 0) -> list:
+        """
+        поиск треков, в названии которых есть query (без учёта регистра)
+        :param query:
+        :param prefix: только названия, начинающиеся с query
+        :param offset: искать с этой позиции плейлиста
+        :param limit: максимальное количество результатов (0 - без ограничения)
+        :return: позиции найденных треков по порядку плейлиста
+        """
+        if offset >= self.count:
+            return []
+        pattern = normalize(query)
+        # при поиске по началу совпадение начинается с '\n' перед названием
+        anchor = 1 if prefix or not pattern else 0
+        if anchor:
+            pattern = '\n' + pattern
+        found = []
+        first, skip = self._locate(max(offset, 0))
+        start = max(offset, 0) - skip
+        for block in islice(self.blocks, first, None):
+            block.build()
+            text, offsets = block.text, block.offsets
+            position = text.find(pattern, offsets[skip] - anchor)
+            while position != -1:
+                local = bisect_right(offsets, position + anchor) - 1
+                found.append(start + local)
+                if len(found) == limit:
+                    return found
+                # следующее совпадение - в следующих названиях
+                position = text.find(pattern, offsets[local + 1] - anchor)
+            start += block.count
+            skip = 0
+        return found
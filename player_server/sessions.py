@@ -0,0 +1,313 @@
+import time
+from concurrent import futures
+from pathlib import Path
+from threading import Event, Lock, Thread
+from typing import Optional
+
+import player_server.player_pb2_grpc as pb2_grpc
+import player_server.player_pb2 as pb2
+from player_server.player import Player
+from player_server.audio import HeadlessBackend
+from player_server.interceptors import error_response
+
+# ключ метаданных запроса с идентификатором сеанса (комнаты); без него - сеанс по умолчанию
+SESSION_METADATA_KEY = 'player-session'
+MAX_SESSION_ID_LENGTH = 64 # символов ASCII (имя файла снимка - идентификатор в hex)
+MAX_SESSIONS = 1000 # максимальное количество сеансов кроме сеанса по умолчанию
+# потоков проверки добавляемых файлов, общих для всех сеансов кроме сеанса по умолчанию (у него - свои 8):
+# сотни сеансов не создают тысячи потоков
+SESSION_PROBE_WORKERS = 8
+SESSION_IDLE_TIMEOUT = 600.0 # сеанс без вызовов и подписок дольше этого закрывается (вытесняется), с
+SESSION_IDLE_CHECK = 30.0 # как часто искать неактивные сеансы, с
+# методы, относящиеся ко всему серверу (метрики и профилирование), выполняет сеанс по умолчанию
+SERVER_METHODS = frozenset(('GetMetrics', 'StartProfiling'))
+# методы с потоком ответов
+STREAM_METHODS = frozenset(('GetPlayerStatus', 'StreamPlayList', 'ImportDirectory'))
+
+
+def session_id(context) -> str:
+    """
+    идентификатор сеанса из метаданных запроса
+    :param context: контекст RPC (None - прямой вызов)
+    :return: '' - сеанс по умолчанию
+    """
+    if context is None:
+        return ''
+    for key, value in context.invocation_metadata() or ():
+        if key == SESSION_METADATA_KEY:
+            return value
+    return ''
+
+
+def session_snapshot_path(snapshot_path, session: str) -> Optional[Path]:
+    """
+    файл снимка плейлиста сеанса: каталог <снимок>.sessions рядом со снимком сеанса по умолчанию
+    :param snapshot_path: файл снимка сеанса по умолчанию (None - снимки не сохраняются)
+    :param session:
+    :return:
+    """
+    if not snapshot_path:
+        return None
+    snapshot_path = Path(snapshot_path)
+    return snapshot_path.with_name(f'{snapshot_path.name}.sessions') / f'{session.encode().hex()}.snapshot'
+
+
+class Session:
+    """
+    открытый сеанс PlayerSessions: плеер, объект сеанса и учёт использования для вытеснения
+    """
+    __slots__ = ('player', 'item', 'calls', 'used')
+
+    def __init__(self, player: Player, item):
+        self.player = player
+        self.item = item # объект сеанса (PlayerSessions.wrap(player))
+        self.calls = 0 # выполняющиеся вызовы и открытые потоки ответов
+        self.used = time.monotonic() # время окончания последнего вызова
+
+
+class PlayerSessions:
+    """
+    сеансы плеера в одном процессе сервера. У каждого сеанса свой объект Player: плейлист, поток
+    команд, снимок состояния и журнал событий, поэтому сеансы не ждут друг друга. Сеанс создаётся
+    при первом запросе с новым идентификатором (снимок сеанса восстанавливается вне общей блокировки,
+    запросы того же сеанса ждут его создания). Каждый вызов учитывается (acquire / release):
+    сеанс без вызовов и подписок дольше idle_timeout закрывается - снимок сохраняется, потоки
+    плеера завершаются, следующий запрос откроет сеанс заново из снимка. При достижении limit
+    новый сеанс вытесняет дольше всех неиспользуемый. Звуковое устройство одно - сеансы проигрывают
+    без него (HeadlessBackend); пул проверки файлов и метрики у сеансов общие
+    """
+
+    def __init__(self, default: Player, snapshot_path=None, wrap=None, limit: int = MAX_SESSIONS,
+                 idle_timeout: float = SESSION_IDLE_TIMEOUT):
+        """
+        :param default: плеер сеанса по умолчанию (запросы без идентификатора сеанса)
+        :param snapshot_path: файл снимка сеанса по умолчанию (None - снимки сеансов не сохраняются,
+                              плейлист закрытого сеанса теряется)
+        :param wrap: функция Player -> объект сеанса (по умолчанию сам Player)
+        :param limit: максимальное количество сеансов
+        :param idle_timeout: время без вызовов, после которого сеанс закрывается, с (0 - не закрывать)
+        """
+        self.snapshot_path = snapshot_path
+        self.wrap = wrap or (lambda player: player)
+        self.limit = limit
+        self.idle_timeout = idle_timeout
+        self.default = self.wrap(default)
+        self.evicted = 0 # количество закрытых (вытесненных) сеансов
+        self.__default_player = default
+        self.__sessions = {} # идентификатор -> Session
+        # идентификатор -> Event для сеансов, которые создаются или закрываются: запросы этих
+        # сеансов ждут, пока снимок будет восстановлен или сохранён
+        self.__pending = {}
+        self.__opening = 0 # количество создаваемых сеансов (учитываются в limit)
+        self.__lock = Lock()
+        # общий пул потоков проверки добавляемых файлов сеансов
+        self.__probe_executor = futures.ThreadPoolExecutor(max_workers=SESSION_PROBE_WORKERS,
+                                                           thread_name_prefix='session-probe')
+        # показатели сеансов в метриках сервера (GetMetrics выполняет сеанс по умолчанию):
+        # показатели Player сеанса по умолчанию - только его, здесь - сумма по остальным сеансам
+        metrics = default.metrics
+        metrics.gauge('player_sessions', lambda: len(self.__sessions))
+        metrics.gauge('player_sessions_evicted', lambda: self.evicted)
+        metrics.gauge('playlist_tracks', lambda: self.__total(lambda player: len(player.state.songs)),
+                      player='sessions')
+        metrics.gauge('command_queue_depth', lambda: self.__total(lambda player: player.commands.pending),
+                      player='sessions')
+        if idle_timeout:
+            Thread(target=self.__evict_idle, name='session-eviction', daemon=True).start()
+
+    def acquire(self, session: str, create: bool = True):
+        """
+        объект сеанса для вызова; пока вызов не завершён (release), сеанс не закрывается
+        :param session: '' - сеанс по умолчанию
+        :param create: создать сеанс, если он ещё не открыт (может ждать восстановления снимка);
+                       False - вернуть None без ожидания
+        :return: объект сеанса
+        """
+        if not session:
+            return self.default
+        if len(session.encode()) > MAX_SESSION_ID_LENGTH:
+            raise ValueError(f'идентификатор сеанса длиннее {MAX_SESSION_ID_LENGTH} символов')
+        while True:
+            with self.__lock:
+                entry = self.__sessions.get(session)
+                if entry is not None:
+                    entry.calls += 1
+                    return entry.item
+                if not create:
+                    return None
+                waiting = self.__pending.get(session)
+                if waiting is None:
+                    # сеанс создаёт этот поток
+                    evicted = None
+                    if len(self.__sessions) + self.__opening >= self.limit:
+                        evicted = self.__take_least_recent()
+                        if evicted is None:
+                            raise RuntimeError(f'открыто максимальное количество сеансов ({self.limit})')
+                    waiting = self.__pending[session] = Event()
+                    self.__opening += 1
+                    break
+            waiting.wait()
+        entry = None
+        try:
+            if evicted is not None:
+                self.__close(*evicted)
+            player = self.__create_player(session)
+            entry = Session(player, self.wrap(player))
+            entry.calls = 1
+        finally:
+            with self.__lock:
+                self.__opening -= 1
+                del self.__pending[session]
+                if entry is not None:
+                    self.__sessions[session] = entry
+            waiting.set()
+        return entry.item
+
+    def release(self, session: str) -> None:
+        """
+        окончание вызова сеанса, полученного через acquire
+        :param session:
+        :return:
+        """
+        if not session:
+            return
+        with self.__lock:
+            entry = self.__sessions[session]
+            entry.calls -= 1
+            entry.used = time.monotonic()
+
+    def __create_player(self, session: str) -> Player:
+        default = self.__default_player
+        snapshot_path = session_snapshot_path(self.snapshot_path, session)
+        if snapshot_path is not None:
+            snapshot_path.parent.mkdir(exist_ok=True)
+        player = Player(audio=HeadlessBackend(), snapshot_path=snapshot_path, metadata_cache=default.metadata_cache,
+                        probe_executor=self.__probe_executor, metrics=default.metrics)
+        # профилирование запускается для всего сервера (StartProfiling сеанса по умолчанию)
+        player.profiler = default.profiler
+        return player
+
+    def __take_least_recent(self) -> Optional[tuple]:
+        """
+        сеанс без выполняющихся вызовов, дольше всех не использовавшийся, для закрытия (под блокировкой):
+        сеанс удаляется из открытых, его запросы ждут окончания закрытия
+        :return: (идентификатор, Session) или None - все сеансы заняты
+        """
+        idle = [(entry.used, session) for session, entry in self.__sessions.items() if not entry.calls]
+        if not idle:
+            return None
+        _, session = min(idle)
+        self.__pending[session] = Event()
+        return session, self.__sessions.pop(session)
+
+    def __close(self, session: str, entry: Session) -> None:
+        # закрытие сеанса, полученного из __take_least_recent: сохранение снимка и остановка потоков плеера
+        try:
+            entry.player.close()
+        except Exception as err:
+            print(f'Ошибка закрытия сеанса плеера. {err}')
+        finally:
+            with self.__lock:
+                self.evicted += 1
+                self.__pending.pop(session).set()
+
+    def __evict_idle(self) -> None:
+        # фоновый поток: закрытие сеансов без вызовов дольше idle_timeout
+        while True:
+            time.sleep(min(SESSION_IDLE_CHECK, self.idle_timeout))
+            deadline = time.monotonic() - self.idle_timeout
+            with self.__lock:
+                idle = [(session, self.__sessions.pop(session)) for session, entry in list(self.__sessions.items())
+                        if not entry.calls and entry.used < deadline]
+                for session, _ in idle:
+                    self.__pending[session] = Event()
+            for session, entry in idle:
+                self.__close(session, entry)
+
+    def __total(self, value) -> int:
+        # сумма показателя плееров открытых сеансов
+        with self.__lock:
+            players = [entry.player for entry in self.__sessions.values()]
+        return sum(value(player) for player in players)
+
+    def __len__(self) -> int:
+        return len(self.__sessions)
+
+    def save_state(self) -> None:
+        # сохранение всех открытых сеансов при остановке сервера (см. Player.save_state)
+        with self.__lock:
+            players = [self.__default_player] + [entry.player for entry in self.__sessions.values()]
+        for player in players:
+            try:
+                player.save_state()
+            except Exception as err:
+                print(f'Ошибка сохранения сеанса плеера. {err}')
+
+
+def for_session(name: str):
+    """
+    обработчик RPC, который вызывает метод name плеера сеанса из метаданных запроса
+    :param name: имя метода Player
+    :return:
+    """
+    def handler(self, request, context):
+        session = '' if name in SERVER_METHODS else session_id(context)
+        try:
+            player = self.sessions.acquire(session)
+        except Exception as err:
+            return error_response(name, f'Ошибка выбора сеанса плеера. {err}')
+        try:
+            return getattr(player, name)(request, context)
+        finally:
+            self.sessions.release(session)
+
+    def stream_handler(self, request, context):
+        # сеанс занят, пока открыт поток ответов (например, подписка на состояние)
+        session = '' if name in SERVER_METHODS else session_id(context)
+        try:
+            player = self.sessions.acquire(session)
+        except Exception as err:
+            yield error_response(name, f'Ошибка выбора сеанса плеера. {err}')
+            return
+        try:
+            yield from getattr(player, name)(request, context)
+        finally:
+            self.sessions.release(session)
+
+    if name in STREAM_METHODS:
+        handler = stream_handler
+    handler.__name__ = name
+    return handler
+
+
+class SessionPlayer(pb2_grpc.PlayerServicer):
+    """
+    сервис Player синхронного сервера, направляющий каждый запрос плееру его сеанса (PlayerSessions)
+    """
+
+    def __init__(self, sessions: PlayerSessions):
+        self.sessions = sessions
+
+    AddSong = for_session('AddSong')
+    AddSongs = for_session('AddSongs')
+    ImportDirectory = for_session('ImportDirectory')
+    DeleteSong = for_session('DeleteSong')
+    MoveSong = for_session('MoveSong')
+    Play = for_session('Play')
+    Pause = for_session('Pause')
+    Stop = for_session('Stop')
+    Next = for_session('Next')
+    Prev = for_session('Prev')
+    SetPosition = for_session('SetPosition')
+    IsPaused = for_session('IsPaused')
+    PlayingSongInfo = for_session('PlayingSongInfo')
+    GetSongIndex = for_session('GetSongIndex')
+    GetSnapshot = for_session('GetSnapshot')
+    GetPlayerStatus = for_session('GetPlayerStatus')
+    GetPlayList = for_session('GetPlayList')
+    GetPlayListRange = for_session('GetPlayListRange')
+    StreamPlayList = for_session('StreamPlayList')
+    GetPlaylistDelta = for_session('GetPlaylistDelta')
+    SearchPlaylist = for_session('SearchPlaylist')
+    GetMetrics = for_session('GetMetrics')
+    StartProfiling = for_session('StartProfiling')
@@ -0,0 +1,111 @@
+import os
+import mmap
+import math
+import struct
+from itertools import accumulate
+from array import array
+from pathlib import Path
+from typing import Optional
+
+# файл снимка плейлиста по умолчанию лежит рядом с сервером
+DEFAULT_SNAPSHOT_PATH = Path(__file__).parent / 'playlist.snapshot'
+
+SNAPSHOT_MAGIC = b'PLAYSNAP'
+SNAPSHOT_FORMAT = 1 # версия формата файла
+# заголовок: сигнатура, версия формата, флаги, количество треков, индекс активного трека,
+# версия плейлиста, позиция активного трека (с). Размер кратен 8 - массивы ниже выровнены.
+# Порядок байтов платформы, как у массивов array/memoryview
+HEADER = struct.Struct('=8sIIQqQd')
+FLAG_PAUSED = 1
+
+
+class PlaylistSnapshot:
+    """
+    снимок плейлиста, отображённый в память (mmap). Формат:
+    заголовок HEADER, длительности треков double[count] (NaN - неизвестна),
+    смещения путей uint64[count + 1] от начала блока путей, пути в кодировке файловой системы.
+    Открытие - O(1): пути и длительности декодируются только при обращении к треку
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, 'rb') as file:
+            self.__map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.__map) < HEADER.size:
+            raise ValueError(f'{self.path} - неполный заголовок снимка')
+        magic, file_format, flags, count, playing, version, position = HEADER.unpack_from(self.__map)
+        if magic != SNAPSHOT_MAGIC or file_format != SNAPSHOT_FORMAT:
+            raise ValueError(f'{self.path} не является снимком плейлиста формата {SNAPSHOT_FORMAT}')
+        self.count: int = count # количество треков
+        self.playing: int = playing # индекс активного трека (-1 - нет)
+        self.paused: bool = bool(flags & FLAG_PAUSED)
+        self.version: int = version # версия плейлиста на момент записи
+        self.position: float = position # позиция активного трека, с
+        offsets_start = HEADER.size + 8 * count
+        self.__paths_start = offsets_start + 8 * (count + 1)
+        view = memoryview(self.__map)
+        self.__durations = view[HEADER.size:offsets_start].cast('d')
+        self.__offsets = view[offsets_start:self.__paths_start].cast('Q')
+        if self.__paths_start + self.__offsets[count] != len(self.__map):
+            raise ValueError(f'{self.path} - размер файла не совпадает с заголовком снимка')
+
+    def raw_path(self, index: int) -> bytes:
+        # путь трека в кодировке файловой системы
+        return self.__map[self.__paths_start + self.__offsets[index]:self.__paths_start + self.__offsets[index + 1]]
+
+    def song_path(self, index: int) -> str:
+        return os.fsdecode(self.raw_path(index))
+
+    def duration(self, index: int) -> Optional[float]:
+        duration = self.__durations[index]
+        return None if math.isnan(duration) else duration
+
+    def record(self, index: int) -> tuple:
+        # запись трека без декодирования - для записи следующего снимка
+        return self.raw_path(index), self.__durations[index]
+
+    def __len__(self) -> int:
+        return self.count
+
+
+def write_snapshot(path, records, playing: int = -1, paused: bool = False, position: float = 0.0,
+                   version: int = 0) -> None:
+    """
+    запись снимка плейлиста. Файл записывается рядом под временным именем и заменяет прежний
+    атомарно, поэтому снимок, открытый через mmap, остаётся целым, а при сбое во время записи
+    сохраняется предыдущий снимок
+    :param path:
+    :param records: пары (путь в байтах, длительность или NaN) по порядку плейлиста
+    :param playing: индекс активного трека (-1 - нет)
+    :param paused:
+    :param position: позиция активного трека, с
+    :param version: версия плейлиста
+    :return:
+    """
+    path = Path(path)
+    paths, durations = [], array('d')
+    for raw_path, duration in records:
+        paths.append(raw_path)
+        durations.append(duration)
+    offsets = array('Q', accumulate(map(len, paths), initial=0))
+    header = HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_FORMAT, FLAG_PAUSED if paused else 0, len(paths),
+                         playing, version, position)
+    temporary = path.with_name(f'{path.name}.tmp')
+    with open(temporary, 'wb') as file:
+        file.write(header)
+        file.write(durations.tobytes())
+        file.write(offsets.tobytes())
+        file.write(b''.join(paths))
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary, path)
+    sync_directory(path.parent)
+
+
+def sync_directory(directory) -> None:
+    # фиксация создания, переименования и удаления файлов в каталоге
+    descriptor = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(descriptor)
+    finally:
+        os.close(descriptor)